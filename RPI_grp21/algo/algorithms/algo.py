@@ -1,27 +1,41 @@
-from typing import Union
+from typing import Callable, Iterator, Union
 import heapq
 import math
 import numpy as np
 from python_tsp.heuristics import solve_tsp_lin_kernighan
 from algo.entities.entity import CellState, Obstacle, Grid
 from algo.entities.robot import Robot
+from algo.algorithms.free_space import load_free_space_table
+from algo.algorithms.hierarchical import HierarchicalPlanner
+from algo.algorithms.stats import PlannerStats
+from algo.tools.timing import CommandTimingModel
+from algo.tools.params import PlannerParams
 from algo.tools.consts import (
-    TURN_FACTOR,
-    ITERATIONS,
-    SAFE_COST,
+    TIME_FACTOR,
     TURN_DISPLACEMENT,
-    REVERSE_FACTOR,
     PADDING,
     ARENA_WIDTH,
     ARENA_HEIGHT,
+    CLUSTER_SIZE,
+    VIEW_STATE_OFFSETS,
+    MAX_VIEW_STATES,
+    MAX_VIEW_STATE_COMBINATIONS,
 )
 from algo.tools.movement import (
     Direction,
     MOVE_DIRECTION,
+    HEADING_VECTORS,
+    EIGHT_HEADING_MOTIONS,
     Motion
 )
 
 
+class PlanningCancelled(Exception):
+    """
+    Raised by a MazeSolver when planning is cancelled, see `MazeSolver.cancel`
+    """
+
+
 class MazeSolver:
     """
     A class that is used to find the shortest path given a grid, robot and obstacles
@@ -35,8 +49,19 @@ class MazeSolver:
             robot_x: int = 1,
             robot_y: int = 1,
             robot_direction: Direction = Direction.NORTH,
+            bidirectional: bool = False,
+            use_free_space_table: bool = True,
+            hierarchical: bool = False,
+            cluster_size: int = CLUSTER_SIZE,
+            eight_headings: bool = False,
+            cost_model: Union[CommandTimingModel, None] = None,
+            opportunistic_captures: bool = False,
+            view_state_offsets: list[tuple[int, int]] = VIEW_STATE_OFFSETS,
+            max_view_states: int = MAX_VIEW_STATES,
+            params: Union[PlannerParams, None] = None,
     ) -> None:
         self.neighbor_cache = {}  # Store precomputed neighbors
+        self.edge_cache = {}  # Store neighbors with precomputed motion costs
         """
         Args:
             size_x: size of the grid in x direction. Default is 20
@@ -45,8 +70,30 @@ class MazeSolver:
             robot_x: x coordinate of the robot. Default is 1
             robot_y: y coordinate of the robot. Default is 1
             robot_direction: direction the robot is facing. Default is NORTH
+            bidirectional: search pairwise paths from both ends at once. Default is False
+            use_free_space_table: use the precomputed obstacle-free lattice costs as heuristic and shortcut. Default is True
+            hierarchical: plan pairwise paths over an abstract graph of grid clusters, for larger arenas. Default is False
+            cluster_size: size of a cluster in cells for hierarchical planning. Default is CLUSTER_SIZE
+            eight_headings: add diagonal headings with 45 degree turns to the motion lattice, searched bidirectionally. Default is False
+            cost_model: price motions by their predicted execution time instead of TURN_FACTOR and REVERSE_FACTOR. Default is None
+            opportunistic_captures: capture obstacles whose view states the path passes through, and re-plan the rest of the path without them. Default is False
+            view_state_offsets: (lateral offset, extra distance) of the view state candidates of each obstacle. Default is VIEW_STATE_OFFSETS
+            max_view_states: max. no. of view states of each obstacle kept after pruning. Default is MAX_VIEW_STATES
+            params: cost parameters of the planner. Default is PlannerParams(), the values in `consts.py`
         """
+        self.bidirectional = bidirectional
+        self.eight_headings = eight_headings
+        self.cost_model = cost_model
+        self.opportunistic_captures = opportunistic_captures
+        self.view_state_offsets = view_state_offsets
+        self.max_view_states = max_view_states
+        self.params = params if params else PlannerParams()
+        # the table only covers the default arena size, and is priced with the default motion costs
+        self.free_space = load_free_space_table(num_directions=8 if eight_headings else 4, cost_model=cost_model) if use_free_space_table and (
+            size_x, size_y) == (ARENA_WIDTH, ARENA_HEIGHT) and (cost_model or self.params.has_default_motion_costs()) else None
         self.grid = Grid(size_x, size_y)
+        self.hierarchical_planner = HierarchicalPlanner(
+            self, cluster_size) if hierarchical else None
 
         self.robot = robot if robot else Robot(
             robot_x, robot_y, robot_direction)
@@ -55,6 +102,14 @@ class MazeSolver:
         self.cost_table = dict()
         self.motion_table = dict()
 
+        # search counters and per-phase timers, see `get_stats`
+        self.stats = PlannerStats()
+
+        # best tour found so far while planning, which can be read from another thread
+        self.best_path: list[CellState] = []
+        self.best_cost: float = 1e9
+        self.cancelled = False
+
     def add_obstacle(
             self, x: int, y: int, direction: Direction, obstacle_id: int
     ) -> None:
@@ -82,15 +137,195 @@ class MazeSolver:
         Returns: 
             tuple[list[CellState], float]: an optimal path which is a list of all the CellStates involved, and cost of the path
         """
-        min_dist = 1e9
-        optimal_path = []
+        for optimal_path, min_dist, _, _ in self.iter_optimal_path():
+            pass
+        return optimal_path, min_dist
 
+    def iter_optimal_path(self, commit_first_leg: bool = False) -> Iterator[tuple[list[CellState], float, int, bool]]:
+        """
+        Plan like `get_optimal_path`, but yield the path every time more of it is final, so the robot can start driving while the rest is refined.
+        Once the tour is solved, the path is final up to each capture the opportunistic capture walk has passed; without that walk, the whole path is final at once.
+
+        With commit_first_leg, the first leg of the tour (from the start to the first view state) is chosen before the view states are searched pairwise
+        (see `_plan_first_leg`) and yielded final, and the rest of the tour is solved from the end of the leg while the robot drives it.
+        The tour can then cost a little more than one solved at once.
+
+        Yields:
+            tuple[list[CellState], float, int, bool]: the path so far, its cost, the no. of states at its start that will not change any more,
+            and whether the path is whole and all of it final, which is the last yield
+        """
         # get all grid positions that can view the obstacle images
-        views = self.grid.get_view_obstacle_positions()
+        with self.stats.timer("view_states"):
+            views = self._prune_view_states(
+                self.grid.get_view_obstacle_positions(self.view_state_offsets, self.params))
+
+        start_state = self.robot.get_start_state()
+        first_leg = self._plan_first_leg(
+            start_state, views) if commit_first_leg else None
+        if first_leg:
+            leg, leg_cost, first_view = first_leg
+            yield leg, leg_cost, len(leg), False
+
+            rest_start = CellState(
+                first_view.x, first_view.y, first_view.direction)
+            rest_views = [view_states for view_states in views if view_states and
+                          view_states[0].screenshot_id != first_view.screenshot_id]
+            rest_path, rest_cost = self._solve_tour(
+                rest_start, rest_views) if rest_views else ([rest_start], 0)
+            # the rest starts from the last state of the leg, which takes the image
+            optimal_path = leg + rest_path[1:]
+            min_dist = leg_cost + (rest_cost if rest_path else 0)
+            self.best_path, self.best_cost = optimal_path, min_dist
+            committed = len(leg)
+        else:
+            optimal_path, min_dist = self._solve_tour(
+                start_state, views, track_best=True)
+            committed = 0
+
+        if self.opportunistic_captures and optimal_path:
+            for optimal_path, min_dist, committed in self._iter_opportunistic_captures(optimal_path, min_dist, views, committed):
+                self.best_path, self.best_cost = optimal_path, min_dist
+                yield optimal_path, min_dist, committed, committed == len(optimal_path)
+        else:
+            yield optimal_path, min_dist, len(optimal_path), True
+
+    def cancel(self) -> None:
+        """
+        Stop planning from another thread. `get_optimal_path` raises PlanningCancelled at the next pairwise search or TSP
+        """
+        self.cancelled = True
+
+    def _check_cancelled(self) -> None:
+        if self.cancelled:
+            raise PlanningCancelled("Planning was cancelled")
+
+    def get_stats(self) -> dict:
+        """
+        Returns the search counters and per-phase timers collected so far, see `stats.py`
+        """
+        self.stats.collision_checks = self.grid.collision_checks
+        return self.stats.to_dict()
+
+    def _prune_view_states(self, views: list[list[CellState]]) -> list[list[CellState]]:
+        """
+        Drop view states that the robot cannot move from (and so cannot reach), and view states that are dominated:
+        another view state of the same obstacle has a strictly lower penalty and strictly more motions out of it.
+        At most max_view_states of the remaining view states are kept for each obstacle, preferring lower penalties and then more motions,
+        and the worst view states of the obstacles with the most view states are dropped until there are at most MAX_VIEW_STATE_COMBINATIONS combinations.
+        """
+        ranked = []
+        for view_states in views:
+            # connectivity of each view state: no. of motions the robot can make from it
+            degrees = [len(self._get_neighboring_states(view_state.x, view_state.y, view_state.direction))
+                       for view_state in view_states]
+            kept = [i for i, view_state in enumerate(view_states) if degrees[i] > 0 and not any(
+                other.penalty < view_state.penalty and degrees[j] > degrees[i] for j, other in enumerate(view_states))]
+            ranked.append(sorted(kept, key=lambda i: (
+                view_states[i].penalty, -degrees[i]))[:self.max_view_states])
+
+        while math.prod(len(best) for best in ranked if best) > MAX_VIEW_STATE_COMBINATIONS:
+            max(ranked, key=len).pop()
+
+        self.stats.view_states_pruned += sum(len(view_states) for view_states in views) - \
+            sum(len(best) for best in ranked)
+
+        # keep the original order of the view states
+        return [[view_states[i] for i in sorted(best)] for view_states, best in zip(views, ranked)]
+
+    def _plan_first_leg(self, start: CellState, views: list[list[CellState]]) -> Union[tuple[list[CellState], float, CellState], None]:
+        """
+        Choose the view state the tour starts with, searching only the paths from start to every view state instead of between every pair of them.
+        The costs between view states are estimated (see `_estimate_cost`), and the first view state of the tour with the least estimated cost is chosen,
+        so the robot can drive to it while the rest of the tour is solved.
+
+        Returns:
+            tuple[list[CellState], float, CellState]: the path from start to the first view state, taking its image, the cost of the path
+            including the penalty of the view state, and the view state. None if no view state can be reached from start
+        """
+        with self.stats.timer("pairwise_search"):
+            self._generate_paths_from(
+                start, [view_state for view_states in views for view_state in view_states])
+        reachable = [[view_state for view_state in view_states if (start, view_state) in self.cost_table]
+                     for view_states in views]
+        reachable = [view_states for view_states in reachable if view_states]
+        if not reachable:
+            return None
+
+        min_cost = 1e9
+        first_view = None
+        # estimated cost between each pair of view states, shared by the combinations
+        estimates: dict[tuple[CellState, CellState], int] = {}
+        combinations = MazeSolver._generate_combinations(
+            reachable, 0, [], [], self.params.iterations)
+        for combination in combinations:
+            self._check_cancelled()
+            visit_states = [start] + [view_states[i]
+                                      for view_states, i in zip(reachable, combination)]
+
+            # costs from start are searched, the costs between view states are estimated
+            cost_matrix = np.zeros((len(visit_states), len(visit_states)))
+            for start_idx in range(len(visit_states) - 1):
+                for end_idx in range(start_idx + 1, len(visit_states)):
+                    pair = (visit_states[start_idx], visit_states[end_idx])
+                    if start_idx == 0:
+                        cost_matrix[start_idx, end_idx] = self.cost_table[pair]
+                    else:
+                        if pair not in estimates:
+                            estimates[pair] = self._estimate_cost(*pair)
+                        cost_matrix[start_idx, end_idx] = estimates[pair]
+                    cost_matrix[end_idx, start_idx] = cost_matrix[start_idx, end_idx]
+            cost_matrix[:, 0] = 0
+
+            with self.stats.timer("tsp"):
+                permutation, distance = solve_tsp_lin_kernighan(cost_matrix)
+            self.stats.lk_calls += 1
+            self.stats.combinations_evaluated += 1
+
+            cost = distance + \
+                sum(view_state.penalty for view_state in visit_states[1:])
+            if cost < min_cost:
+                min_cost = cost
+                first_view = visit_states[permutation[1]]
+
+        with self.stats.timer("path_reconstruction"):
+            leg = [start] + [CellState(x, y, direction)
+                             for x, y, direction in self.path_table[(start, first_view)][1:]]
+            obs = self.grid.find_obstacle_by_id(first_view.screenshot_id)
+            pos = MazeSolver._get_capture_relative_position(leg[-1], obs)
+            leg[-1].set_screenshot(f"{first_view.screenshot_id}_{pos}")
+        return leg, self.cost_table[(start, first_view)] + first_view.penalty, first_view
+
+    def _estimate_cost(self, start: CellState, end: CellState) -> int:
+        """
+        Estimate the cost of the path between two states without searching it: its cost on the obstacle-free lattice if the precomputed table is loaded,
+        which is exact unless an obstacle is in the way, or else its Manhattan distance and the least turning cost
+        """
+        if self.free_space:
+            cost = float(self.free_space.costs[self.free_space.index(start.x, start.y, start.direction),
+                                               self.free_space.index(end.x, end.y, end.direction)])
+            return round(cost) if math.isfinite(cost) else 1e9
+        # rounded, since the TSP solver does not terminate reliably on fractional costs
+        return round(self._estimate_distance(start, end) + self._estimate_turns(
+            start.x, start.y, start.direction, end.x, end.y, end.direction))
+
+    def _solve_tour(self, start: CellState, views: list[list[CellState]], track_best: bool = False) -> tuple[list[CellState], float]:
+        """
+        Get the optimal path from start that visits one view state of each obstacle, or of as many obstacles as possible
+
+        Args:
+            start (CellState): state the path starts from
+            views (list[list[CellState]]): view states of each obstacle to visit
+            track_best (bool): update best_path and best_cost whenever a better tour is found. Default is False
+
+        Returns:
+            tuple[list[CellState], float]: an optimal path which is a list of all the CellStates involved, and cost of the path
+        """
+        min_dist = 1e9
+        optimal_path = []
         num_views = len(views)
 
         for bin_pos in self._get_visit_options(num_views):
-            visit_states = [self.robot.get_start_state()]
+            visit_states = [start]
             cur_view_positions = []
 
             for i in range(num_views):
@@ -102,15 +337,17 @@ class MazeSolver:
                     visit_states.extend(views[i])
 
             # for each visit state, generate path to all other visit states and cost of the paths using A* search
-            self._generate_paths(visit_states)
+            with self.stats.timer("pairwise_search"):
+                self._generate_paths(visit_states)
 
             # generate all possible combinations of the view positions
             combinations = MazeSolver._generate_combinations(
-                cur_view_positions, 0, [], [], ITERATIONS
+                cur_view_positions, 0, [], [], self.params.iterations
             )
 
             # iterate over all the combinations and find the optimal path
             for combination in combinations:
+                self._check_cancelled()
                 visited = [0]
 
                 current_idx = 1  # idx 0 of visit_states: robot start state
@@ -151,46 +388,55 @@ class MazeSolver:
 
                 # find Hamiltonian path with least cost for the selected combination of view states
                 # solve_tsp_lin_kernighan is used instead of solve_tsp_dynamic_programming since it was the empirically fastest solver
-                permutation, distance = solve_tsp_lin_kernighan(cost_matrix)
+                with self.stats.timer("tsp"):
+                    permutation, distance = solve_tsp_lin_kernighan(
+                        cost_matrix)
+                self.stats.lk_calls += 1
+                self.stats.combinations_evaluated += 1
 
                 # if the distance is more than the minimum distance, the path is irrelevant
                 if distance + cost >= min_dist:
+                    self.stats.combinations_pruned += 1
                     continue
 
                 # update the minimum distance
                 min_dist = distance + cost
 
                 # update the optimal path
-                optimal_path = [visit_states[0]]
-                for idx in range(len(permutation) - 1):
-                    from_state = visit_states[visited[permutation[idx]]]
-                    to_state = visit_states[visited[permutation[idx + 1]]]
-
-                    current_path = self.path_table[(from_state, to_state)]
-
-                    # add each state from the current path to the optimal path
-                    for idx2 in range(1, len(current_path)):
-                        optimal_path.append(
-                            CellState(
-                                current_path[idx2][0],
-                                current_path[idx2][1],
-                                current_path[idx2][2],
+                with self.stats.timer("path_reconstruction"):
+                    optimal_path = [visit_states[0]]
+                    for idx in range(len(permutation) - 1):
+                        from_state = visit_states[visited[permutation[idx]]]
+                        to_state = visit_states[visited[permutation[idx + 1]]]
+
+                        current_path = self.path_table[(from_state, to_state)]
+
+                        # add each state from the current path to the optimal path
+                        for idx2 in range(1, len(current_path)):
+                            optimal_path.append(
+                                CellState(
+                                    current_path[idx2][0],
+                                    current_path[idx2][1],
+                                    current_path[idx2][2],
+                                )
                             )
-                        )
 
-                    # check position of to_state wrt to obstacle to snap screenshot from center/left/right.
-                    obs = self.grid.find_obstacle_by_id(to_state.screenshot_id)
-                    if obs:
-                        pos = MazeSolver._get_capture_relative_position(
-                            optimal_path[-1], obs
-                        )
-                        formatted = f"{to_state.screenshot_id}_{pos}"
+                        # check position of to_state wrt to obstacle to snap screenshot from center/left/right.
+                        obs = self.grid.find_obstacle_by_id(to_state.screenshot_id)
+                        if obs:
+                            pos = MazeSolver._get_capture_relative_position(
+                                optimal_path[-1], obs
+                            )
+                            formatted = f"{to_state.screenshot_id}_{pos}"
 
-                        optimal_path[-1].set_screenshot(formatted)
-                    else:
-                        raise ValueError(
-                            f"Obstacle with id {to_state.screenshot_id} not found"
-                        )
+                            optimal_path[-1].set_screenshot(formatted)
+                        else:
+                            raise ValueError(
+                                f"Obstacle with id {to_state.screenshot_id} not found"
+                            )
+
+                if track_best:
+                    self.best_path, self.best_cost = optimal_path, min_dist
 
             # if the optimal path has been found, break the view positions loop
             if optimal_path:
@@ -198,13 +444,139 @@ class MazeSolver:
 
         return optimal_path, min_dist
 
+    def _iter_opportunistic_captures(
+            self, optimal_path: list[CellState], min_dist: float, views: list[list[CellState]], committed: int = 0
+    ) -> Iterator[tuple[list[CellState], float, int]]:
+        """
+        Walk along the optimal path and capture obstacles whose view states the robot passes through before their planned capture.
+        After each such capture, the rest of the path is re-planned without the captured obstacles, and kept only if it is cheaper
+        including the penalties of the view states, so an image is only taken from a worse position if it saves enough driving.
+        The walk only changes the path after the state it is at, so the path is final up to each capture it has passed.
+        It starts at the last of the states already committed, eg. of the first leg yielded by `iter_optimal_path`, so those are not changed.
+
+        Yields:
+            tuple[list[CellState], float, int]: the path and its cost after each capture passed, and the no. of states up to and including that capture.
+            The last yield is the new path with all of it final
+        """
+        # view states of every obstacle by position and direction
+        view_lookup: dict[tuple[int, int, Direction], list[CellState]] = {}
+        for view_states in views:
+            for view_state in view_states:
+                view_lookup.setdefault(
+                    (view_state.x, view_state.y, view_state.direction), []).append(view_state)
+
+        i = max(committed - 1, 0)
+        captured = {int(state.screenshot_id.split("_")[0])
+                    for state in optimal_path[:i] if state.screenshot_id is not None}
+        planned = self._get_planned_penalties(optimal_path, view_lookup)
+        while i < len(optimal_path) - 1:
+            state = optimal_path[i]
+            if state.screenshot_id is not None:
+                captured.add(int(state.screenshot_id.split("_")[0]))
+                yield optimal_path, min_dist, i + 1
+                i += 1
+                continue
+
+            for view_state in view_lookup.get((state.x, state.y, state.direction), []):
+                obstacle_id = view_state.screenshot_id
+                if obstacle_id in captured or obstacle_id not in planned:
+                    continue
+
+                # re-plan the rest of the path from here over the obstacles that are planned but not captured yet
+                remaining = [view_states for view_states in views if view_states and view_states[0].screenshot_id in planned and
+                             view_states[0].screenshot_id not in captured | {obstacle_id}]
+                start_state = CellState(state.x, state.y, state.direction)
+                new_path = self._solve_tour(start_state, remaining)[
+                    0] if remaining else [start_state]
+                if len(self._get_planned_penalties(new_path, view_lookup)) < len(remaining):
+                    continue
+
+                saving = self._path_cost(optimal_path[i:], view_lookup) - (
+                    self._path_cost(new_path, view_lookup) + view_state.penalty)
+                if saving <= 0:
+                    continue
+
+                pos = MazeSolver._get_capture_relative_position(
+                    state, self.grid.find_obstacle_by_id(obstacle_id))
+                state.set_screenshot(f"{obstacle_id}_{pos}")
+                optimal_path = optimal_path[:i + 1] + new_path[1:]
+                min_dist -= saving
+                captured.add(obstacle_id)
+                planned = self._get_planned_penalties(
+                    optimal_path, view_lookup)
+                yield optimal_path, min_dist, i + 1
+                break
+            i += 1
+
+        yield optimal_path, min_dist, len(optimal_path)
+
+    @staticmethod
+    def _get_planned_penalties(
+            path: list[CellState], view_lookup: dict[tuple[int, int, Direction], list[CellState]]
+    ) -> dict[int, int]:
+        """
+        Returns the penalty of the view state each obstacle is captured from along the path, by obstacle id
+        """
+        penalties = {}
+        for state in path:
+            if state.screenshot_id is None:
+                continue
+            obstacle_id = int(state.screenshot_id.split("_")[0])
+            for view_state in view_lookup.get((state.x, state.y, state.direction), []):
+                if view_state.screenshot_id == obstacle_id:
+                    penalties[obstacle_id] = view_state.penalty
+        return penalties
+
+    def _path_cost(
+            self, path: list[CellState], view_lookup: dict[tuple[int, int, Direction], list[CellState]]
+    ) -> float:
+        """
+        Returns the cost of the motions along a path plus the penalties of the view states it captures obstacles from
+        """
+        cost = sum(self._get_planned_penalties(path, view_lookup).values())
+        for state, next_state in zip(path, path[1:]):
+            next_key = (next_state.x, next_state.y, next_state.direction)
+            for new_x, new_y, new_direction, motion_cost, _ in self._get_neighboring_edges(state.x, state.y, state.direction):
+                if (new_x, new_y, new_direction) == next_key:
+                    cost += motion_cost
+                    break
+            else:
+                # the motion was searched from next_state, price it as the opposite motion into next_state
+                for new_x, new_y, new_direction, motion_cost, _ in self._get_neighboring_edges(*next_key, backward=True):
+                    if (new_x, new_y, new_direction) == (state.x, state.y, state.direction):
+                        cost += motion_cost
+                        break
+        return cost
+
+    def _get_search(self) -> Callable[[CellState, CellState], None]:
+        """
+        Returns the search storing the path between two states
+        """
+        if self.hierarchical_planner:
+            return self.hierarchical_planner.search
+        if self.bidirectional or self.eight_headings:
+            # forward A* expands about twice as many states on the 8-heading lattice, the bidirectional search is faster than either
+            return self._bidirectional_search
+        return self._astar_search
+
     def _generate_paths(self, states: list[CellState]) -> None:
         """
         Generate and store the path between all combinations of all view states
         """
+        search = self._get_search()
         for i in range(len(states) - 1):
             for j in range(i + 1, len(states)):
-                self._astar_search(states[i], states[j])
+                self._check_cancelled()
+                search(states[i], states[j])
+
+    def _generate_paths_from(self, start: CellState, states: list[CellState]) -> None:
+        """
+        Generate and store the path from start to each of the states
+        """
+        search = self._get_search()
+        for state in states:
+            self._check_cancelled()
+            search(start, state)
 
     def _astar_search(self, start: CellState, end: CellState) -> None:
         """
@@ -216,8 +588,9 @@ class MazeSolver:
         h: Estimated distance from the current state to the end state
         """
         # check if the path has already been calculated
-        if (start, end) in self.path_table:
+        if (start, end) in self.path_table or self._free_space_shortcut(start, end):
             return
+        self.stats.pairwise_searches += 1
 
         # initialize the actual distance dict with the start state
         g_dist = {(start.x, start.y, start.direction): 0}
@@ -225,9 +598,14 @@ class MazeSolver:
         visited = set()
         parent_dict = {}
 
+        # obstacle-free costs to the end state are an exact lower bound when the table is available
+        free_costs = self.free_space.costs_to(
+            end.x, end.y, end.direction) if self.free_space else None
+
         # initialize min heap with the start state
         # the heap is a list of tuples (h, x, y, direction) where h is the estimated distance from the current state to the end state
-        heap = [(self._estimate_distance(start, end),
+        heap = [(self._estimate_distance(start, end) if free_costs is None
+                 else free_costs[self.free_space.index(start.x, start.y, start.direction)],
                  start.x, start.y, start.direction)]
 
         while heap:
@@ -247,48 +625,23 @@ class MazeSolver:
             # mark the node as visited
             visited.add((x, y, direction))
             dist = g_dist[(x, y, direction)]
+            self.stats.nodes_expanded += 1
 
             # traverse the neighboring states
             for (
                     new_x,
                     new_y,
                     new_direction,
-                    safe_cost,
+                    motion_cost,
                     motion,
-            ) in self._get_neighboring_states(x, y, direction):
+            ) in self._get_neighboring_edges(x, y, direction):
 
                 # check if the new state has already been visited
                 if (new_x, new_y, new_direction) in visited:
                     continue
 
-                if (
-                        x,
-                        y,
-                        direction,
-                        new_x,
-                        new_y,
-                        new_direction,
-                ) not in self.motion_table and (
-                        new_x,
-                        new_y,
-                        new_direction,
-                        x,
-                        y,
-                        direction,
-                ) not in self.motion_table:
-                    # only need to store one of the two directions as the other will be the opposite
-                    self.motion_table[
-                        (x, y, direction, new_x, new_y, new_direction)
-                    ] = motion
-
-                # calculate the cost of robot turning
-                turn_cost = TURN_FACTOR * Direction.turn_cost(
-                    direction, new_direction
-                )
-                # calculate the cost of robot reversing
-                reverse_cost = REVERSE_FACTOR * motion.reverse_cost()
-
-                motion_cost = turn_cost + reverse_cost + safe_cost
+                self._record_motion(x, y, direction, new_x,
+                                    new_y, new_direction, motion)
 
                 # check if there is a screenshot penalty
                 if end.is_eq(new_x, new_y, new_direction):
@@ -301,9 +654,8 @@ class MazeSolver:
                     dist
                     + motion_cost
                     + screenshot_cost
-                    + self._estimate_distance(
-                        CellState(new_x, new_y, new_direction), end
-                    )
+                    + (self._estimate_distance(CellState(new_x, new_y, new_direction), end) if free_costs is None
+                       else free_costs[self.free_space.index(new_x, new_y, new_direction)])
                 )
 
                 # update the g distance if the new state has not been visited or the new cost is less than the previous cost
@@ -316,11 +668,184 @@ class MazeSolver:
                     # add the new state to the heap
                     heapq.heappush(
                         heap, (total_cost, new_x, new_y, new_direction))
+                    self.stats.heap_pushes += 1
 
                     # update the parent dict
                     parent_dict[(new_x, new_y, new_direction)] = (
                         x, y, direction)
 
+    def _bidirectional_search(self, start: CellState, end: CellState) -> None:
+        """
+        Bidirectional A* search between two states, meeting in the middle.
+        Motions are reversible, so the backward search expands the same neighbors as the forward search
+        and prices each edge as the opposite motion into the expanded state.
+
+        Heuristic: minimum number of turns between the two states, which is consistent, so the search stops
+        once either frontier cannot improve on the best meeting cost found so far.
+        """
+        # check if the path has already been calculated
+        if (start, end) in self.path_table or self._free_space_shortcut(start, end):
+            return
+        self.stats.pairwise_searches += 1
+
+        start_key = (start.x, start.y, start.direction)
+        end_key = (end.x, end.y, end.direction)
+        if start_key == end_key:
+            self._store_path(start, end, [start_key], 0)
+            return
+
+        # obstacle-free costs are an exact lower bound when the table is available
+        if self.free_space:
+            costs_to_end = self.free_space.costs_to(*end_key)
+            costs_from_start = self.free_space.costs_from(*start_key)
+
+            def estimate_fwd(x, y, direction):
+                return costs_to_end[self.free_space.index(x, y, direction)]
+
+            def estimate_bwd(x, y, direction):
+                return costs_from_start[self.free_space.index(x, y, direction)]
+        else:
+            def estimate_fwd(x, y, direction):
+                return self._estimate_turns(x, y, direction, *end_key)
+
+            def estimate_bwd(x, y, direction):
+                return self._estimate_turns(x, y, direction, *start_key)
+
+        # g distances, parents and closed sets for the forward (from start) and backward (from end) searches
+        g_fwd, g_bwd = {start_key: 0}, {end_key: 0}
+        parent_fwd, parent_bwd = {}, {}
+        closed_fwd, closed_bwd = set(), set()
+
+        # heaps are lists of tuples (f, x, y, direction)
+        heap_fwd = [(estimate_fwd(*start_key), *start_key)]
+        heap_bwd = [(estimate_bwd(*end_key), *end_key)]
+
+        best_cost, meeting_state = math.inf, None
+
+        while heap_fwd and heap_bwd:
+            # discard stale heap entries of states that have already been expanded
+            while heap_fwd and heap_fwd[0][1:] in closed_fwd:
+                heapq.heappop(heap_fwd)
+            while heap_bwd and heap_bwd[0][1:] in closed_bwd:
+                heapq.heappop(heap_bwd)
+            if not heap_fwd or not heap_bwd:
+                break
+
+            # stopping criterion: every unexplored path is at least as long as the best meeting found
+            if max(heap_fwd[0][0], heap_bwd[0][0]) >= best_cost:
+                break
+
+            # expand the smaller frontier
+            if len(heap_fwd) <= len(heap_bwd):
+                _, x, y, direction = heapq.heappop(heap_fwd)
+                closed_fwd.add((x, y, direction))
+                dist = g_fwd[(x, y, direction)]
+                self.stats.nodes_expanded += 1
+
+                for new_x, new_y, new_direction, motion_cost, motion in self._get_neighboring_edges(x, y, direction):
+                    new_state = (new_x, new_y, new_direction)
+                    if new_state in closed_fwd:
+                        continue
+
+                    self._record_motion(x, y, direction, new_x,
+                                        new_y, new_direction, motion)
+
+                    new_dist = dist + motion_cost
+                    if new_state not in g_fwd or g_fwd[new_state] > new_dist:
+                        g_fwd[new_state] = new_dist
+                        parent_fwd[new_state] = (x, y, direction)
+                        heapq.heappush(
+                            heap_fwd, (new_dist + estimate_fwd(*new_state), *new_state))
+                        self.stats.heap_pushes += 1
+
+                        # check whether the two searches meet at the new state
+                        if new_state in g_bwd and new_dist + g_bwd[new_state] < best_cost:
+                            best_cost = new_dist + g_bwd[new_state]
+                            meeting_state = new_state
+            else:
+                _, x, y, direction = heapq.heappop(heap_bwd)
+                closed_bwd.add((x, y, direction))
+                dist = g_bwd[(x, y, direction)]
+                self.stats.nodes_expanded += 1
+
+                # edges are priced as new_state -> expanded state, which is the opposite motion
+                for new_x, new_y, new_direction, motion_cost, motion in self._get_neighboring_edges(x, y, direction, backward=True):
+                    new_state = (new_x, new_y, new_direction)
+                    if new_state in closed_bwd:
+                        continue
+
+                    self._record_motion(x, y, direction, new_x,
+                                        new_y, new_direction, motion)
+
+                    new_dist = dist + motion_cost
+                    if new_state not in g_bwd or g_bwd[new_state] > new_dist:
+                        g_bwd[new_state] = new_dist
+                        parent_bwd[new_state] = (x, y, direction)
+                        heapq.heappush(
+                            heap_bwd, (new_dist + estimate_bwd(*new_state), *new_state))
+                        self.stats.heap_pushes += 1
+
+                        # check whether the two searches meet at the new state
+                        if new_state in g_fwd and new_dist + g_fwd[new_state] < best_cost:
+                            best_cost = new_dist + g_fwd[new_state]
+                            meeting_state = new_state
+
+        # end state is unreachable from start state
+        if meeting_state is None:
+            return
+
+        # join the forward half (start -> meeting state) with the backward half (meeting state -> end)
+        path = [meeting_state]
+        while path[-1] in parent_fwd:
+            path.append(parent_fwd[path[-1]])
+        path.reverse()
+        while path[-1] in parent_bwd:
+            path.append(parent_bwd[path[-1]])
+
+        # the screenshot penalty is paid when arriving at the end state
+        self._store_path(start, end, path, best_cost + end.penalty)
+
+    def _free_space_shortcut(self, start: CellState, end: CellState) -> bool:
+        """
+        Reuse the precomputed obstacle-free path between two states if no obstacle touches its corridor.
+        Such a path costs the same as without obstacles, which is a lower bound, so it is also optimal with obstacles.
+
+        Returns:
+            bool: True if the path was recorded
+        """
+        if not self.free_space:
+            return False
+
+        path = self.free_space.path(
+            (start.x, start.y, start.direction), (end.x, end.y, end.direction))
+        if not path:
+            return False
+
+        # every motion on the path must still be possible and must not come close to an obstacle
+        motions = []
+        for (x, y, direction), next_state in zip(path, path[1:]):
+            for new_x, new_y, new_direction, safe_cost, motion in self._get_neighboring_states(x, y, direction):
+                if (new_x, new_y, new_direction) == next_state:
+                    if safe_cost:
+                        return False
+                    motions.append(motion)
+                    break
+            else:
+                return False
+
+        for (x, y, direction), (new_x, new_y, new_direction), motion in zip(path, path[1:], motions):
+            self._record_motion(x, y, direction, new_x,
+                                new_y, new_direction, motion)
+
+        cost = self.free_space.costs[self.free_space.index(start.x, start.y, start.direction),
+                                     self.free_space.index(end.x, end.y, end.direction)]
+        # the screenshot penalty is paid when arriving at the end state
+        if len(path) > 1:
+            cost += end.penalty
+        self._store_path(start, end, path, float(cost))
+        self.stats.free_space_shortcuts += 1
+        return True
+
     def _get_neighboring_states(
             self, x: int, y: int, direction: Direction
     ) -> list[tuple[int, int, Direction, int, Motion]]:
@@ -330,7 +855,9 @@ class MazeSolver:
         """
         # cell state already visited. caching significantly reduces algo runtime
         if (x, y, direction) in self.neighbor_cache:
+            self.stats.neighbor_cache_hits += 1
             return self.neighbor_cache[(x, y, direction)]
+        self.stats.neighbor_cache_misses += 1
         neighbors = []
 
         for dx, dy, md in MOVE_DIRECTION:
@@ -577,9 +1104,65 @@ class MazeSolver:
                              md, safe_cost, motion)
                         )
 
+        if self.eight_headings:
+            # 45 degree turns and diagonal straight-line motions, precomputed for each heading
+            for dx, dy, new_direction, motion in EIGHT_HEADING_MOTIONS[direction]:
+                if self.grid.diagonal_reachable(x, y, x + dx, y + dy, direction, new_direction):
+                    safe_cost = self._calculate_safe_cost(x + dx, y + dy)
+                    neighbors.append(
+                        (x + dx, y + dy, new_direction, safe_cost, motion))
+
         self.neighbor_cache[(x, y, direction)] = neighbors
         return neighbors
 
+    def _get_neighboring_edges(
+            self, x: int, y: int, direction: Direction, backward: bool = False
+    ) -> list[tuple[int, int, Direction, int, Motion]]:
+        """
+        Returns the neighboring states together with the cost of the motion, in the format (newX, newY, new direction, motion cost, motion).
+        Motion costs are computed once per state instead of on every expansion, which matters most for the larger 8-heading lattice.
+
+        Args:
+            backward: price each edge as the opposite motion from the neighbor into (x, y, direction), for backward searches. Default is False
+        """
+        if (x, y, direction, backward) in self.edge_cache:
+            self.stats.neighbor_cache_hits += 1
+            return self.edge_cache[(x, y, direction, backward)]
+        self.stats.neighbor_cache_misses += 1
+
+        if backward:
+            # every edge into the state pays the safe cost of the state
+            safe_cost = self._calculate_safe_cost(x, y)
+            edges = [(new_x, new_y, new_direction, self._motion_cost(new_direction, direction, motion.opposite_motion(), safe_cost), motion)
+                     for new_x, new_y, new_direction, _, motion in self._get_neighboring_states(x, y, direction)]
+        else:
+            edges = [(new_x, new_y, new_direction, self._motion_cost(direction, new_direction, motion, safe_cost), motion)
+                     for new_x, new_y, new_direction, safe_cost, motion in self._get_neighboring_states(x, y, direction)]
+
+        self.edge_cache[(x, y, direction, backward)] = edges
+        return edges
+
+    def _motion_cost(self, direction: Direction, new_direction: Direction, motion: Motion, safe_cost: int) -> int:
+        """
+        Cost of a motion from a state facing direction to a state facing new_direction, given the safe cost of the new state
+        """
+        if self.cost_model:
+            # predicted time to execute the motion on the robot
+            return round(TIME_FACTOR * self.cost_model.motion_time(motion)) + safe_cost
+
+        # calculate the cost of robot turning
+        if motion.is_half_turn():
+            turn_cost = self.params.half_turn_factor
+        elif direction == new_direction:
+            turn_cost = 0
+        else:
+            turn_cost = self.params.turn_factor * \
+                Direction.turn_cost(direction, new_direction)
+        # calculate the cost of robot reversing
+        reverse_cost = self.params.reverse_factor * motion.reverse_cost()
+
+        return turn_cost + reverse_cost + safe_cost
+
     def _calculate_safe_cost(self, new_x: int, new_y: int) -> int:
         """
         calculates the safe cost of moving to a new position, considering obstacles that the robot might touch.
@@ -587,19 +1170,15 @@ class MazeSolver:
         """
         for obj in self.grid.obstacles:
             if abs(obj.x - new_x) <= PADDING and abs(obj.y - new_y) <= PADDING:
-                return SAFE_COST
+                return self.params.safe_cost
             if abs(obj.y - new_y) <= PADDING and abs(obj.x - new_x) <= PADDING:
-                return SAFE_COST
+                return self.params.safe_cost
         return 0
 
     def _record_path(self, start: CellState, end: CellState, parent: dict[tuple[int, int, Direction], tuple[int, int, Direction]], cost: int) -> None:
         """
         Record the path between two states. Should be called only during the A* search.
         """
-        # update the cost table for edges (start, end) and (end, start)
-        self.cost_table[(start, end)] = cost
-        self.cost_table[(end, start)] = cost
-
         # record the path
         path = []
         parent_pointer = (end.x, end.y, end.direction)
@@ -608,9 +1187,31 @@ class MazeSolver:
             parent_pointer = parent[parent_pointer]
         path.append(parent_pointer)
 
-        # reverse the path and store it in the path table
-        self.path_table[(start, end)] = path[::-1]
-        self.path_table[(end, start)] = path
+        self._store_path(start, end, path[::-1], cost)
+
+    def _store_path(self, start: CellState, end: CellState, path: list[tuple[int, int, Direction]], cost: int) -> None:
+        """
+        Store a path from start to end, and its reverse, in the path and cost tables
+        """
+        # update the cost table for edges (start, end) and (end, start)
+        self.cost_table[(start, end)] = cost
+        self.cost_table[(end, start)] = cost
+
+        self.path_table[(start, end)] = path
+        self.path_table[(end, start)] = path[::-1]
+
+    def _record_motion(
+            self, x: int, y: int, direction: Direction, new_x: int, new_y: int, new_direction: Direction, motion: Motion
+    ) -> None:
+        """
+        Record the motion from (x, y, direction) to (new_x, new_y, new_direction) in the motion table
+        """
+        if (x, y, direction, new_x, new_y, new_direction) not in self.motion_table and \
+                (new_x, new_y, new_direction, x, y, direction) not in self.motion_table:
+            # only need to store one of the two directions as the other will be the opposite
+            self.motion_table[
+                (x, y, direction, new_x, new_y, new_direction)
+            ] = motion
 
     @staticmethod
     def _estimate_distance(
@@ -631,6 +1232,30 @@ class MazeSolver:
         # Manhattan distance
         return abs(horizontal_distance) + abs(vertical_distance)
 
+    def _estimate_turns(
+            self, x: int, y: int, direction: Direction, end_x: int, end_y: int, end_direction: Direction
+    ) -> float:
+        """
+        Lower bound on the turning cost between two states, counted in 45 degree steps.
+        A 90 degree turn costs the turn factor for two steps, a 45 degree turn of the 8-heading lattice more than half of it for one,
+        and a sideways offset while facing the same direction needs at least two steps.
+        """
+        steps = abs(int(direction) - int(end_direction))
+        steps = min(steps, 8 - steps)
+        if steps == 0:
+            dx, dy = HEADING_VECTORS[direction]
+            # cross product of the heading and the offset to the end state
+            if dx * (end_y - y) - dy * (end_x - x) != 0:
+                steps = 2
+
+        if self.cost_model:
+            # rounded down, so it stays below the rounded motion costs
+            step_cost = math.floor(
+                TIME_FACTOR * self.cost_model.min_turn_step_time(self.eight_headings))
+        else:
+            step_cost = self.params.turn_factor / 2
+        return steps * step_cost
+
     @staticmethod
     def _get_visit_options(n: int) -> list[str]:
         """
@@ -731,34 +1356,35 @@ class MazeSolver:
         motion_path = []
         obstacle_id_with_signals = []
         scanned_obstacles = []
-        for i in range(len(optimal_path) - 1):
-            from_state = optimal_path[i]
-            to_state = optimal_path[i + 1]
-            x, y, d = from_state.x, from_state.y, from_state.direction
-            x_new, y_new, d_new = to_state.x, to_state.y, to_state.direction
-
-            if (x_new, y_new, d_new, x, y, d) in self.motion_table:
-                # if the motion is not found, check the reverse motion and get its opposite
-                motion = self.motion_table[
-                    (x_new, y_new, d_new, x, y, d)
-                ].opposite_motion()
-            elif (x, y, d, x_new, y_new, d_new) in self.motion_table:
-                motion = self.motion_table[(x, y, d, x_new, y_new, d_new)]
-            else:
-                # if the motion is still not found, then the path is invalid
-                raise ValueError(
-                    f"Invalid path from {from_state} to {to_state}. This should never happen."
-                )
+        with self.stats.timer("path_reconstruction"):
+            for i in range(len(optimal_path) - 1):
+                from_state = optimal_path[i]
+                to_state = optimal_path[i + 1]
+                x, y, d = from_state.x, from_state.y, from_state.direction
+                x_new, y_new, d_new = to_state.x, to_state.y, to_state.direction
+
+                if (x_new, y_new, d_new, x, y, d) in self.motion_table:
+                    # if the motion is not found, check the reverse motion and get its opposite
+                    motion = self.motion_table[
+                        (x_new, y_new, d_new, x, y, d)
+                    ].opposite_motion()
+                elif (x, y, d, x_new, y_new, d_new) in self.motion_table:
+                    motion = self.motion_table[(x, y, d, x_new, y_new, d_new)]
+                else:
+                    # if the motion is still not found, then the path is invalid
+                    raise ValueError(
+                        f"Invalid path from {from_state} to {to_state}. This should never happen."
+                    )
 
-            motion_path.append(motion)
+                motion_path.append(motion)
 
-            # check if the robot is taking a screenshot
-            if to_state.screenshot_id != None:
-                motion_path.append(Motion.CAPTURE)
-                obstacle_id_with_signals.append(to_state.screenshot_id)
-                obstacle_id = int(to_state.screenshot_id.split("_")[0])
-                scanned_obstacles.append(
-                    self.grid.find_obstacle_by_id(obstacle_id)
-                )
+                # check if the robot is taking a screenshot
+                if to_state.screenshot_id != None:
+                    motion_path.append(Motion.CAPTURE)
+                    obstacle_id_with_signals.append(to_state.screenshot_id)
+                    obstacle_id = int(to_state.screenshot_id.split("_")[0])
+                    scanned_obstacles.append(
+                        self.grid.find_obstacle_by_id(obstacle_id)
+                    )
 
         return motion_path, obstacle_id_with_signals, scanned_obstacles
@@ -0,0 +1,231 @@
+from typing import Union
+from pathlib import Path
+import hashlib
+import os
+import heapq
+import numpy as np
+from algo.tools.consts import ARENA_WIDTH, ARENA_HEIGHT
+from algo.tools.movement import Direction
+
+"""
+All-pairs costs and shortest path predecessors of the obstacle-free motion lattice (ARENA_WIDTH x ARENA_HEIGHT cells, 4 or 8 directions).
+
+Obstacles only remove motions and add safe costs, so the obstacle-free cost between two states is a lower bound of the cost with obstacles.
+The table is built once, saved as .npy files in `algo/tables` and memory-mapped read-only by every MazeSolver.
+Since every process maps the same files, API worker processes share one copy of the table in the OS page cache.
+File names contain a hash of the lattice definition, so the table is rebuilt whenever the files defining the motions and their costs change (see LATTICE_SOURCES).
+Planners that price motions with an execution-time model (see `tools/timing.py`) use a separate table for each model.
+
+To build the table manually, navigate to `/algo` directory and run:
+    python build_tables.py
+"""
+
+TABLE_DIR: Path = Path(__file__).resolve().parent.parent / "tables"
+
+# files defining the motion lattice: the arena and motions, the neighbors and motion costs of a state (MazeSolver._get_neighboring_edges
+# and _motion_cost), the reachability checks of the Grid, and the table builder itself. The table is rebuilt whenever any of them changes,
+# since a stale table would overestimate costs as the A* heuristic and give suboptimal paths
+LATTICE_SOURCES: list[Path] = [
+    Path(__file__).resolve().parent.parent / "tools" / "consts.py",
+    Path(__file__).resolve().parent.parent / "tools" / "movement.py",
+    Path(__file__).resolve().parent / "algo.py",
+    Path(__file__).resolve().parent.parent / "entities" / "entity.py",
+    Path(__file__).resolve(),
+]
+
+# loaded tables by number of directions and version, shared by all MazeSolver objects in this process
+_loaded_tables: dict[tuple[int, str], "FreeSpaceTable"] = {}
+
+
+class FreeSpaceTable:
+    """
+    Read-only view over the all-pairs cost and predecessor matrices of the obstacle-free lattice
+    """
+
+    def __init__(self, costs: np.ndarray, predecessors: np.ndarray, version: str = "", num_directions: int = 4) -> None:
+        """
+        Args:
+            costs (np.ndarray): costs[i, j] is the cost of the cheapest path from state i to state j, inf if unreachable
+            predecessors (np.ndarray): predecessors[i, j] is the state before j on the cheapest path from state i, -1 if none
+            version (str): lattice version the table was built for
+            num_directions (int): 4 for the default lattice, 8 for the 8-heading lattice. Default is 4
+        """
+        self.costs: np.ndarray = costs
+        self.predecessors: np.ndarray = predecessors
+        self.version: str = version
+        self.num_directions: int = num_directions
+        # Direction values are 0-7 with the diagonal headings in between the straight ones
+        self.direction_step: int = 8 // num_directions
+
+    def index(self, x: int, y: int, direction: Direction) -> int:
+        """
+        Returns the row/column of state (x, y, direction) in the table
+        """
+        return (x * ARENA_HEIGHT + y) * self.num_directions + direction // self.direction_step
+
+    def state(self, index: int) -> tuple[int, int, Direction]:
+        """
+        Returns the state (x, y, direction) of a row/column in the table
+        """
+        cell, direction = divmod(index, self.num_directions)
+        x, y = divmod(cell, ARENA_HEIGHT)
+        return x, y, Direction(direction * self.direction_step)
+
+    def costs_to(self, x: int, y: int, direction: Direction) -> list[float]:
+        """
+        Returns the cost from every state to (x, y, direction), indexed by FreeSpaceTable.index
+        """
+        return self.costs[:, self.index(x, y, direction)].tolist()
+
+    def costs_from(self, x: int, y: int, direction: Direction) -> list[float]:
+        """
+        Returns the cost from (x, y, direction) to every state, indexed by FreeSpaceTable.index
+        """
+        return self.costs[self.index(x, y, direction)].tolist()
+
+    def path(
+            self, start: tuple[int, int, Direction], end: tuple[int, int, Direction]
+    ) -> Union[list[tuple[int, int, Direction]], None]:
+        """
+        Returns the cheapest obstacle-free path from start to end as a list of states, or None if end is unreachable
+        """
+        start_idx = self.index(*start)
+        end_idx = self.index(*end)
+        if not np.isfinite(self.costs[start_idx, end_idx]):
+            return None
+
+        predecessors = self.predecessors[start_idx]
+        path = [end_idx]
+        while path[-1] != start_idx:
+            path.append(int(predecessors[path[-1]]))
+        return [self.state(idx) for idx in reversed(path)]
+
+
+def get_lattice_version(cost_model=None) -> str:
+    """
+    Returns a short hash of the files that define the motion lattice, followed by the signature of the cost model if given
+    """
+    digest = hashlib.sha1()
+    for source in LATTICE_SOURCES:
+        digest.update(source.read_bytes())
+    if cost_model is None:
+        return digest.hexdigest()[:12]
+    return f"{digest.hexdigest()[:12]}_{cost_model.signature()}"
+
+
+def build_free_space_table(num_directions: int = 4, cost_model=None) -> FreeSpaceTable:
+    """
+    Computes the all-pairs costs and predecessors of the obstacle-free lattice by running Dijkstra from every state
+
+    Args:
+        num_directions (int): 4 for the default lattice, 8 for the 8-heading lattice. Default is 4
+        cost_model (CommandTimingModel): execution-time model to price motions with, as in MazeSolver. Default is None
+    """
+    # imported here since MazeSolver uses this module
+    from algo.algorithms.algo import MazeSolver
+
+    maze_solver = MazeSolver(
+        size_x=ARENA_WIDTH, size_y=ARENA_HEIGHT, use_free_space_table=False, eight_headings=num_directions == 8, cost_model=cost_model)
+    num_states = ARENA_WIDTH * ARENA_HEIGHT * num_directions
+    table = FreeSpaceTable(np.full((num_states, num_states), np.inf, dtype=np.float32),
+                           np.full((num_states, num_states), -1, dtype=np.int16), num_directions=num_directions)
+
+    # adjacency list of (neighbor index, motion cost) for every state
+    adjacency: list[list[tuple[int, int]]] = [[] for _ in range(num_states)]
+    for idx in range(num_states):
+        x, y, direction = table.state(idx)
+        if not maze_solver.grid.is_valid_coord(x, y):
+            continue
+        for new_x, new_y, new_direction, motion_cost, _ in maze_solver._get_neighboring_edges(x, y, direction):
+            adjacency[idx].append(
+                (table.index(new_x, new_y, new_direction), motion_cost))
+
+    for source in range(num_states):
+        if not adjacency[source]:
+            continue
+
+        dist = {source: 0}
+        parent = {}
+        visited = set()
+        heap = [(0, source)]
+        while heap:
+            cost, idx = heapq.heappop(heap)
+            if idx in visited:
+                continue
+            visited.add(idx)
+
+            for new_idx, motion_cost in adjacency[idx]:
+                new_cost = cost + motion_cost
+                if new_idx not in dist or dist[new_idx] > new_cost:
+                    dist[new_idx] = new_cost
+                    parent[new_idx] = idx
+                    heapq.heappush(heap, (new_cost, new_idx))
+
+        table.costs[source, list(dist.keys())] = list(dist.values())
+        table.predecessors[source, list(parent.keys())] = list(parent.values())
+
+    return table
+
+
+def save_free_space_table(table: FreeSpaceTable, version: str) -> None:
+    """
+    Saves the table into TABLE_DIR and removes tables of older lattice versions. Tables of other cost models for the same lattice are kept.
+    Files are written under a temporary name and renamed, so processes building the table concurrently never map a partial file.
+    """
+    TABLE_DIR.mkdir(parents=True, exist_ok=True)
+    lattice_version = version.split("_")[0]
+    for stale in TABLE_DIR.glob("free_space*.npy"):
+        if lattice_version not in stale.stem:
+            stale.unlink(missing_ok=True)
+
+    for name, array in [("costs", table.costs), ("predecessors", table.predecessors)]:
+        path = TABLE_DIR / _get_table_file(name, table.num_directions, version)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+
+def load_free_space_table(build_if_missing: bool = True, num_directions: int = 4, cost_model=None) -> Union[FreeSpaceTable, None]:
+    """
+    Memory-maps the table of the current lattice version, building it first if it does not exist yet.
+    The table is loaded once per process.
+
+    Args:
+        build_if_missing (bool): build and save the table if it does not exist. Default is True
+        num_directions (int): 4 for the default lattice, 8 for the 8-heading lattice. Default is 4
+        cost_model (CommandTimingModel): execution-time model the planner prices motions with. Default is None
+
+    Returns:
+        Union[FreeSpaceTable, None]: the table, or None if it does not exist and build_if_missing is False
+    """
+    version = get_lattice_version(cost_model)
+    loaded_table = _loaded_tables.get((num_directions, version))
+    if loaded_table is not None:
+        return loaded_table
+
+    costs_path = TABLE_DIR / _get_table_file("costs", num_directions, version)
+    predecessors_path = TABLE_DIR / \
+        _get_table_file("predecessors", num_directions, version)
+    if not costs_path.exists() or not predecessors_path.exists():
+        if not build_if_missing:
+            return None
+        save_free_space_table(build_free_space_table(
+            num_directions, cost_model), version)
+
+    _loaded_tables[(num_directions, version)] = FreeSpaceTable(
+        np.load(costs_path, mmap_mode='r'),
+        np.load(predecessors_path, mmap_mode='r'),
+        version,
+        num_directions,
+    )
+    return _loaded_tables[(num_directions, version)]
+
+
+def _get_table_file(name: str, num_directions: int, version: str) -> str:
+    """
+    Returns the file name of a table array. The 8-heading lattice is stored separately from the default one
+    """
+    if num_directions == 4:
+        return f"free_space_{name}_{version}.npy"
+    return f"free_space{num_directions}_{name}_{version}.npy"
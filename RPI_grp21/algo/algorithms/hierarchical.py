@@ -0,0 +1,243 @@
+from typing import Union
+import heapq
+import math
+from algo.entities.entity import CellState
+from algo.tools.consts import CLUSTER_SIZE, TURN_DISPLACEMENT
+from algo.tools.movement import Direction, Motion
+
+"""
+HPA*-style hierarchical pathfinding over the motion lattice of a MazeSolver, for larger arenas where a flat search is too slow.
+
+1. The arena is split into square clusters of CLUSTER_SIZE x CLUSTER_SIZE cells.
+2. Wherever the robot can drive straight across a cluster border, entrances are placed in the middle of each open stretch of the border,
+   and also at both ends of long stretches. Both states of the crossing (one on each side, facing across the border) become abstract nodes.
+3. Paths between abstract nodes of the same cluster are searched within the cluster once and cached.
+   Turns displace the robot by up to TURN_DISPLACEMENT[0] cells, so searches may leave a cluster by that margin to manoeuvre near its borders.
+4. A query connects start and end to the abstract graph, finds the cheapest abstract path, and then refines it
+   into a lattice path by joining the cached paths along it. Only the clusters the abstract path passes through are refined.
+"""
+
+State = tuple[int, int, Direction]
+
+
+class HierarchicalPlanner:
+    """
+    Hierarchical path planner that records its paths into the path, cost and motion tables of a MazeSolver
+    """
+
+    def __init__(self, maze_solver, cluster_size: int = CLUSTER_SIZE) -> None:
+        """
+        Args:
+            maze_solver (MazeSolver): solver that provides the grid, the motion lattice and the tables to record paths into
+            cluster_size (int): width and height of a cluster in cells. Default is CLUSTER_SIZE
+        """
+        self.maze_solver = maze_solver
+        self.cluster_size: int = cluster_size
+
+        # abstract graph, built on the first query since it depends on the obstacles
+        self.built: bool = False
+        self.cluster_nodes: dict[tuple[int, int], list[State]] = {}
+        # crossing edges (neighbor, cost) between abstract nodes of adjacent clusters
+        self.crossing_edges: dict[State, list[tuple[State, int]]] = {}
+        # cost from each abstract node (and query start state) to every state of its cluster, and the parent state and motion on the cached path
+        self.cluster_dists: dict[State, dict[State, int]] = {}
+        self.cluster_parents: dict[State, dict[State, tuple[State, Motion]]] = {}
+
+    def cluster(self, x: int, y: int) -> tuple[int, int]:
+        """
+        Returns the cluster that cell (x, y) belongs to
+        """
+        return x // self.cluster_size, y // self.cluster_size
+
+    def search(self, start: CellState, end: CellState) -> None:
+        """
+        Find a path from start to end and record it in the tables of the MazeSolver.
+        If the abstract graph does not connect start and end, no path is recorded, the same as for an unreachable end state.
+        A flat search is not used as a fallback, since proving that a state is unreachable means exploring the whole arena.
+        """
+        maze_solver = self.maze_solver
+        if (start, end) in maze_solver.path_table or maze_solver._free_space_shortcut(start, end):
+            return
+        maze_solver.stats.pairwise_searches += 1
+        if not self.built:
+            self._build()
+
+        start_key = (start.x, start.y, start.direction)
+        end_key = (end.x, end.y, end.direction)
+
+        # connect the start state to the abstract nodes of its cluster. cached since every view state starts several queries
+        if start_key not in self.cluster_dists:
+            self.cluster_dists[start_key], self.cluster_parents[start_key] = self._restricted_search(
+                start_key, {self.cluster(start.x, start.y)})
+
+        # Dijkstra over the abstract graph
+        # the parent of each abstract node is stored with the parent dict of the cached path leading to it, None for crossing edges
+        g_dist = {start_key: 0}
+        parent = {}
+        visited = set()
+        heap = [(0, start_key)]
+        while heap:
+            dist, state = heapq.heappop(heap)
+            if state in visited:
+                continue
+            if state == end_key:
+                break
+            visited.add(state)
+            maze_solver.stats.nodes_expanded += 1
+
+            dists, parents = self.cluster_dists[state], self.cluster_parents[state]
+            successors = [(node, cost, None)
+                          for node, cost in self.crossing_edges.get(state, [])]
+            successors.extend((node, dists[node], parents) for node in self.cluster_nodes.get(
+                self.cluster(state[0], state[1]), []) if node != state and node in dists)
+            if end_key in dists:
+                successors.append((end_key, dists[end_key], parents))
+
+            for new_state, cost, parents in successors:
+                if new_state in visited:
+                    continue
+                if new_state not in g_dist or g_dist[new_state] > dist + cost:
+                    g_dist[new_state] = dist + cost
+                    parent[new_state] = (state, parents)
+                    heapq.heappush(heap, (dist + cost, new_state))
+                    maze_solver.stats.heap_pushes += 1
+
+        if end_key not in g_dist:
+            return
+
+        # refine the abstract path by joining the cached paths along it
+        path = [end_key]
+        while path[-1] in parent:
+            prev_node, parents = parent[path[-1]]
+            if parents is not None:
+                # walk back along the cached path within the cluster
+                while path[-1] != prev_node:
+                    prev_state, motion = parents[path[-1]]
+                    maze_solver._record_motion(*prev_state, *path[-1], motion)
+                    path.append(prev_state)
+            else:
+                # crossing motions were recorded while building the abstract graph
+                path.append(prev_node)
+
+        # the screenshot penalty is paid when arriving at the end state
+        cost = g_dist[end_key] + (end.penalty if start_key != end_key else 0)
+        maze_solver._store_path(start, end, path[::-1], cost)
+
+    def _build(self) -> None:
+        """
+        Place entrances on all cluster borders and cache the paths between abstract nodes within each cluster
+        """
+        grid = self.maze_solver.grid
+
+        # vertical borders are crossed facing east/west, horizontal borders facing north/south
+        borders = []
+        for border_x in range(self.cluster_size, grid.size_x, self.cluster_size):
+            borders.append([((border_x - 1, y), (border_x, y))
+                           for y in range(grid.size_y)])
+        for border_y in range(self.cluster_size, grid.size_y, self.cluster_size):
+            borders.append([((x, border_y - 1), (x, border_y))
+                           for x in range(grid.size_x)])
+
+        for border in borders:
+            (x1, y1), (x2, y2) = border[0]
+            directions = [Direction.EAST, Direction.WEST] if x1 != x2 else [
+                Direction.NORTH, Direction.SOUTH]
+
+            # split the border into stretches where the robot can drive straight across
+            stretches, stretch = [], []
+            for cell, next_cell in border:
+                if grid.reachable(*cell) and grid.reachable(*next_cell):
+                    stretch.append((cell, next_cell))
+                elif stretch:
+                    stretches.append(stretch)
+                    stretch = []
+            if stretch:
+                stretches.append(stretch)
+
+            # one entrance in the middle of each stretch, and at both ends of long stretches
+            entrances = []
+            for stretch in stretches:
+                entrances.append(stretch[len(stretch) // 2])
+                if len(stretch) >= self.cluster_size // 2:
+                    entrances.extend([stretch[0], stretch[-1]])
+
+            for cell, next_cell in entrances:
+                for direction in directions:
+                    first, second = (*cell, direction), (*next_cell, direction)
+                    for state, other in [(first, second), (second, first)]:
+                        cost = self._crossing_cost(state, other)
+                        if cost is None:
+                            continue
+                        if state not in self.crossing_edges:
+                            self.crossing_edges[state] = []
+                            self.cluster_nodes.setdefault(
+                                self.cluster(state[0], state[1]), []).append(state)
+                        self.crossing_edges[state].append((other, cost))
+
+        # cache the paths from every abstract node to every state of its cluster
+        for cluster, nodes in self.cluster_nodes.items():
+            for node in nodes:
+                self.cluster_dists[node], self.cluster_parents[node] = self._restricted_search(node, {
+                                                                                               cluster})
+
+        self.built = True
+
+    def _cells_around(self, clusters: set[tuple[int, int]]) -> set[tuple[int, int]]:
+        """
+        Returns the cells that lie in one of the clusters, or within TURN_DISPLACEMENT[0] cells of one
+        """
+        margin = TURN_DISPLACEMENT[0]
+        cells = set()
+        for cluster_x, cluster_y in clusters:
+            for x in range(cluster_x * self.cluster_size - margin, (cluster_x + 1) * self.cluster_size + margin):
+                for y in range(cluster_y * self.cluster_size - margin, (cluster_y + 1) * self.cluster_size + margin):
+                    cells.add((x, y))
+        return cells
+
+    def _crossing_cost(self, state: State, other: State) -> Union[int, None]:
+        """
+        Returns the cost of the straight motion from state to other, or None if the robot cannot make it
+        """
+        for new_x, new_y, new_direction, safe_cost, motion in self.maze_solver._get_neighboring_states(*state):
+            if (new_x, new_y, new_direction) == other:
+                self.maze_solver._record_motion(
+                    *state, new_x, new_y, new_direction, motion)
+                return self.maze_solver._motion_cost(state[2], new_direction, motion, safe_cost)
+        return None
+
+    def _restricted_search(
+            self, start: State, clusters: set[tuple[int, int]]
+    ) -> tuple[dict[State, int], dict[State, tuple[State, Motion]]]:
+        """
+        Dijkstra search from start over the lattice states whose cell lies in, or just around, one of the given clusters
+
+        Returns:
+            tuple[dict[State, int], dict[State, tuple[State, Motion]]]: cost to each reached state, and its parent state and motion
+        """
+        maze_solver = self.maze_solver
+        cells = self._cells_around(clusters)
+
+        g_dist = {start: 0}
+        parent = {}
+        visited = set()
+        heap = [(0, start)]
+        while heap:
+            dist, state = heapq.heappop(heap)
+            if state in visited:
+                continue
+            visited.add(state)
+            maze_solver.stats.nodes_expanded += 1
+
+            x, y, direction = state
+            for new_x, new_y, new_direction, motion_cost, motion in maze_solver._get_neighboring_edges(x, y, direction):
+                new_state = (new_x, new_y, new_direction)
+                if new_state in visited or (new_x, new_y) not in cells:
+                    continue
+                new_dist = dist + motion_cost
+                if new_dist < g_dist.get(new_state, math.inf):
+                    g_dist[new_state] = new_dist
+                    parent[new_state] = (state, motion)
+                    heapq.heappush(heap, (new_dist, new_state))
+                    maze_solver.stats.heap_pushes += 1
+
+        return g_dist, parent
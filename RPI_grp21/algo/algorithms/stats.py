@@ -0,0 +1,92 @@
+from contextlib import contextmanager
+import statistics
+import time
+from typing import Union
+
+"""
+Counters and per-phase timers of a MazeSolver, to see where planning time goes on each layout.
+
+Phases:
+    - view_states: generating and pruning the view states of the obstacles
+    - pairwise_search: searching the paths between all pairs of view states
+    - tsp: solving the TSP for every combination of view states
+    - path_reconstruction: joining the pairwise paths of the best tour into the optimal path, and converting it into motions
+"""
+
+PHASES: list[str] = ["view_states", "pairwise_search",
+                     "tsp", "path_reconstruction"]
+
+
+class PlannerStats:
+    """
+    Statistics collected by a MazeSolver while planning
+    """
+
+    def __init__(self) -> None:
+        # states popped from a search heap and expanded, and states pushed onto a search heap
+        self.nodes_expanded: int = 0
+        self.heap_pushes: int = 0
+        # lookups of the neighbors (and their motion costs) of a state that were found in the caches
+        self.neighbor_cache_hits: int = 0
+        self.neighbor_cache_misses: int = 0
+        # checks of robot positions against the obstacles, counted by the Grid
+        self.collision_checks: int = 0
+        # searches between pairs of states, and pairs taken from the obstacle-free table instead
+        self.pairwise_searches: int = 0
+        self.free_space_shortcuts: int = 0
+        # combinations of view states whose TSP was solved, and those that did not improve on the best tour
+        self.combinations_evaluated: int = 0
+        self.combinations_pruned: int = 0
+        self.view_states_pruned: int = 0
+        self.lk_calls: int = 0
+        # seconds spent in each phase, and the phase being timed, eg. to report progress
+        self.phase_times: dict[str, float] = {phase: 0.0 for phase in PHASES}
+        self.current_phase: Union[str, None] = None
+
+    @contextmanager
+    def timer(self, phase: str):
+        """
+        Add the time spent in the with block to a phase
+        """
+        start = time.perf_counter()
+        previous_phase, self.current_phase = self.current_phase, phase
+        try:
+            yield
+        finally:
+            self.phase_times[phase] += time.perf_counter() - start
+            self.current_phase = previous_phase
+
+    def to_dict(self) -> dict:
+        """
+        Returns the statistics as a dictionary, with phase times rounded to microseconds
+        """
+        stats = {key: value for key, value in vars(self).items()
+                 if key not in ("phase_times", "current_phase")}
+        stats["phase_times"] = {phase: round(seconds, 6)
+                                for phase, seconds in self.phase_times.items()}
+        return stats
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Returns the q-th percentile (0 to 100) of the values, interpolating between the closest ranks
+    """
+    values = sorted(values)
+    rank = (len(values) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    """
+    Returns the min, p50, p95, max, mean and standard deviation of the values
+    """
+    return {
+        "min": min(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "max": max(values),
+        "mean": statistics.mean(values),
+        "std": statistics.pstdev(values),
+    }
@@ -0,0 +1,146 @@
+import argparse
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+import os
+import sys
+# Allows Python to find packages
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from algo.algorithms.algo import MazeSolver  # nopep8
+from algo.algorithms.stats import percentile  # nopep8
+from algo.tools.commands import CommandGenerator  # nopep8
+from algo.tools.layouts import load_layouts  # nopep8
+from algo.tools.movement import Direction  # nopep8
+from algo.tools.optimizer import CommandOptimizer  # nopep8
+from algo.tools.timing import CommandTimingModel  # nopep8
+
+"""
+Benchmark the planner on every layout of the web simulator (see `tools/layouts.py`).
+
+Each layout is planned `--runs` times with a fresh MazeSolver (the obstacle-free tables are loaded once, like in the API),
+and one more time under tracemalloc to measure peak memory. Results are written as JSON, and compared against a previous results file with `--compare`.
+
+Usage:
+    python benchmark.py [--runs 5] [--layouts Obstacles5 Obstacles8_A] [--cost-model] [--output results.json] [--compare baseline.json]
+"""
+
+
+def plan(obstacles: list[dict], cost_model) -> tuple[MazeSolver, float, list[str], int]:
+    """
+    Plan a path and generate commands for a layout, with the robot at (1, 1) facing north
+
+    Returns:
+        tuple[MazeSolver, float, list[str], int]: the solver, the cost of the optimal path, the generated commands and the no. of obstacles scanned
+    """
+    maze_solver = MazeSolver(size_x=20, size_y=20, robot_x=1, robot_y=1,
+                             robot_direction=Direction.NORTH, cost_model=cost_model)
+    for ob in obstacles:
+        maze_solver.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
+
+    optimal_path, cost = maze_solver.get_optimal_path()
+    motions, obstacle_id_with_signals, scanned_obstacles = maze_solver.optimal_path_to_motion_path(
+        optimal_path)
+    commands = CommandGenerator().generate_commands(
+        motions, obstacle_id_with_signals, scanned_obstacles, optimal_path)
+    return maze_solver, cost, commands, len(scanned_obstacles)
+
+
+def benchmark_layout(obstacles: list[dict], runs: int, cost_model, command_optimizer: CommandOptimizer) -> dict:
+    """
+    Benchmark the planner on a layout
+    """
+    runtimes = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        maze_solver, cost, commands, scanned = plan(obstacles, cost_model)
+        runtimes.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    plan(obstacles, cost_model)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    optimized_commands, _ = command_optimizer.optimize(commands)
+    return {
+        "obstacles": len(obstacles),
+        "scanned": scanned,
+        "p50": round(percentile(runtimes, 50), 4),
+        "p95": round(percentile(runtimes, 95), 4),
+        "mean": round(statistics.mean(runtimes), 4),
+        "cost": cost,
+        "commands": len(commands),
+        "optimized_commands": len(optimized_commands),
+        "predicted_time": round(command_optimizer.timing_model.commands_time(optimized_commands), 2),
+        "peak_memory_mb": round(peak_memory / 2**20, 2),
+        "stats": maze_solver.get_stats(),
+    }
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """
+    Print the change of each metric of the layouts found in both results
+    """
+    print(f"\n{'layout':32}{'p50':>18}{'p95':>18}{'cost':>18}{'commands':>14}")
+    for name, result in results["layouts"].items():
+        base = baseline["layouts"].get(name)
+        if base is None or "error" in result or "error" in base:
+            continue
+        row = f"{name:32}"
+        for key, width in [("p50", 18), ("p95", 18), ("cost", 18), ("commands", 14)]:
+            change = result[key] - base[key]
+            percent = f" ({100 * change / base[key]:+.0f}%)" if base[key] else ""
+            row += f"{f'{change:+.4g}{percent}':>{width}}"
+        print(row)
+
+
+parser = argparse.ArgumentParser(
+    description="Benchmark the planner on the layouts of the web simulator")
+parser.add_argument("--runs", type=int, default=5,
+                    help="no. of timed runs per layout")
+parser.add_argument("--layouts", nargs="*",
+                    help="only benchmark layouts whose names start with one of these prefixes")
+parser.add_argument("--cost-model", action="store_true",
+                    help="plan with the calibrated execution-time cost model, like the API")
+parser.add_argument("--output", default="benchmark_results.json",
+                    help="file to write the results into")
+parser.add_argument("--compare", help="previous results file to compare against")
+args = parser.parse_args()
+
+cost_model = CommandTimingModel.load() if args.cost_model else None
+command_optimizer = CommandOptimizer(timing_model=cost_model)
+layouts = {name: obstacles for name, obstacles in load_layouts().items()
+           if not args.layouts or name.startswith(tuple(args.layouts))}
+
+results = {
+    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    "python": platform.python_version(),
+    "machine": platform.machine(),
+    "runs": args.runs,
+    "cost_model": args.cost_model,
+    "layouts": {},
+}
+print(f"{'layout':32}{'p50 (s)':>10}{'p95 (s)':>10}{'cost':>10}{'commands':>10}{'memory (MB)':>13}")
+for name, obstacles in layouts.items():
+    if not obstacles:
+        continue
+    try:
+        result = benchmark_layout(obstacles, args.runs,
+                                  cost_model, command_optimizer)
+    except Exception as error:
+        # keep benchmarking the other layouts, eg. if no obstacle can be reached
+        results["layouts"][name] = {"error": repr(error)}
+        print(f"{name:32}{repr(error)}")
+        continue
+    results["layouts"][name] = result
+    print(f"{name:32}{result['p50']:>10}{result['p95']:>10}{result['cost']:>10}{result['commands']:>10}{result['peak_memory_mb']:>13}")
+
+with open(args.output, "w") as f:
+    json.dump(results, f, indent=2)
+print(f"Saved results into '{args.output}'")
+
+if args.compare:
+    with open(args.compare) as f:
+        compare(results, json.load(f))
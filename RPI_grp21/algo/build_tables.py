@@ -0,0 +1,19 @@
+import time
+
+import os
+import sys
+# Allows Python to find packages
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from algo.algorithms.free_space import build_free_space_table, get_lattice_version, save_free_space_table, TABLE_DIR  # nopep8
+from algo.tools.timing import CommandTimingModel  # nopep8
+
+# default lattice, the 8-heading lattice used by MazeSolver(eight_headings=True),
+# and the default lattice priced by the calibrated execution-time model, which the API plans with
+for num_directions, cost_model in [(4, None), (8, None), (4, CommandTimingModel.load())]:
+    start = time.time()
+    version = get_lattice_version(cost_model)
+    table = build_free_space_table(num_directions, cost_model)
+    save_free_space_table(table, version)
+    print(
+        f"Time taken to build obstacle-free {num_directions}-heading lattice table: {time.time() - start}s")
+    print(f"Saved table version {version} into '{TABLE_DIR}'")
@@ -0,0 +1,16 @@
+import os
+import sys
+# Allows Python to find packages
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from algo.tools.timing import CALIBRATION_FILE, CommandTimingModel, fit_command_timings  # nopep8
+
+# RPI log file with the timestamps of commands sent to the STM. Default is the log file written by the RPI package
+log_file = sys.argv[1] if len(sys.argv) > 1 else "logfile.txt"
+
+with open(log_file, encoding="utf-8", errors="ignore") as f:
+    calibration = fit_command_timings(f)
+
+CommandTimingModel(calibration).save()
+for kind, (fixed, per_unit) in calibration.items():
+    print(f"{kind}: {fixed}s + {per_unit}s * val / speed")
+print(f"Saved calibration table into '{CALIBRATION_FILE}'")
@@ -1,8 +1,17 @@
 from typing import Union
-from algo.tools.consts import SCREENSHOT_COST, DISTANCE_COST, PADDING, TURN_PADDING, MID_TURN_PADDING, ARENA_HEIGHT, ARENA_WIDTH, OFFSET, MIN_CLEARANCE, OBSTACLE_SIZE
-from algo.tools.movement import Direction
+from algo.tools.consts import PADDING, TURN_PADDING, MID_TURN_PADDING, ARENA_HEIGHT, ARENA_WIDTH, OFFSET, MIN_CLEARANCE, OBSTACLE_SIZE, VIEW_STATE_OFFSETS
+from algo.tools.movement import Direction, HEADING_VECTORS
+from algo.tools.params import PlannerParams
 from math import sqrt
 
+# direction (dx, dy) from an obstacle to the robot viewing its image, and the direction the robot faces, by the direction of the obstacle
+VIEW_DIRECTIONS: dict[Direction, tuple[int, int, Direction]] = {
+    Direction.NORTH: (0, 1, Direction.SOUTH),
+    Direction.SOUTH: (0, -1, Direction.NORTH),
+    Direction.EAST: (1, 0, Direction.WEST),
+    Direction.WEST: (-1, 0, Direction.EAST),
+}
+
 
 class CellState:
     """Base class for all objects on the arena, such as cells, obstacles, etc"""
@@ -48,119 +57,69 @@ class Obstacle(CellState):
         """
         return self.x == other.x and self.y == other.y and self.direction == other.direction
 
-    def get_view_state(self) -> list[CellState]:
+    def get_view_state(
+            self, size_x: int = ARENA_WIDTH, size_y: int = ARENA_HEIGHT, offsets: list[tuple[int, int]] = VIEW_STATE_OFFSETS,
+            params: Union[PlannerParams, None] = None
+    ) -> list[CellState]:
         """
         Constructs the list of CellStates from which the robot can view the image on the obstacle properly.
-        Currently checks a T shape of grids in front of the image
-        TODO: Tune the possible view states based on testing. More view states means a longer algo runtime
+        By default checks a T shape of grids in front of the image, see VIEW_STATE_OFFSETS for denser sampling.
+        Candidates that are unreachable or dominated are pruned by the MazeSolver before solving the TSP.
+
+        Args:
+            size_x (int): size of the arena in the x direction. Default is ARENA_WIDTH
+            size_y (int): size of the arena in the y direction. Default is ARENA_HEIGHT
+            offsets (list[tuple[int, int]]): (lateral offset, extra distance) in cells of each candidate. Default is VIEW_STATE_OFFSETS
+            params (PlannerParams): costs of the view state penalties. Default is PlannerParams()
 
         Returns:
             list[CellState]: Valid cell states where robot can be positioned to view the symbol on the obstacle
         """
         cells = []
-
-        # If the obstacle is facing north, then robot's cell state must be facing south
-        if self.direction == Direction.NORTH:
-            positions = [
-                # robot camera is left of obstacle
-                (self.x - 1, self.y + MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET),
-                # robot camera is right of obstacle
-                (self.x + 1, self.y + MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET),
-                # robot camera is positioned just nice from obstacle
-                (self.x, self.y + MIN_CLEARANCE + 1 + OBSTACLE_SIZE + OFFSET),
-                # robot camera is close to obstacle
-                (self.x, self.y + MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET),
-            ]
-            costs = [
-                SCREENSHOT_COST + DISTANCE_COST,        # robot camera is left of obstacle
-                SCREENSHOT_COST + DISTANCE_COST,        # robot camera is right of obstacle
-                0,                                      # robot camera is positioned just nice
-                DISTANCE_COST,                          # robot camera is close to obstacle
-            ]
-
-            for idx, pos in enumerate(positions):
-                if self.is_valid_position(*pos):
-                    cells.append(
-                        CellState(*pos, Direction.SOUTH,
-                                  self.obstacle_id, costs[idx])
-                    )
-
-        # If obstacle is facing south, then robot's cell state must be facing north
-        elif self.direction == Direction.SOUTH:
-            positions = [
-                (self.x + 1, self.y - MIN_CLEARANCE - OBSTACLE_SIZE - OFFSET),
-                (self.x - 1, self.y - MIN_CLEARANCE - OBSTACLE_SIZE - OFFSET),
-                (self.x, self.y - MIN_CLEARANCE - 1 - OBSTACLE_SIZE - OFFSET),
-                (self.x, self.y - MIN_CLEARANCE - OBSTACLE_SIZE - OFFSET),
-            ]
-            costs = [
-                SCREENSHOT_COST + DISTANCE_COST,
-                SCREENSHOT_COST + DISTANCE_COST,
-                0,
-                DISTANCE_COST,
-            ]
-
-            for idx, pos in enumerate(positions):
-                if self.is_valid_position(*pos):
-                    cells.append(
-                        CellState(*pos, Direction.NORTH,
-                                  self.obstacle_id, costs[idx])
-                    )
-
-        # If obstacle is facing east, then robot's cell state must be facing west
-        elif self.direction == Direction.EAST:
-            positions = [
-                (self.x + MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET, self.y + 1),
-                (self.x + MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET, self.y - 1),
-                (self.x + MIN_CLEARANCE + 1 + OBSTACLE_SIZE + OFFSET, self.y),
-                (self.x + MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET, self.y),
-            ]
-            costs = [
-                SCREENSHOT_COST + DISTANCE_COST,
-                SCREENSHOT_COST + DISTANCE_COST,
-                0,
-                DISTANCE_COST,
-            ]
-
-            for idx, pos in enumerate(positions):
-                if self.is_valid_position(*pos):
-                    cells.append(
-                        CellState(*pos, Direction.WEST,
-                                  self.obstacle_id, costs[idx])
-                    )
-
-        # If obstacle is facing west, then robot's cell state must be facing east
-        elif self.direction == Direction.WEST:
-            positions = [
-                (self.x - MIN_CLEARANCE - OBSTACLE_SIZE - OFFSET, self.y + 1),
-                (self.x - MIN_CLEARANCE - OBSTACLE_SIZE - OFFSET, self.y - 1),
-                (self.x - MIN_CLEARANCE - 1 - OBSTACLE_SIZE - OFFSET, self.y),
-                (self.x - MIN_CLEARANCE - OBSTACLE_SIZE - OFFSET, self.y),
-            ]
-            costs = [
-                SCREENSHOT_COST + DISTANCE_COST,
-                SCREENSHOT_COST + DISTANCE_COST,
-                0,
-                DISTANCE_COST,
-            ]
-
-            for idx, pos in enumerate(positions):
-                if self.is_valid_position(*pos):
-                    cells.append(
-                        CellState(*pos, Direction.EAST,
-                                  self.obstacle_id, costs[idx])
-                    )
+        if self.direction not in VIEW_DIRECTIONS:
+            return cells
+
+        # the robot faces the image, so it faces the opposite direction of the obstacle
+        dx, dy, robot_direction = VIEW_DIRECTIONS[self.direction]
+        for lateral, extra in offsets:
+            # no. of cells from the obstacle to the robot's center. extra = 0 is the closest the robot can be
+            distance = MIN_CLEARANCE + extra + OBSTACLE_SIZE + OFFSET
+            pos = (self.x + distance * dx + lateral * dy,
+                   self.y + distance * dy - lateral * dx)
+            if self.is_valid_position(*pos, size_x, size_y):
+                cells.append(
+                    CellState(*pos, robot_direction, self.obstacle_id,
+                              Obstacle.get_view_penalty(lateral, extra, params))
+                )
         return cells
 
-    def is_valid_position(self, x: int, y: int) -> bool:
+    @staticmethod
+    def get_view_penalty(lateral: int, extra: int, params: Union[PlannerParams, None] = None) -> int:
+        """
+        Returns the penalty of viewing the image from a lateral offset and extra distance (in cells) in front of the obstacle
+        """
+        params = params if params else PlannerParams()
+        # robot camera is positioned just nice when it is centered 1 cell further than the closest distance
+        penalty = 0
+        if lateral != 0:
+            # robot camera is left/right of obstacle
+            penalty += params.screenshot_cost
+        if extra != 1:
+            # robot camera is too close to or too far from obstacle
+            penalty += params.distance_cost
+        return penalty
+
+    def is_valid_position(self, x: int, y: int, size_x: int = ARENA_WIDTH, size_y: int = ARENA_HEIGHT) -> bool:
         """
         Checks if given position of robot is within bounds
 
         Args:
             x (int): x-coordinate of robot (wrt center)
             y (int): y-coordinate of robot (wrt center)
+            size_x (int): size of the arena in the x direction. Default is ARENA_WIDTH
+            size_y (int): size of the arena in the y direction. Default is ARENA_HEIGHT
         """
-        return 0 < x < ARENA_WIDTH - 1 and 0 < y < ARENA_HEIGHT - 1
+        return 0 < x < size_x - 1 and 0 < y < size_y - 1
 
 
 class Grid:
@@ -177,6 +136,8 @@ class Grid:
         self.size_x = size_x
         self.size_y = size_y
         self.obstacles: list[Obstacle] = []
+        # no. of checks of robot positions against the obstacles, for planner statistics
+        self.collision_checks: int = 0
 
     def add_obstacle(self, obstacle: Obstacle) -> None:
         """
@@ -199,6 +160,7 @@ class Grid:
             x (int): x coordinate
             y (int): y coordinate
         """
+        self.collision_checks += 1
         if not self.is_valid_coord(x, y):
             return False
 
@@ -226,6 +188,7 @@ class Grid:
                 For each point, checks if the obstacle is within the padding distance
         """
 
+        self.collision_checks += 1
         points = self._get_turn_checking_points(x, y, new_x, new_y, direction)
 
         if not self.is_valid_coord(x, y) or not self.is_valid_coord(new_x, new_y):
@@ -258,13 +221,51 @@ class Grid:
 
         return True
 
+    def diagonal_reachable(
+        self, x: int, y: int, new_x: int, new_y: int, direction: Direction, new_direction: Direction
+    ) -> bool:
+        """
+        Checks if the robot can make a 45 degree turn or a diagonal straight-line motion from x, y facing direction to new_x, new_y facing new_direction
+        Logic:
+            Checks 3 things for the motion, the same as `turn_reachable`: pre-move, move, post-move
+            1. pre-move: if the obstacle is within the padding distance from the starting point
+            2. post-move: if the obstacle is within the padding distance from the end point, which must also be reachable from a straight movement
+            3. move:
+                Finds 3 points near the path followed by the robot during the motion
+                For each point, checks if the obstacle is within the padding distance
+        """
+        if not self.is_valid_coord(x, y) or not self.reachable(new_x, new_y):
+            return False
+
+        # the end point was counted by `reachable`
+        self.collision_checks += 1
+        points = self._get_diagonal_checking_points(
+            x, y, new_x, new_y, direction, new_direction)
+        for obstacle in self.obstacles:
+            # pre-move
+            if sqrt((obstacle.x - x)**2 + (obstacle.y - y)**2) < TURN_PADDING:
+                return False
+
+            # post-move
+            if sqrt((obstacle.x - new_x)**2 + (obstacle.y - new_y)**2) < TURN_PADDING:
+                return False
+
+            # move
+            for point in points:
+                if sqrt((obstacle.x - point[0])**2 + (obstacle.y - point[1])**2) < MID_TURN_PADDING:
+                    return False
+
+        return True
+
     def is_valid_coord(self, x: int, y: int) -> bool:
         """
         Checks if given position is within bounds
         """
         return 0 < x < self.size_x - 1 and 0 < y < self.size_y - 1
 
-    def get_view_obstacle_positions(self) -> list[list[CellState]]:
+    def get_view_obstacle_positions(
+            self, offsets: list[tuple[int, int]] = VIEW_STATE_OFFSETS, params: Union[PlannerParams, None] = None
+    ) -> list[list[CellState]]:
         """
         This function return a list of desired states for the robot to achieve based on the obstacle position and direction.
         The state is the position that the robot can see the image of the obstacle and is safe to reach without collision
@@ -276,7 +277,7 @@ class Grid:
             if obstacle.direction == Direction.SKIP:
                 continue
             else:
-                view_states = [view_state for view_state in obstacle.get_view_state() if
+                view_states = [view_state for view_state in obstacle.get_view_state(self.size_x, self.size_y, offsets, params) if
                                self.reachable(view_state.x, view_state.y)]
             optimal_positions.append(view_states)
         return optimal_positions
@@ -290,6 +291,34 @@ class Grid:
                 return obstacle
         return None
 
+    @staticmethod
+    def _get_diagonal_checking_points(
+        x: int, y: int, new_x: int, new_y: int, direction: Direction, new_direction: Direction
+    ) -> list[tuple[float, float]]:
+        """
+        Finds 3 points near the path followed by the robot during a 45 degree turn or a diagonal straight-line motion.
+
+        A diagonal straight-line motion follows the line between the starting point and end point, so the points are at 1/4, 1/2 and 3/4 of it.
+        A 45 degree turn moves along the starting heading and then along the new heading (see `_get_eight_heading_motions` in movement.py),
+        so the path bends at the corner point one heading vector from the starting point, forwards or backwards. The 3 points are calculated as follows:
+            1. p1x, p1y: the mid-point between the starting point and the corner point
+            2. p2x, p2y: the mid-point between the corner point and the mid-point of the starting point and end point
+            3. p3x, p3y: the mid-point between the corner point and the end point
+        """
+        if direction == new_direction:
+            return [(x + (new_x - x) * t, y + (new_y - y) * t) for t in (0.25, 0.5, 0.75)]
+
+        dx, dy = HEADING_VECTORS[direction]
+        # reverse turns move against the starting heading
+        sign = 1 if dx * (new_x - x) + dy * (new_y - y) > 0 else -1
+        corner_x, corner_y = x + sign * dx, y + sign * dy
+        mid_x, mid_y = (x + new_x) / 2, (y + new_y) / 2
+        return [
+            ((x + corner_x) / 2, (y + corner_y) / 2),
+            ((corner_x + mid_x) / 2, (corner_y + mid_y) / 2),
+            ((corner_x + new_x) / 2, (corner_y + new_y) / 2),
+        ]
+
     @staticmethod
     def _get_turn_checking_points(
         x: int, y: int, new_x: int, new_y: int, direction: Direction
@@ -0,0 +1,122 @@
+import argparse
+import csv
+import statistics
+import time
+
+import os
+import sys
+# Allows Python to find packages
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from algo.algorithms.algo import MazeSolver  # nopep8
+from algo.tools.consts import DENSE_VIEW_STATE_OFFSETS, VIEW_STATE_OFFSETS  # nopep8
+from algo.tools.layouts import random_layout  # nopep8
+from algo.tools.movement import Direction  # nopep8
+
+"""
+Scaling benchmark of the planner on random layouts (see `random_layout` in `tools/layouts.py`).
+
+For every arena size and no. of obstacles, `--seeds` random layouts are planned, and the runtime, search statistics and path cost of each are written to CSV.
+With `--plot`, the median runtime and node expansions against the no. of obstacles are plotted for each arena size,
+so a change in how the planner scales shows up before it is noticed in a timed run.
+
+Usage:
+    python sweep.py [--obstacles 1 15] [--sizes 20 30] [--seeds 3] [--view-states dense] [--hierarchical] [--output sweep.csv] [--plot]
+"""
+
+VIEW_STATES = {
+    "default": VIEW_STATE_OFFSETS,
+    "dense": DENSE_VIEW_STATE_OFFSETS,
+}
+
+FIELDS = ["size", "obstacles", "seed", "runtime", "cost", "scanned", "nodes_expanded", "heap_pushes",
+          "pairwise_searches", "free_space_shortcuts", "combinations_evaluated", "lk_calls"]
+
+
+def run(obstacles: list[dict], size: int, view_state_offsets: list[tuple[int, int]], hierarchical: bool) -> dict:
+    """
+    Plan a path for a layout, with the robot at (1, 1) facing north
+    """
+    maze_solver = MazeSolver(size_x=size, size_y=size, robot_x=1, robot_y=1, robot_direction=Direction.NORTH,
+                             view_state_offsets=view_state_offsets, hierarchical=hierarchical)
+    for ob in obstacles:
+        maze_solver.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
+
+    start = time.perf_counter()
+    optimal_path, cost = maze_solver.get_optimal_path()
+    runtime = time.perf_counter() - start
+    stats = maze_solver.get_stats()
+    return {
+        "runtime": round(runtime, 4),
+        "cost": cost,
+        "scanned": sum(state.screenshot_id is not None for state in optimal_path),
+        **{field: stats[field] for field in FIELDS if field in stats},
+    }
+
+
+def plot(rows: list[dict], output: str) -> None:
+    """
+    Plot the median runtime and node expansions against the no. of obstacles, with one line per arena size
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    for ax, field, label in [(axes[0], "runtime", "runtime (s)"), (axes[1], "nodes_expanded", "nodes expanded")]:
+        for size in sorted({row["size"] for row in rows}):
+            counts = sorted({row["obstacles"]
+                            for row in rows if row["size"] == size})
+            medians = [statistics.median(row[field] for row in rows if row["size"] == size and row["obstacles"] == count)
+                       for count in counts]
+            ax.plot(counts, medians, marker="o", label=f"{size}x{size}")
+        ax.set_xlabel("no. of obstacles")
+        ax.set_ylabel(label)
+        ax.set_yscale("log")
+        ax.legend()
+    fig.tight_layout()
+    fig.savefig(output)
+    print(f"Saved plot into '{output}'")
+
+
+parser = argparse.ArgumentParser(
+    description="Measure how the planner scales on random layouts")
+parser.add_argument("--obstacles", type=int, nargs=2, default=[1, 15], metavar=("MIN", "MAX"),
+                    help="range of the no. of obstacles")
+parser.add_argument("--sizes", type=int, nargs="+", default=[20],
+                    help="widths of the square arenas")
+parser.add_argument("--seeds", type=int, default=3,
+                    help="no. of random layouts per arena size and no. of obstacles")
+parser.add_argument("--view-states", choices=VIEW_STATES.keys(), default="default",
+                    help="view state sampling, see VIEW_STATE_OFFSETS in tools/consts.py")
+parser.add_argument("--hierarchical", action="store_true",
+                    help="plan over clusters, for larger arenas")
+parser.add_argument("--output", default="sweep.csv",
+                    help="CSV file to write the results into")
+parser.add_argument("--plot", action="store_true",
+                    help="also plot the results into a PNG next to the CSV file (requires matplotlib)")
+args = parser.parse_args()
+
+rows = []
+print(f"{'size':>6}{'obstacles':>11}{'seed':>6}{'runtime (s)':>13}{'expanded':>10}{'cost':>10}")
+for size in args.sizes:
+    for num_obstacles in range(args.obstacles[0], args.obstacles[1] + 1):
+        for seed in range(args.seeds):
+            try:
+                obstacles = random_layout(
+                    num_obstacles, size, size, seed=seed)
+            except ValueError as error:
+                print(error)
+                continue
+            row = {"size": size, "obstacles": num_obstacles, "seed": seed,
+                   **run(obstacles, size, VIEW_STATES[args.view_states], args.hierarchical)}
+            rows.append(row)
+            print(f"{size:>6}{num_obstacles:>11}{seed:>6}{row['runtime']:>13}{row['nodes_expanded']:>10}{row['cost']:>10}")
+
+with open(args.output, "w", newline="") as f:
+    writer = csv.DictWriter(f, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+print(f"Saved results into '{args.output}'")
+
+if args.plot and rows:
+    plot(rows, os.path.splitext(args.output)[0] + ".png")
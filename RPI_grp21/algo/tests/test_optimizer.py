@@ -0,0 +1,36 @@
+import os
+import sys
+
+# Allows Python to find the algo package from the repository root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from algo.tools.optimizer import CommandOptimizer  # nopep8
+
+"""
+Tests of the command optimizer. Run from the repository root with:
+    python -m pytest algo/tests
+"""
+
+
+def test_fused_straight_keeps_slow_approach_to_capture():
+    commands = ["T80|0|60", "T25|10|0.1", "T35|0|20", "SNAP1_C"]
+    optimized, _ = CommandOptimizer().optimize(commands)
+    straights = [CommandOptimizer.classify(command)
+                 for command in optimized if CommandOptimizer.classify(command)[0] == "straight"]
+    assert sum(dist for _, _, dist in straights) == 80
+    # the last straight before the capture is driven at the scheduled approach speed or slower
+    assert straights[-1][1] <= 35
+    assert optimized[-1] == "SNAP1_C"
+
+
+def test_fused_straight_is_never_faster_than_the_run():
+    commands = ["t25|0|4", "T80|0|120", "T25|0|3", "t30|-50|46"]
+    optimized, _ = CommandOptimizer().optimize(commands)
+    assert "T80|0|119" not in optimized
+    assert optimized[-1] == "t30|-50|46"
+
+
+def test_straights_of_equal_speed_are_fused():
+    optimized, report = CommandOptimizer().optimize(
+        ["T50|0|20", "T50|0|30", "FIN"])
+    assert optimized == ["T50|0|50", "FIN"]
+    assert report["commands_after"] == 2
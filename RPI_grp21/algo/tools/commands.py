@@ -1,6 +1,9 @@
+from typing import Union
+from math import sqrt
 from algo.tools.movement import Motion
 from algo.entities.entity import Obstacle
 from algo.tools.consts import OFFSET, OBSTACLE_SIZE, W_COMMAND_FLAG
+from algo.tools.speed import SpeedScheduler
 
 """
 Generate commands in format requested by STM (refer to commands_FLAGS.h in STM repo): 
@@ -48,16 +51,24 @@ class CommandGenerator:
     # unit distance
     UNIT_DIST: float = 10
 
-    def __init__(self, straight_speed: int = 50, turn_speed: int = 30) -> None:
+    # turn right on the spot to re-align servo after reversing
+    REVERSE_REALIGN = f"T{25}|{30}|{0.1}"
+
+    def __init__(self, straight_speed: int = 50, turn_speed: int = 30, speed_scheduler: Union[SpeedScheduler, None] = None) -> None:
         """
         A class to generate commands for the robot to follow
 
         range of speed: 0-100
+
+        Args:
+            speed_scheduler (SpeedScheduler): assigns the speed of forward straight-line runs by the free space around them.
+                Default is None, which drives every run at straight_speed
         """
         self.straight_speed: int = straight_speed
         self.turn_speed: int = turn_speed
+        self.speed_scheduler = speed_scheduler
 
-    def _generate_command(self, motion: Motion, num_motions: int = 1) -> list[str]:
+    def _generate_command(self, motion: Motion, num_motions: int = 1, speed: Union[int, None] = None) -> list[str]:
         """Generates movement commands based on motion type. 
 
         Tune accordingly to the robot's hardware. 
@@ -66,6 +77,7 @@ class CommandGenerator:
         Args:
             motion (Motion): Type of motion to execute.
             num_motions (int, optional): Number of repeated motions. Defaults to 1.
+            speed (int, optional): Speed of forward straight-line motions. Defaults to straight_speed.
 
         Returns:
             list[str]: List of command strings.
@@ -76,30 +88,15 @@ class CommandGenerator:
         else:
             dist = self.UNIT_DIST
 
-        if motion == Motion.FORWARD:
-            return [f"T{self.straight_speed}|{0}|{dist}"]
-        elif motion == Motion.REVERSE:
-            # return [f"{self.BACKWARD_DIST_TARGET}{self.straight_speed}{self.SEP}{0}{self.SEP}{dist}"]
-
-            # Servo tends to drift left when reversing so we force it to the right every 20cm intervals
-            realign_cmds = [
-                f"T{25}|{30}|{0.1}",
-            ]
-            cmds = []
-            # Re-align servo every 20cm
-            for _ in range(dist // 20):
-                cmds.append(
-                    f"t{35}|{0}|{20}")
-                cmds.extend(realign_cmds)
+        if motion in [Motion.FORWARD_DIAGONAL, Motion.REVERSE_DIAGONAL]:
+            # diagonal straight-line motions cross a cell corner to corner
+            dist = round(num_motions * self.UNIT_DIST * sqrt(2), 1)
 
-            remaining_dist = dist % 20
-            if remaining_dist > 0:
-                cmds.append(
-                    f"t{35}|{0}|{remaining_dist}")
-                # Re-align servo only for distances >= 5cm
-                if remaining_dist >= 5:
-                    cmds.extend(realign_cmds)
-            return cmds
+        if motion in [Motion.FORWARD, Motion.FORWARD_DIAGONAL]:
+            return [f"T{speed if speed else self.straight_speed}|{0}|{dist}"]
+        elif motion in [Motion.REVERSE, Motion.REVERSE_DIAGONAL]:
+            # return [f"{self.BACKWARD_DIST_TARGET}{self.straight_speed}{self.SEP}{0}{self.SEP}{dist}"]
+            return self._generate_reverse_commands(dist)
 
         # TODO tune commands according to actual robot's hardware.
         # commented out commands were the desired movement but because of hardware limitations we had to add additional commands to compensate
@@ -140,10 +137,51 @@ class CommandGenerator:
                 f"T{25}|{0}|{14}",
                 f"t{30}|{48}|{45.5}"
             ]
+        # 45 degree turns of the 8-heading lattice, same as `half_left` and `half_right` in rpi/constant/consts.py
+        elif motion == Motion.FORWARD_HALF_LEFT_TURN:
+            return [f"T{50}|{-45}|{47}"]
+        elif motion == Motion.FORWARD_HALF_RIGHT_TURN:
+            return [f"T{50}|{45}|{47}"]
+        elif motion == Motion.REVERSE_HALF_LEFT_TURN:
+            return [f"t{50}|{-45}|{47}"]
+        elif motion == Motion.REVERSE_HALF_RIGHT_TURN:
+            return [f"t{50}|{45}|{47}"]
         else:
             raise ValueError(
                 f"Invalid motion {motion}. This should never happen.")
 
+    def _generate_reverse_commands(self, dist: float) -> list[str]:
+        """
+        Generates commands to reverse in a straight line for a distance in cm
+        """
+        # Servo tends to drift left when reversing so we force it to the right every 20cm intervals
+        realign_cmds = [
+            self.REVERSE_REALIGN,
+        ]
+        cmds = []
+        # Re-align servo every 20cm
+        for _ in range(int(dist // 20)):
+            cmds.append(
+                f"t{35}|{0}|{20}")
+            cmds.extend(realign_cmds)
+
+        remaining_dist = round(dist % 20, 1)
+        if remaining_dist > 0:
+            cmds.append(
+                f"t{35}|{0}|{remaining_dist}")
+            # Re-align servo only for distances >= 5cm
+            if remaining_dist >= 5:
+                cmds.extend(realign_cmds)
+        return cmds
+
+    def _get_speed(self, motion: Motion, states: list) -> Union[int, None]:
+        """
+        Returns the scheduled speed of a forward straight-line run through the given states, or None to use the default speed
+        """
+        if self.speed_scheduler is None or motion not in [Motion.FORWARD, Motion.FORWARD_DIAGONAL]:
+            return None
+        return self.speed_scheduler.straight_speed(states)
+
     def _generate_away_command(self, view_state, obstacle: Obstacle) -> list[str]:
         """
             Generate commands to calibrate robot position before scanning obstacle
@@ -171,6 +209,8 @@ class CommandGenerator:
         prev_motion: Motion = motions[0]
         num_motions: int = 1
         snap_count: int = 0
+        # index of the start state of prev_motion in optimal_path
+        path_index: int = 0
         for motion in motions[1:]:
             # if combinable motions
             if motion == prev_motion and motion.is_combinable():
@@ -194,7 +234,9 @@ class CommandGenerator:
                     prev_motion = motion
                     continue
                 else:
-                    cur_cmd = self._generate_command(prev_motion, num_motions)
+                    cur_cmd = self._generate_command(prev_motion, num_motions, self._get_speed(
+                        prev_motion, optimal_path[path_index:path_index + num_motions + 1]))
+                    path_index += num_motions
                 commands.extend(cur_cmd)
                 num_motions = 1  # reset since new motion
             prev_motion = motion
@@ -213,7 +255,8 @@ class CommandGenerator:
             commands.append(
                 f"SNAP{obstacle_id_with_signals[snap_count]}")
         else:
-            cur_cmd = self._generate_command(prev_motion, num_motions)
+            cur_cmd = self._generate_command(prev_motion, num_motions, self._get_speed(
+                prev_motion, optimal_path[path_index:path_index + num_motions + 1]))
             commands.extend(cur_cmd)
 
         # add the final command
@@ -21,14 +21,21 @@ SCREENSHOT_COST: int = 100
 # the cost for when the robot is too close or too far from the obstacle
 DISTANCE_COST: int = 1000
 
-# Cost of turning the robot.
+# Cost of turning the robot by 90 degrees.
 # The higher the value, the less likely the robot is to turn.
+# A 45 degree turn in the 8-heading lattice costs TURN_FACTOR // 2 + 1 (see `PlannerParams.half_turn_factor`),
+# more than half of it, so the robot still prefers one 90 degree turn over two 45 degree turns.
 TURN_FACTOR: int = 5
 
 # Cost of reversing the robot.
 # The higher the value, the less likely the robot is to reverse.
 REVERSE_FACTOR: int = 0
 
+# Cost per predicted second of driving, when planning with an execution-time model (see `tools/timing.py`) instead of the factors above.
+# Motion costs are rounded to whole numbers since the TSP solver does not terminate reliably on fractional costs,
+# so costs are in tenths of a second, eg. an off-center screenshot (SCREENSHOT_COST) is worth 10s of driving.
+TIME_FACTOR: int = 10
+
 """
 No. of units the robot turns. This must be tuned based on real robot movement.
 eg. Motion.FORWARD_LEFT_TURN
@@ -56,5 +63,38 @@ PADDING: int = (OFFSET + 1) * EXPANDED_CELL
 # minimum number of cells away front of robot should be from obstacle in view state generation
 MIN_CLEARANCE: int = 1  # front of robot at least 10cm away
 
+# view state candidates of each obstacle, as (lateral offset, extra distance) in cells from the closest position directly in front of the image.
+# default is a T shape: left and right of the image at the closest distance, and centered at the closest distance and 1 cell further.
+# More view states means a longer algo runtime, so candidates that are unreachable or dominated are pruned before solving the TSP.
+VIEW_STATE_OFFSETS: list[tuple[int, int]] = [(-1, 0), (1, 0), (0, 1), (0, 0)]
+# denser sampling over 3 distances and 3 lateral offsets, for layouts where the default candidates are blocked
+DENSE_VIEW_STATE_OFFSETS: list[tuple[int, int]] = [
+    (lateral, extra) for extra in [1, 0, 2] for lateral in [0, -1, 1]]
+# max. no. of view states of each obstacle kept after pruning, and max. no. of combinations of one view state per obstacle.
+# the TSP is solved for every combination, so the worst view states of the obstacles with the most view states are dropped until the combinations fit
+MAX_VIEW_STATES: int = 5
+MAX_VIEW_STATE_COMBINATIONS: int = 4096
+
+# width and height (in 10 cm units) of a cluster for hierarchical planning on larger arenas.
+# larger clusters give shorter paths at the cost of a slower abstract graph construction
+CLUSTER_SIZE: int = 10
+
 # Use ultrasonic sensor for straight-line motions, to reset movement error build-up
 W_COMMAND_FLAG = 0  # 0: disable w/W commands, 1: enable w/W commands
+
+# Speeds (0-100) of straight-line commands for each surface the robot drives on, see `tools/speed.py`.
+# "fast" is the forward speed of manual commands in rpi/constant/consts.py (FORWARD_SPEED_INDOOR, FORWARD_SPEED_OUTDOOR).
+# "normal" is the default straight_speed of CommandGenerator, "slow" is used close to obstacles.
+SPEED_LIMITS: dict[str, dict[str, int]] = {
+    "indoor": {"slow": 40, "normal": 50, "fast": 80},
+    "outdoor": {"slow": 35, "normal": 50, "fast": 70},
+}
+SURFACE: str = "indoor"
+
+# min. no. of cells of a straight-line run, and min. distance (in cells) from the robot's center to every obstacle along it, to drive at "fast" speed
+FAST_MIN_CELLS: int = 3
+FAST_CLEARANCE: int = PADDING + 1
+# min. no. of cells of a "fast" run that ends at a view state, since the robot must stop accurately there to take the picture
+VIEW_STATE_FAST_MIN_CELLS: int = 2 * FAST_MIN_CELLS
+# drive at "slow" speed when the robot's center passes closer than this to an obstacle
+SLOW_CLEARANCE: float = PADDING + 0.5
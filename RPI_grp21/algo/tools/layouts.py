@@ -0,0 +1,117 @@
+import os
+import random
+import re
+from typing import Union
+from algo.entities.entity import Grid, Obstacle
+from algo.tools.consts import ARENA_WIDTH, ARENA_HEIGHT
+from algo.tools.movement import Direction
+
+"""
+Obstacle layouts of the web simulator (see `simulator/src/tests/`), shared with the Python benchmarks so both test the same arenas.
+Layouts are read from the TypeScript sources, so layouts added to the simulator are picked up without being copied over.
+Random layouts for scaling benchmarks are generated with `random_layout`.
+"""
+
+LAYOUT_DIR: str = os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "simulator", "src", "tests")
+
+# eg. export const Basic_Mock: AlgoTestDataInterface = { obstacles: [ ... ] };
+LAYOUT_PATTERN = re.compile(
+    r"export\s+const\s+(\w+)\s*:\s*AlgoTestDataInterface\s*=\s*\{\s*obstacles\s*:\s*\[(.*?)\]", re.DOTALL)
+# eg. { id: 1, x: 15, y: 10, d: Direction.WEST }
+OBSTACLE_PATTERN = re.compile(r"\{([^{}]*)\}")
+FIELD_PATTERN = re.compile(r"(\w+)\s*:\s*([\w.]+)")
+
+# min. Chebyshev distance (in cells) between obstacles of a random layout, so the robot (3 cells wide) can pass between them
+MIN_OBSTACLE_SPACING: int = 3
+# max. no. of random positions tried for each obstacle of a random layout
+MAX_PLACEMENT_ATTEMPTS: int = 1000
+
+
+def parse_layouts(source: str) -> dict[str, list[dict]]:
+    """
+    Parse the layouts defined in a TypeScript test file
+
+    Returns:
+        dict[str, list[dict]]: obstacles of each layout by the name of its constant, as dictionaries with keys "x", "y", "d" and "id" like requests to the API
+    """
+    layouts = {}
+    for name, body in LAYOUT_PATTERN.findall(source):
+        obstacles = []
+        for obstacle in OBSTACLE_PATTERN.findall(body):
+            fields = dict(FIELD_PATTERN.findall(obstacle))
+            d = fields["d"]
+            obstacles.append({
+                "x": int(fields["x"]),
+                "y": int(fields["y"]),
+                # eg. Direction.WEST
+                "d": Direction[d.split(".")[-1]] if "." in d else Direction(int(d)),
+                "id": int(fields["id"]),
+            })
+        layouts[name] = obstacles
+    return layouts
+
+
+def load_layouts(layout_dir: str = LAYOUT_DIR) -> dict[str, list[dict]]:
+    """
+    Load the layouts defined in every TypeScript test file of the simulator, in the order of the file names
+    """
+    layouts = {}
+    for file_name in sorted(os.listdir(layout_dir)):
+        if not file_name.endswith(".ts") or file_name == "index.ts":
+            continue
+        with open(os.path.join(layout_dir, file_name), encoding="utf-8") as f:
+            layouts.update(parse_layouts(f.read()))
+    return layouts
+
+
+def random_layout(
+        num_obstacles: int,
+        size_x: int = ARENA_WIDTH,
+        size_y: int = ARENA_HEIGHT,
+        seed: Union[int, None] = None,
+        min_spacing: int = MIN_OBSTACLE_SPACING,
+        robot_x: int = 1,
+        robot_y: int = 1,
+) -> list[dict]:
+    """
+    Generate a random valid layout: obstacles are inside the arena, at least `min_spacing` cells apart, clear of the robot's start position,
+    and each faces a direction with at least one reachable view state. The same seed always gives the same layout.
+
+    Args:
+        num_obstacles (int): no. of obstacles
+        size_x (int): size of the arena in the x direction. Default is ARENA_WIDTH
+        size_y (int): size of the arena in the y direction. Default is ARENA_HEIGHT
+        seed (int): seed of the random generator. Default is None, for a different layout every call
+        min_spacing (int): min. Chebyshev distance between obstacles. Default is MIN_OBSTACLE_SPACING
+        robot_x (int): x coordinate of the robot's start position. Default is 1
+        robot_y (int): y coordinate of the robot's start position. Default is 1
+
+    Returns:
+        list[dict]: obstacles as dictionaries with keys "x", "y", "d" and "id" like requests to the API
+
+    Raises:
+        ValueError: if an obstacle cannot be placed, eg. too many obstacles for the arena
+    """
+    rng = random.Random(seed)
+    grid = Grid(size_x, size_y)
+    obstacles = []
+    for obstacle_id in range(1, num_obstacles + 1):
+        for _ in range(MAX_PLACEMENT_ATTEMPTS):
+            x, y = rng.randrange(size_x), rng.randrange(size_y)
+            if any(max(abs(ob["x"] - x), abs(ob["y"] - y)) < min_spacing for ob in obstacles):
+                continue
+            direction = rng.choice(
+                [Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST])
+            obstacle = Obstacle(x, y, direction, obstacle_id)
+            grid.obstacles.append(obstacle)
+            # the robot must start clear of the obstacle, and every image must stay visible from a reachable position
+            if grid.reachable(robot_x, robot_y) and all(grid.get_view_obstacle_positions()):
+                obstacles.append(
+                    {"x": x, "y": y, "d": direction, "id": obstacle_id})
+                break
+            grid.obstacles.remove(obstacle)
+        else:
+            raise ValueError(
+                f"Could not place obstacle {obstacle_id} of {num_obstacles} on a {size_x}x{size_y} arena")
+    return obstacles
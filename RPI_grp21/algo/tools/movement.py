@@ -9,6 +9,12 @@ class Direction(int, Enum):
     WEST: int = 6
     SKIP: int = 8
 
+    # diagonal headings, only used by the 8-heading lattice
+    NORTH_EAST: int = 1
+    SOUTH_EAST: int = 3
+    SOUTH_WEST: int = 5
+    NORTH_WEST: int = 7
+
     def __int__(self) -> int:
         return self.value
 
@@ -68,6 +74,18 @@ MOVE_DIRECTION: list[tuple[int, int, Direction]] = [
     (0, -1, Direction.SOUTH),
 ]
 
+# unit grid vector (x, y) the robot moves along when driving straight in each heading
+HEADING_VECTORS: dict[Direction, tuple[int, int]] = {
+    Direction.NORTH: (0, 1),
+    Direction.NORTH_EAST: (1, 1),
+    Direction.EAST: (1, 0),
+    Direction.SOUTH_EAST: (1, -1),
+    Direction.SOUTH: (0, -1),
+    Direction.SOUTH_WEST: (-1, -1),
+    Direction.WEST: (-1, 0),
+    Direction.NORTH_WEST: (-1, 1),
+}
+
 
 class Motion(int, Enum):
     """
@@ -83,6 +101,15 @@ class Motion(int, Enum):
     REVERSE: int = 8
     REVERSE_RIGHT_TURN: int = 6
 
+    # 45 degree turns and diagonal straight-line motions, only used by the 8-heading lattice
+    FORWARD_HALF_LEFT_TURN: int = 1
+    FORWARD_HALF_RIGHT_TURN: int = 3
+    FORWARD_DIAGONAL: int = -2
+
+    REVERSE_HALF_LEFT_TURN: int = 9
+    REVERSE_HALF_RIGHT_TURN: int = 7
+    REVERSE_DIAGONAL: int = 12
+
     CAPTURE: int = 1000
 
     def __int__(self) -> int:
@@ -104,7 +131,7 @@ class Motion(int, Enum):
             return Motion.CAPTURE
 
         opp_val: int = 10 - self.value
-        if opp_val == 5 or opp_val < 0 or opp_val > 10:
+        if opp_val == 5 or opp_val < -2 or opp_val > 12:
             raise ValueError(
                 f"Invalid motion {self}. This should never happen.")
 
@@ -113,16 +140,68 @@ class Motion(int, Enum):
     def is_combinable(self) -> bool:
         if self == Motion.CAPTURE:
             return False
-        return self in [Motion.REVERSE, Motion.FORWARD]
+        return self in [Motion.REVERSE, Motion.FORWARD, Motion.REVERSE_DIAGONAL, Motion.FORWARD_DIAGONAL]
+
+    def is_half_turn(self) -> bool:
+        return self.value in HALF_TURN_VALUES
 
     def reverse_cost(self) -> int:
         if self == Motion.CAPTURE:
             raise ValueError("Capture motion does not have a reverse cost")
-        elif self in [
-            Motion.REVERSE_LEFT_TURN,
-            Motion.REVERSE_RIGHT_TURN,
-            Motion.REVERSE
-        ]:
+        elif self.value in REVERSE_VALUES:
             return 1
         else:
             return 0
+
+
+# values of the motions that drive backwards and that turn by 45 degrees.
+# compared by value since Motion overrides __eq__ and is not hashable, and these checks run for every edge of the search
+REVERSE_VALUES: frozenset[int] = frozenset(motion.value for motion in [
+    Motion.REVERSE_LEFT_TURN,
+    Motion.REVERSE_RIGHT_TURN,
+    Motion.REVERSE,
+    Motion.REVERSE_HALF_LEFT_TURN,
+    Motion.REVERSE_HALF_RIGHT_TURN,
+    Motion.REVERSE_DIAGONAL,
+])
+HALF_TURN_VALUES: frozenset[int] = frozenset(motion.value for motion in [
+    Motion.FORWARD_HALF_LEFT_TURN,
+    Motion.FORWARD_HALF_RIGHT_TURN,
+    Motion.REVERSE_HALF_LEFT_TURN,
+    Motion.REVERSE_HALF_RIGHT_TURN,
+])
+
+
+def _get_eight_heading_motions() -> dict[Direction, list[tuple[int, int, Direction, Motion]]]:
+    """
+    Precompute the motions the 8-heading lattice adds for each heading, as (dx, dy, new direction, motion).
+
+    A 45 degree turn between a straight and a diagonal heading moves the robot along the chord of the arc,
+    which is approximated by the sum of the two heading vectors, eg. north -> north east moves by (1, 2).
+    Forward left turns rotate the robot anti-clockwise and reverse left turns rotate it clockwise, the same as the 90 degree turns.
+    """
+    motions = {}
+    for direction, (dx, dy) in HEADING_VECTORS.items():
+        # headings 45 degrees anti-clockwise and clockwise of the current heading
+        left = Direction((direction.value - 1) % 8)
+        right = Direction((direction.value + 1) % 8)
+        left_dx, left_dy = dx + HEADING_VECTORS[left][0], dy + HEADING_VECTORS[left][1]
+        right_dx, right_dy = dx + HEADING_VECTORS[right][0], dy + HEADING_VECTORS[right][1]
+
+        motions[direction] = [
+            (left_dx, left_dy, left, Motion.FORWARD_HALF_LEFT_TURN),
+            (right_dx, right_dy, right, Motion.FORWARD_HALF_RIGHT_TURN),
+            (-right_dx, -right_dy, right, Motion.REVERSE_HALF_LEFT_TURN),
+            (-left_dx, -left_dy, left, Motion.REVERSE_HALF_RIGHT_TURN),
+        ]
+        # straight-line motions along the straight headings are already part of the 4-heading lattice
+        if dx and dy:
+            motions[direction].extend([
+                (dx, dy, direction, Motion.FORWARD_DIAGONAL),
+                (-dx, -dy, direction, Motion.REVERSE_DIAGONAL),
+            ])
+    return motions
+
+
+# motions added by the 8-heading lattice for each heading, computed once so neighbor generation is a table lookup
+EIGHT_HEADING_MOTIONS: dict[Direction, list[tuple[int, int, Direction, Motion]]] = _get_eight_heading_motions()
@@ -0,0 +1,137 @@
+from typing import Union
+from algo.tools.commands import CommandGenerator
+from algo.tools.timing import CommandTimingModel
+
+"""
+Post-generation optimizer of the STM command stream (see `commands.py` for the command format).
+
+Every command costs a serial round trip to the STM (send, then wait for FIN), so fewer commands make a faster run.
+Commands are classified by what they do to the robot:
+    - straight: T/t commands with no steering, moving the robot forward/backward in a straight line
+    - realign: T/t commands with steering but (almost) no distance, which re-centre the servo without moving the robot
+    - barrier: every other command (turns, W/w, SNAP, FIN), which the optimizer never moves commands across
+
+Within a run of straight and realign commands between two barriers, realigns do not displace the robot,
+so the straights can be moved past them and summed into a single net straight. This cancels forward/back pairs,
+eg. the short reverse at the end of a 3 point turn followed by a forward straight, and fuses straights on both sides of a turn boundary.
+The net straight is driven at the lowest speed of the run, so slow speeds scheduled near obstacles and captures (see `SpeedScheduler`) are kept,
+and the run is only replaced if that is predicted to be faster.
+"""
+
+# realign commands turn the wheels on the spot for at most this distance (in cm or degrees)
+REALIGN_MAX_VAL: float = 0.1
+
+
+class CommandOptimizer:
+    """
+    Fuses, reorders and cancels commands generated by a CommandGenerator
+    """
+
+    def __init__(self, command_generator: Union[CommandGenerator, None] = None, timing_model: Union[CommandTimingModel, None] = None) -> None:
+        """
+        Args:
+            command_generator (CommandGenerator): generator used to re-chunk net reverse straights. Default is CommandGenerator()
+            timing_model (CommandTimingModel): model to predict the time saved. Default is CommandTimingModel()
+        """
+        self.command_generator = command_generator if command_generator else CommandGenerator()
+        self.timing_model = timing_model if timing_model else CommandTimingModel(
+            command_generator=self.command_generator)
+
+    @staticmethod
+    def classify(command: str) -> tuple[str, float, float]:
+        """
+        Returns the kind of a command ("straight", "realign" or "barrier"), its speed, and its signed distance in cm
+        (positive forward, negative backward) for straight commands
+        """
+        parsed = CommandTimingModel.parse_command(command)
+        if parsed is None or parsed[0] == "away":
+            return "barrier", 0, 0
+        _, speed, val = parsed
+        if parsed[0] == "straight":
+            return "straight", speed, val if command[0] == CommandGenerator.FORWARD_DIST_TARGET else -val
+        if val <= REALIGN_MAX_VAL:
+            return "realign", speed, 0
+        return "barrier", 0, 0
+
+    def optimize(self, commands: list[str]) -> tuple[list[str], dict[str, float]]:
+        """
+        Optimize a list of commands
+
+        Returns:
+            tuple[list[str], dict[str, float]]: optimized commands, and a report of the no. of commands and predicted seconds before and after
+        """
+        optimized: list[str] = []
+        run: list[str] = []
+        for command in commands:
+            if CommandOptimizer.classify(command)[0] == "barrier":
+                optimized.extend(self._optimize_run(run))
+                optimized.append(command)
+                run = []
+            else:
+                run.append(command)
+        optimized.extend(self._optimize_run(run))
+
+        time_before = self.timing_model.commands_time(commands)
+        time_after = self.timing_model.commands_time(optimized)
+        report = {
+            "commands_before": len(commands),
+            "commands_after": len(optimized),
+            "time_before": round(time_before, 2),
+            "time_after": round(time_after, 2),
+            "time_saved": round(time_before - time_after, 2),
+        }
+        return optimized, report
+
+    def _optimize_run(self, run: list[str]) -> list[str]:
+        """
+        Replace a run of straight and realign commands by the realigns it needs and a single net straight
+        """
+        straights = []
+        # realigns that re-centre the servo after a turn. realigns after a reverse straight are regenerated with the net straight
+        kept_realigns = []
+        prev_kind = None
+        for command in run:
+            kind, speed, dist = CommandOptimizer.classify(command)
+            if kind == "straight":
+                straights.append((speed, dist))
+            elif not (prev_kind == "straight" and straights[-1][1] < 0):
+                kept_realigns.append(command)
+            prev_kind = kind
+
+        collapsed = CommandOptimizer._collapse_realigns(run)
+        if len(straights) < 2:
+            return collapsed
+
+        net_dist = round(float(sum(dist for _, dist in straights)), 1)
+        if net_dist.is_integer():
+            net_dist = int(net_dist)
+        # consecutive realigns re-centre the servo once
+        optimized = kept_realigns[-1:]
+        if net_dist > 0:
+            # never faster than any straight of the run, eg. the slow approach to a capture
+            speed = min(speed for speed, _ in straights)
+            optimized.append(
+                f"{CommandGenerator.FORWARD_DIST_TARGET}{int(speed)}{CommandGenerator.SEP}{0}{CommandGenerator.SEP}{net_dist}")
+        elif net_dist < 0:
+            optimized.extend(
+                self.command_generator._generate_reverse_commands(-net_dist))
+
+        # keep the run if it is already as short as the generator makes it, eg. a reverse split into chunks,
+        # or if driving all of it at the lowest speed takes longer than the round trips saved
+        if len(optimized) >= len(collapsed) or \
+                self.timing_model.commands_time(optimized) > self.timing_model.commands_time(collapsed):
+            return collapsed
+        return optimized
+
+    @staticmethod
+    def _collapse_realigns(run: list[str]) -> list[str]:
+        """
+        Keep only the last of consecutive realign commands
+        """
+        collapsed = []
+        for command in run:
+            if collapsed and CommandOptimizer.classify(command)[0] == "realign" and CommandOptimizer.classify(collapsed[-1])[0] == "realign":
+                collapsed[-1] = command
+            else:
+                collapsed.append(command)
+        return collapsed
@@ -0,0 +1,72 @@
+from algo.tools.consts import (
+    SAFE_COST,
+    SCREENSHOT_COST,
+    DISTANCE_COST,
+    TURN_FACTOR,
+    REVERSE_FACTOR,
+    ITERATIONS,
+)
+
+"""
+Tunable cost parameters of the planner, defaulting to the hand-tuned values in `consts.py`.
+Pass a PlannerParams to MazeSolver to plan with other values without editing the constants, eg. to sweep them with `tune.py`.
+The turn and reverse factors only price motions without an execution-time cost model: with one, motions are priced by their predicted time.
+"""
+
+PARAM_NAMES: list[str] = ["safe_cost", "screenshot_cost",
+                          "distance_cost", "turn_factor", "reverse_factor", "iterations"]
+
+
+class PlannerParams:
+    """
+    Cost parameters of a MazeSolver, see `consts.py` for what each of them does
+    """
+
+    def __init__(
+            self,
+            safe_cost: int = SAFE_COST,
+            screenshot_cost: int = SCREENSHOT_COST,
+            distance_cost: int = DISTANCE_COST,
+            turn_factor: int = TURN_FACTOR,
+            reverse_factor: int = REVERSE_FACTOR,
+            iterations: int = ITERATIONS,
+    ) -> None:
+        """
+        Args:
+            safe_cost (int): cost of moving next to an obstacle. Default is SAFE_COST
+            screenshot_cost (int): penalty of taking an image off center. Default is SCREENSHOT_COST
+            distance_cost (int): penalty of taking an image too close or too far. Default is DISTANCE_COST
+            turn_factor (int): cost of a 90 degree turn, unused with a cost model. Default is TURN_FACTOR
+            reverse_factor (int): cost of reversing, unused with a cost model. Default is REVERSE_FACTOR
+            iterations (int): max. no. of combinations of view states tried for each set of obstacles. Default is ITERATIONS
+        """
+        # costs must stay whole numbers, since the TSP solver does not terminate reliably on fractional costs
+        self.safe_cost: int = int(safe_cost)
+        self.screenshot_cost: int = int(screenshot_cost)
+        self.distance_cost: int = int(distance_cost)
+        self.turn_factor: int = int(turn_factor)
+        self.reverse_factor: int = int(reverse_factor)
+        self.iterations: int = int(iterations)
+
+    @property
+    def half_turn_factor(self) -> int:
+        """
+        Cost of a 45 degree turn in the 8-heading lattice: more than half of the turn factor,
+        so the robot prefers one 90 degree turn over two 45 degree turns whatever the turn factor
+        """
+        return self.turn_factor // 2 + 1
+
+    def has_default_motion_costs(self) -> bool:
+        """
+        Whether motions are priced like in the precomputed obstacle-free table, which is built with the default TURN_FACTOR and REVERSE_FACTOR
+        """
+        return self.turn_factor == TURN_FACTOR and self.reverse_factor == REVERSE_FACTOR
+
+    def to_dict(self) -> dict[str, int]:
+        """
+        Returns the parameters as a dictionary, eg. to write them next to sweep results
+        """
+        return {name: getattr(self, name) for name in PARAM_NAMES}
+
+    def __repr__(self) -> str:
+        return f"PlannerParams({', '.join(f'{name}={value}' for name, value in self.to_dict().items())})"
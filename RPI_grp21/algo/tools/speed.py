@@ -0,0 +1,58 @@
+from math import sqrt
+from algo.entities.entity import CellState, Grid
+from algo.tools.consts import SPEED_LIMITS, SURFACE, FAST_MIN_CELLS, FAST_CLEARANCE, VIEW_STATE_FAST_MIN_CELLS, SLOW_CLEARANCE
+
+"""
+Speed scheduling of straight-line commands by the free space around them.
+
+The clearance field holds the distance (in cells) from each cell to the nearest obstacle.
+Each straight-line run of the path is assigned a speed from SPEED_LIMITS of the surface:
+    - slow: the robot passes closer than SLOW_CLEARANCE to an obstacle
+    - fast: the run is at least FAST_MIN_CELLS long and stays FAST_CLEARANCE away from every obstacle.
+      Runs that end at a view state, where the robot must stop accurately to take the picture, must be at least VIEW_STATE_FAST_MIN_CELLS long
+    - normal: otherwise
+"""
+
+
+class SpeedScheduler:
+    """
+    Assigns speeds to straight-line runs of a path on a grid
+    """
+
+    def __init__(self, grid: Grid, surface: str = SURFACE) -> None:
+        """
+        Args:
+            grid (Grid): grid with the obstacles of the layout
+            surface (str): key of SPEED_LIMITS. Default is SURFACE
+        """
+        if surface not in SPEED_LIMITS:
+            raise ValueError(
+                f"Invalid surface {surface}. Must be one of {list(SPEED_LIMITS)}")
+        self.grid = grid
+        self.speeds: dict[str, int] = SPEED_LIMITS[surface]
+
+        # distance from each cell to the nearest obstacle, filled in lazily
+        self.clearance_field: dict[tuple[int, int], float] = {}
+
+    def clearance(self, x: int, y: int) -> float:
+        """
+        Returns the distance (in cells) from cell (x, y) to the nearest obstacle
+        """
+        if (x, y) not in self.clearance_field:
+            self.clearance_field[(x, y)] = min(
+                (sqrt((obstacle.x - x)**2 + (obstacle.y - y)**2)
+                 for obstacle in self.grid.obstacles),
+                default=float("inf"))
+        return self.clearance_field[(x, y)]
+
+    def straight_speed(self, states: list[CellState]) -> int:
+        """
+        Returns the speed of a straight-line run through the given states, from its start state to its end state
+        """
+        clearance = min(self.clearance(state.x, state.y) for state in states)
+        if clearance < SLOW_CLEARANCE:
+            return self.speeds["slow"]
+        min_cells = VIEW_STATE_FAST_MIN_CELLS if states[-1].screenshot_id is not None else FAST_MIN_CELLS
+        if len(states) - 1 >= min_cells and clearance >= FAST_CLEARANCE:
+            return self.speeds["fast"]
+        return self.speeds["normal"]
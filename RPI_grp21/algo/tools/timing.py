@@ -0,0 +1,264 @@
+from typing import Iterable, Union
+from datetime import datetime
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+import re
+import numpy as np
+from algo.tools.commands import CommandGenerator
+from algo.tools.movement import Motion
+
+"""
+Predicts how long the robot takes to execute STM commands (see `commands.py` for the command format).
+
+Each command takes a fixed time (serial round trip to the STM, accelerating and settling) plus a time proportional to
+its value (distance in cm for straight-line commands, angle in degrees for turns) divided by its speed:
+    seconds = fixed + per_unit * val / speed
+
+The (fixed, per_unit) coefficients of each kind of command form the calibration table. It is fitted from the timestamps
+the RPI logs when it sends a command to the STM and when the STM replies FIN.
+
+To fit the calibration table from an RPI log file, navigate to `/algo` directory and run:
+    python calibrate_timings.py <path to logfile.txt>
+
+The planner only minimises the predicted time when opted in with PLANNER_COST_MODEL=1 and the table is fitted (see `get_planner_cost_model`),
+so the API, `tune.py` and the precomputed tables agree on the cost model. The rough defaults still predict ETAs.
+"""
+
+logger = logging.getLogger(__name__)
+
+# plan with the execution-time model instead of the hand-tuned turn and reverse factors, once it is fitted
+PLANNER_COST_MODEL: bool = os.environ.get("PLANNER_COST_MODEL", "0") == "1"
+
+# (fixed seconds, seconds per unit at speed 1) for each kind of command.
+# rough defaults that are used until a calibration table is fitted from logged timings
+DEFAULT_CALIBRATION: dict[str, tuple[float, float]] = {
+    "straight": (0.3, 2.0),  # T/t commands with no steering, eg. 10cm at speed 50 takes 0.7s
+    "turn": (0.3, 1.0),      # T/t commands with steering, eg. 45 degrees at speed 30 takes 1.8s
+    "away": (1.0, 0.0),      # W/w commands, the distance driven depends on where the robot is
+}
+
+# calibration table fitted by `calibrate_timings.py`
+CALIBRATION_FILE: Path = Path(__file__).resolve().parent / "command_timings.json"
+
+# no. of cells in a typical straight-line run.
+# straight-line motions are combined into 1 command, so the fixed time of the command is spread over the cells of the run
+STRAIGHT_RUN_LENGTH: int = 3
+
+# RPI log messages (see rpi/__init__.py) of a command sent to the STM and of the STM finishing it
+SENT_PATTERN = re.compile(r"^\[STM\] Sent command: b'([^']*)'")
+FIN_PATTERN = re.compile(r"^\[STM\] FIN received")
+# RPI log lines, as text ("<time> :: <level> :: <process> :: <message>") or as JSON with "time" and "message" (see common/logs.py)
+TEXT_LOG_PATTERN = re.compile(
+    r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) :: \S+ :: .*? :: (.*)$")
+LOG_TIME_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+
+
+class CommandTimingModel:
+    """
+    Execution time model of STM commands and of the motions that generate them
+    """
+
+    def __init__(self, calibration: Union[dict[str, tuple[float, float]], None] = None, command_generator: Union[CommandGenerator, None] = None) -> None:
+        """
+        Args:
+            calibration (dict[str, tuple[float, float]]): (fixed, per_unit) coefficients by kind of command. Missing kinds use DEFAULT_CALIBRATION
+            command_generator (CommandGenerator): generator of the commands for each motion. Default is CommandGenerator()
+        """
+        self.calibration: dict[str, tuple[float, float]] = dict(
+            DEFAULT_CALIBRATION)
+        # whether the model is fitted from logged timings, rather than the rough defaults
+        self.calibrated: bool = bool(calibration)
+        if calibration:
+            self.calibration.update(
+                {kind: tuple(coefficients) for kind, coefficients in calibration.items()})
+        self.command_generator = command_generator if command_generator else CommandGenerator()
+
+        # predicted time of each motion by motion value, since Motion is not hashable
+        self.motion_times: dict[int, float] = {}
+
+    @classmethod
+    def load(cls, path: Path = CALIBRATION_FILE) -> "CommandTimingModel":
+        """
+        Create a model from a calibration table saved by `save`, or from the default calibration if the file does not exist
+        """
+        if not path.exists():
+            return cls()
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def save(self, path: Path = CALIBRATION_FILE) -> None:
+        """
+        Save the calibration table as JSON
+        """
+        with open(path, "w") as f:
+            json.dump(self.calibration, f, indent=4)
+
+    def signature(self) -> str:
+        """
+        Returns a short hash of the predicted time of every motion, to tell apart planner tables built with different models
+        """
+        digest = hashlib.sha1(json.dumps([
+            (motion.name, round(self.motion_time(motion), 6)) for motion in Motion if motion != Motion.CAPTURE
+        ]).encode())
+        return digest.hexdigest()[:8]
+
+    @staticmethod
+    def parse_command(command: str) -> Union[tuple[str, float, float], None]:
+        """
+        Returns the kind, speed and value of a movement command, or None if the command does not move the robot (eg. SNAP, FIN)
+        """
+        command = command.strip()
+        if not command or command[0] not in "TtWw":
+            return None
+        try:
+            speed, angle, val = (float(part)
+                                 for part in command[1:].split(CommandGenerator.SEP))
+        except ValueError:
+            return None
+
+        if command[0] in "Ww":
+            return "away", speed, val
+        return ("turn" if angle else "straight"), speed, val
+
+    def command_time(self, command: str) -> float:
+        """
+        Returns the predicted seconds to execute a command
+        """
+        parsed = CommandTimingModel.parse_command(command)
+        if parsed is None:
+            return 0
+        kind, speed, val = parsed
+        fixed, per_unit = self.calibration[kind]
+        return fixed + per_unit * val / max(speed, 1)
+
+    def commands_time(self, commands: list[str]) -> float:
+        """
+        Returns the predicted seconds to execute a list of commands
+        """
+        return sum(self.command_time(command) for command in commands)
+
+    def motion_time(self, motion: Motion) -> float:
+        """
+        Returns the predicted seconds to execute a motion between 2 cells.
+        Straight-line motions are charged their share of a run of STRAIGHT_RUN_LENGTH cells.
+        """
+        if motion.value not in self.motion_times:
+            num_motions = STRAIGHT_RUN_LENGTH if motion.is_combinable() else 1
+            commands = self.command_generator._generate_command(
+                motion, num_motions)
+            self.motion_times[motion.value] = self.commands_time(
+                commands) / num_motions
+        return self.motion_times[motion.value]
+
+    def min_turn_step_time(self, eight_headings: bool = False) -> float:
+        """
+        Returns the lowest predicted seconds per 45 degree change of heading over all turning motions, as a lower bound for search heuristics
+        """
+        # 90 degree turns change the heading by 2 steps, 45 degree turns by 1
+        turns = [(Motion.FORWARD_LEFT_TURN, 2), (Motion.FORWARD_RIGHT_TURN, 2),
+                 (Motion.REVERSE_LEFT_TURN, 2), (Motion.REVERSE_RIGHT_TURN, 2)]
+        if eight_headings:
+            turns.extend([(Motion.FORWARD_HALF_LEFT_TURN, 1), (Motion.FORWARD_HALF_RIGHT_TURN, 1),
+                          (Motion.REVERSE_HALF_LEFT_TURN, 1), (Motion.REVERSE_HALF_RIGHT_TURN, 1)])
+        return min(self.motion_time(motion) / steps for motion, steps in turns)
+
+    def segment_etas(self, commands: list[str]) -> list[dict[str, Union[str, float]]]:
+        """
+        Split the commands into segments ending at each SNAP and at FIN, and predict how long each segment takes
+
+        Returns:
+            list[dict[str, Union[str, float]]]: for each segment, the command ending it ("SNAP<obstacle id>_<signal>" or "FIN"),
+            its predicted duration and the predicted seconds from the start of the mission until the segment ends (eta)
+        """
+        segments = []
+        eta, duration = 0, 0
+        for command in commands:
+            command_time = self.command_time(command)
+            eta += command_time
+            duration += command_time
+            if command.startswith("SNAP") or command == CommandGenerator.FIN:
+                segments.append({
+                    "end": command,
+                    "duration": round(duration, 2),
+                    "eta": round(eta, 2),
+                })
+                duration = 0
+        return segments
+
+
+# whether the missing calibration has been logged
+_warned_uncalibrated: bool = False
+
+
+def get_planner_cost_model(timing_model: CommandTimingModel) -> Union[CommandTimingModel, None]:
+    """
+    Returns the cost model the planner minimises: the execution-time model if PLANNER_COST_MODEL is set and the model is fitted,
+    or else None for the hand-tuned turn and reverse factors of the baseline planner
+    """
+    global _warned_uncalibrated
+    if not PLANNER_COST_MODEL:
+        return None
+    if not timing_model.calibrated:
+        if not _warned_uncalibrated:
+            logger.warning(
+                "PLANNER_COST_MODEL is set but no calibration is fitted (see algo/calibrate_timings.py), planning with the baseline costs")
+            _warned_uncalibrated = True
+        return None
+    return timing_model
+
+
+def parse_log_line(line: str) -> Union[tuple[datetime, str], None]:
+    """
+    Returns the time and message of an RPI log line in text or JSON format, or None if it is not a log line
+    """
+    if line.startswith("{"):
+        try:
+            entry = json.loads(line)
+            return datetime.strptime(entry["time"], LOG_TIME_FORMAT), entry["message"]
+        except (ValueError, KeyError):
+            return None
+    if match := TEXT_LOG_PATTERN.match(line.rstrip("\n")):
+        return datetime.strptime(match.group(1), LOG_TIME_FORMAT), match.group(2)
+    return None
+
+
+def fit_command_timings(log_lines: Iterable[str]) -> dict[str, tuple[float, float]]:
+    """
+    Fit the calibration table from RPI log lines.
+    The duration of a command is the time from sending it to the STM until the next FIN. Commands without a FIN are skipped.
+    Kinds of commands with samples of a single speed and value only get their fixed time fitted, and kinds without samples keep the default.
+    """
+    samples: dict[str, list[tuple[float, float]]] = {
+        kind: [] for kind in DEFAULT_CALIBRATION}
+    sent = None
+    for line in log_lines:
+        entry = parse_log_line(line)
+        if entry is None:
+            continue
+        log_time, message = entry
+        if match := SENT_PATTERN.match(message):
+            command = match.group(1).replace("\\n", "")
+            parsed = CommandTimingModel.parse_command(command)
+            sent = (log_time, parsed) if parsed else None
+        elif FIN_PATTERN.match(message) and sent:
+            sent_time, (kind, speed, val) = sent
+            duration = (log_time - sent_time).total_seconds()
+            samples[kind].append((val / max(speed, 1), duration))
+            sent = None
+
+    calibration = dict(DEFAULT_CALIBRATION)
+    for kind, points in samples.items():
+        if not points:
+            continue
+        units, durations = np.array(points).T
+        if len(set(units)) > 1:
+            per_unit, _ = np.polyfit(units, durations, 1)
+            per_unit = max(float(per_unit), 0)
+        else:
+            per_unit = DEFAULT_CALIBRATION[kind][1]
+        fixed = max(float(np.mean(durations - per_unit * units)), 0)
+        calibration[kind] = (round(fixed, 4), round(per_unit, 4))
+    return calibration
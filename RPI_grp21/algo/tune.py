@@ -0,0 +1,162 @@
+import argparse
+import csv
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import os
+import sys
+# Allows Python to find packages
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from algo.algorithms.algo import MazeSolver  # nopep8
+from algo.tools.commands import CommandGenerator  # nopep8
+from algo.tools.consts import SURFACE  # nopep8
+from algo.tools.layouts import load_layouts  # nopep8
+from algo.tools.movement import Direction  # nopep8
+from algo.tools.optimizer import CommandOptimizer  # nopep8
+from algo.tools.params import PARAM_NAMES, PlannerParams  # nopep8
+from algo.tools.speed import SpeedScheduler  # nopep8
+from algo.tools.timing import CommandTimingModel, get_planner_cost_model  # nopep8
+
+"""
+Parallel sweep of the planner cost parameters (see `tools/params.py`) over the layouts of the web simulator.
+
+Every combination of the given parameter values plans every layout, spread over all cores. For each combination, the total planning time,
+the total predicted mission time of the optimized commands (see `tools/timing.py`) and the no. of obstacles scanned are written to CSV.
+Combinations that scan the most obstacles and are not beaten on both planning time and mission time by another combination form the trade-off frontier.
+
+Layouts are planned like the API (see `api/tools/planner.py`): with the execution-time cost model if PLANNER_COST_MODEL=1 and it is fitted,
+and with the speeds of the speed scheduler. The cost model prices motions by their predicted time instead of the turn and reverse factors,
+so with it those two are not swept.
+
+Usage:
+    python tune.py [--turn-factor 3 5 8] [--safe-cost 500 1000] [--layouts Obstacles] [--workers 8] [--output tune.csv]
+"""
+
+FIELDS = PARAM_NAMES + ["planning_time", "mission_time",
+                        "scanned", "errors", "frontier"]
+
+# loaded once in each worker process
+command_optimizer: CommandOptimizer = None
+# execution-time model minimised by the planner, or None for the turn and reverse factors
+cost_model: CommandTimingModel = None
+
+# parameters that only price motions without a cost model
+MOTION_COST_PARAMS: list[str] = ["turn_factor", "reverse_factor"]
+
+
+def init_worker(use_cost_model: bool) -> None:
+    global command_optimizer, cost_model
+    timing_model = CommandTimingModel.load()
+    command_optimizer = CommandOptimizer(timing_model=timing_model)
+    cost_model = timing_model if use_cost_model else None
+
+
+def evaluate(params: dict[str, int], obstacles: list[dict]) -> tuple[float, float, int]:
+    """
+    Plan a layout with the parameters, with the robot at (1, 1) facing north
+
+    Returns:
+        tuple[float, float, int]: planning time, predicted mission time and no. of obstacles scanned
+    """
+    maze_solver = MazeSolver(size_x=20, size_y=20, robot_x=1, robot_y=1, robot_direction=Direction.NORTH,
+                             cost_model=cost_model, params=PlannerParams(**params))
+    for ob in obstacles:
+        maze_solver.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
+
+    start = time.perf_counter()
+    optimal_path, _ = maze_solver.get_optimal_path()
+    planning_time = time.perf_counter() - start
+
+    motions, obstacle_id_with_signals, scanned_obstacles = maze_solver.optimal_path_to_motion_path(
+        optimal_path)
+    commands = CommandGenerator(speed_scheduler=SpeedScheduler(maze_solver.grid, SURFACE)).generate_commands(
+        motions, obstacle_id_with_signals, scanned_obstacles, optimal_path)
+    _, optimization = command_optimizer.optimize(commands)
+    return planning_time, optimization["time_after"], len(scanned_obstacles)
+
+
+def get_frontier(rows: list[dict]) -> list[dict]:
+    """
+    Returns the rows without errors that scan the most obstacles and are not dominated on planning time and mission time
+    """
+    rows = [row for row in rows if not row["errors"]]
+    if not rows:
+        return []
+    max_scanned = max(row["scanned"] for row in rows)
+    candidates = [row for row in rows if row["scanned"] == max_scanned]
+    return [row for row in candidates if not any(
+        other["planning_time"] <= row["planning_time"] and other["mission_time"] <= row["mission_time"] and
+        (other["planning_time"], other["mission_time"]) != (
+            row["planning_time"], row["mission_time"])
+        for other in candidates)]
+
+
+if __name__ == "__main__":
+    defaults = PlannerParams().to_dict()
+    parser = argparse.ArgumentParser(
+        description="Sweep the planner cost parameters over the layouts of the web simulator")
+    for name in PARAM_NAMES:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, nargs="+", default=[defaults[name]],
+                            help=f"values to try. Default is {defaults[name]}")
+    parser.add_argument("--layouts", nargs="*",
+                        help="only use layouts whose names start with one of these prefixes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="no. of worker processes. Default is the no. of cores")
+    parser.add_argument("--output", default="tune.csv",
+                        help="CSV file to write the results into")
+    args = parser.parse_args()
+
+    use_cost_model = get_planner_cost_model(
+        CommandTimingModel.load()) is not None
+    if use_cost_model:
+        for name in MOTION_COST_PARAMS:
+            if getattr(args, name) != [defaults[name]]:
+                print(
+                    f"Planning with the execution-time cost model, ignoring --{name.replace('_', '-')}")
+                setattr(args, name, [defaults[name]])
+
+    layouts = [obstacles for name, obstacles in load_layouts().items()
+               if obstacles and (not args.layouts or name.startswith(tuple(args.layouts)))]
+    grid = [dict(zip(PARAM_NAMES, values)) for values in itertools.product(
+        *(getattr(args, name) for name in PARAM_NAMES))]
+    print(
+        f"Evaluating {len(grid)} parameter combinations on {len(layouts)} layouts with {args.workers} workers"
+        f"{' and the execution-time cost model' if use_cost_model else ''}")
+
+    rows = [{**params, "planning_time": 0.0, "mission_time": 0.0, "scanned": 0, "errors": 0}
+            for params in grid]
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(use_cost_model,)) as executor:
+        futures = {executor.submit(evaluate, params, obstacles): row
+                   for params, row in zip(grid, rows) for obstacles in layouts}
+        for future in as_completed(futures):
+            row = futures[future]
+            try:
+                planning_time, mission_time, scanned = future.result()
+            except Exception as error:
+                print(f"{PlannerParams(**{name: row[name] for name in PARAM_NAMES})}: {repr(error)}")
+                row["errors"] += 1
+                continue
+            row["planning_time"] += planning_time
+            row["mission_time"] += mission_time
+            row["scanned"] += scanned
+    print(f"Time taken: {time.time() - start}s")
+
+    frontier = get_frontier(rows)
+    for row in rows:
+        row["planning_time"] = round(row["planning_time"], 3)
+        row["mission_time"] = round(row["mission_time"], 2)
+        row["frontier"] = row in frontier
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Saved results into '{args.output}'")
+
+    print("\nTrade-off frontier (total over all layouts):")
+    print(f"{'planning time (s)':>18}{'mission time (s)':>18}{'scanned':>9}  parameters")
+    for row in sorted(frontier, key=lambda row: row["planning_time"]):
+        print(f"{row['planning_time']:>18}{row['mission_time']:>18}{row['scanned']:>9}  "
+              f"{PlannerParams(**{name: row[name] for name in PARAM_NAMES})}")
@@ -3,22 +3,46 @@ from werkzeug.datastructures import FileStorage
 import time
 from flask_restx import Resource, Api, marshal
 from flask_cors import CORS
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from flask.logging import default_handler
 from pathlib import Path
+import functools
 import json
+import logging
+import statistics
 import threading
 
 from models.models import get_models
-from tools.logger import setup_logger
 from tools.network import network_monitor
 
 import sys
 import os
 # Allows Python to find package from sibling directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from algo.algorithms.algo import MazeSolver  # nopep8
-from algo.tools.commands import CommandGenerator  # nopep8
-from image_rec.model import load_model, predict_image, predict_image_t2, stitch_image  # nopep8
+from algo.algorithms.free_space import load_free_space_table  # nopep8
+from algo.algorithms.stats import summarize  # nopep8
+from algo.tools.optimizer import CommandOptimizer  # nopep8
+from algo.tools.timing import CommandTimingModel, get_planner_cost_model  # nopep8
+from tools.admission import AdmissionController, AdmissionRejected, ROBOT, SIMULATOR  # nopep8
+from tools.jobs import JobManager, JobQueueFull, MAX_JOB_WAIT  # nopep8
+from tools.logger import RESPONSE_LOGGER, LazyText, setup_logger  # nopep8
+from tools.metrics import image_phase_duration, observe_planner_stats, registry, request_duration  # nopep8
+from tools.planner import PlannerPool, layout_key, plan, plan_segments  # nopep8
+from tools.profiling import MAX_PROFILE_TOP_N, PROFILE_TOP_N, PROFILING_ENABLED, SORT_KEYS, ProfilerBusy, profile_call  # nopep8
+from tools.singleflight import SingleFlight  # nopep8
+
+# services of this server: "path" (path finding, /path*, /simulator_path) and "image" (image recognition, /image, /stitch).
+# eg. API_SERVICES=path serves path finding without importing the vision libraries, and image recognition can run in another server
+# so that both can be restarted and scaled separately
+SERVICES = set(os.environ.get("API_SERVICES", "path,image").split(","))
+SERVICE_PATHS = {
+    "path": ("/path", "/simulator_path"),
+    "image": ("/image", "/stitch"),
+}
+
+if "image" in SERVICES:
+    # imports torch, ultralytics and cv2, which take seconds and hundreds of MB
+    from image_rec.model import load_model, predict_image, predict_image_t2, stitch_image  # nopep8
 
 app = Flask(__name__)
 
@@ -26,17 +50,132 @@ api = Api(app, validate=True)
 restx_models = get_models(api
                           )
 logger = setup_logger()
+# errors logged by Flask go through the queue of the root logger instead of straight to stderr
+app.logger.removeHandler(default_handler)
+response_logger = logging.getLogger(RESPONSE_LOGGER)
 
 CORS(app)
 
-# load model for image recognition
-model = load_model()  # Default model
+if "image" in SERVICES:
+    # load model for image recognition
+    model = load_model()  # Default model
+
+# robot requests are served before simulator requests, with bounded queues for both
+admission = AdmissionController()
+
+if "path" in SERVICES:
+    # execution-time model calibrated from logged STM command timings (see algo/calibrate_timings.py), predicting the ETAs of the commands.
+    # the planner only minimises the predicted run time of the robot with PLANNER_COST_MODEL=1 (see tools/planner.py)
+    cost_model = CommandTimingModel.load()
+
+    # memory-map precomputed planner tables (building them if needed) before serving, so the first /path request is warm.
+    # worker processes map the same read-only files and share them through the OS page cache.
+    free_space_table = load_free_space_table(
+        cost_model=get_planner_cost_model(cost_model))
+    logger.debug(
+        f"Loaded planner tables, lattice version {free_space_table.version}")
+
+    # fuses and cancels generated commands to save STM round trips
+    command_optimizer = CommandOptimizer(timing_model=cost_model)
+
+    # worker processes for planning many layouts or runs concurrently (/path/batch, /simulator_path), sharing the memory-mapped planner tables
+    planner_pool = PlannerPool()
+
+    # identical layouts requested while one is being planned (eg. RPI retries) share its plan instead of planning it again
+    path_flights = SingleFlight("path")
+    stream_flights = SingleFlight("path-stream")
+
+    # asynchronous planning jobs (/path/jobs), on a bounded pool of threads, served as robot traffic
+    job_manager = JobManager(cost_model, command_optimizer, admission)
+
+# queue depths and utilisation, read on each scrape of /metrics
+registry.gauge("api_admission_active", "Requests being served, by kind of traffic",
+               lambda: {(kind,): counts['active'] for kind, counts in admission.get_dict().items()}, labels=("kind",))
+registry.gauge("api_admission_slots", "Requests that can be served at the same time, by kind of traffic",
+               lambda: {(kind,): slots for kind, slots in admission.slots.items()}, labels=("kind",))
+registry.gauge("api_admission_waiting", "Requests waiting to be served, by kind of traffic",
+               lambda: {(kind,): counts['waiting'] for kind, counts in admission.get_dict().items()}, labels=("kind",))
+registry.callback_counter("api_admission_rejected_total", "Requests rejected with 429, by kind of traffic",
+                          lambda: {(kind,): counts['rejected'] for kind, counts in admission.get_dict().items()}, labels=("kind",))
+if "path" in SERVICES:
+    registry.gauge("planner_pool_in_flight", "Layouts handed to the planner pool and not finished yet",
+                   lambda: {(): planner_pool.in_flight})
+    registry.gauge("planner_pool_workers", "Worker processes of the planner pool",
+                   lambda: {(): planner_pool.max_workers})
+    registry.gauge("api_jobs", "Planning jobs kept, by status",
+                   lambda: {(status,): count for status, count in job_manager.count_by_status().items()}, labels=("status",))
+    registry.callback_counter("api_flights_started_total", "Plans computed by /path and /path/stream",
+                              lambda: {(name,): flights.started for name, flights in (("path", path_flights), ("stream", stream_flights))},
+                              labels=("endpoint",))
+    registry.callback_counter("api_flights_coalesced_total", "Requests to /path and /path/stream that shared the plan of an identical layout in flight",
+                              lambda: {(name,): flights.coalesced for name, flights in (("path", path_flights), ("stream", stream_flights))},
+                              labels=("endpoint",))
 
 # poll wi-fi SSID to check that RPI can connect to API server
 # TODO remove if this causes any performance issues or bugs
 # threading.Thread(target=network_monitor, args=(logger,), daemon=True).start()
 
 
+def admitted(kind: str):
+    """
+    Serve the decorated endpoint as robot or simulator traffic (see `tools/admission.py`), responding 429 when it is not admitted
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                admission.acquire(kind)
+            except AdmissionRejected as error:
+                logger.debug(repr(error))
+                return marshal({"error": repr(error)}, restx_models["Error"]), 429, {"Retry-After": "1"}
+            try:
+                response = func(*args, **kwargs)
+            except BaseException:
+                admission.release(kind)
+                raise
+            if isinstance(response, Response) and response.is_streamed:
+                # a streamed request is served until its whole response is sent
+                response.call_on_close(lambda: admission.release(kind))
+            else:
+                admission.release(kind)
+            return response
+        return wrapper
+    return decorator
+
+
+def profiled(name: str):
+    """
+    Profile the decorated endpoint when the request has the `profile` query parameter or the `X-Profile` header (see `tools/profiling.py`),
+    adding the top hotspots to the response. The value is the no. of hotspots, and `profile_sort` (or `X-Profile-Sort`) their order
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            requested = request.args.get('profile', request.headers.get('X-Profile'))
+            if requested is None:
+                return func(*args, **kwargs)
+            if not PROFILING_ENABLED:
+                return marshal({"error": "Profiling is disabled, start the API server with API_PROFILING=1"}, restx_models["Error"]), 403
+            top_n = min(int(requested), MAX_PROFILE_TOP_N) if requested.isdigit() else PROFILE_TOP_N
+            sort = request.args.get('profile_sort', request.headers.get('X-Profile-Sort', SORT_KEYS[0]))
+            if sort not in SORT_KEYS:
+                return marshal({"error": f"profile_sort must be one of {', '.join(SORT_KEYS)}"}, restx_models["Error"]), 400
+            # handlers plan in the request thread when profiled, since cProfile only sees this thread
+            g.profiling = True
+            try:
+                response, report = profile_call(
+                    lambda: func(*args, **kwargs), name, top_n, sort)
+            except ProfilerBusy as error:
+                logger.debug(repr(error))
+                return marshal({"error": repr(error)}, restx_models["Error"]), 429, {"Retry-After": "1"}
+            logger.debug(f"Saved profile of request: '{report['file']}'")
+            body, status = response if isinstance(response, tuple) else (response, 200)
+            body['profile'] = marshal(report, restx_models["Profile"])
+            return body, status
+        return wrapper
+    return decorator
+
+
 @api.route('/status')
 class Status(Resource):
     @api.response(model=restx_models["Ok"], code=200, description="Success")
@@ -52,16 +191,60 @@ class Status(Resource):
         ), 200
 
 
+@api.route('/metrics')
+class Metrics(Resource):
+    @api.response(code=200, description="Success")
+    def get(self):
+        """
+        Request latencies, planner and image recognition phase times, queue depths and cache lookups of this process, in the Prometheus text format
+        """
+        return Response(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.before_request
+def start_timer():
+    g.start_time = time.perf_counter()
+
+
+@app.before_request
+def check_service():
+    for service, paths in SERVICE_PATHS.items():
+        if service not in SERVICES and request.path.startswith(paths):
+            return marshal(
+                {
+                    "error": f"{service} service is not served by this server (API_SERVICES={','.join(sorted(SERVICES))})"
+                },
+                restx_models["Error"]
+            ), 503
+
+
+@app.after_request
+def observe_request_duration(response):
+    start = g.get("start_time")
+    if start is None:
+        return response
+    # route templates (eg. /path/jobs/<string:job_id>) rather than paths, so the no. of label values stays bounded
+    labels = {"route": request.url_rule.rule if request.url_rule else "unmatched",
+              "method": request.method, "status": response.status_code}
+    if response.is_streamed:
+        response.call_on_close(lambda: request_duration.observe(
+            time.perf_counter() - start, **labels))
+    else:
+        request_duration.observe(time.perf_counter() - start, **labels)
+    return response
+
+
 @app.after_request
 def log_response_info(response):
     ignored_paths = ["/swaggerui/", "/swagger.json",
-                     "/swagger/", "/static/", "/favicon.ico"]
-    # Only log responses for requests to API endpoints, ignoring Swagger-related requests
-    if not any(request.path.startswith(path) for path in ignored_paths) and request.path != "/":
-        try:
-            logger.debug(json.loads(response.data))
-        except json.JSONDecodeError:
-            logger.debug("Response data is not valid JSON.")
+                     "/swagger/", "/static/", "/favicon.ico", "/metrics"]
+    # Only log responses for requests to API endpoints, ignoring Swagger-related requests.
+    # streamed responses are logged as they are generated, since reading them here would wait for the whole stream
+    if not any(request.path.startswith(path) for path in ignored_paths) and request.path != "/" and not response.is_streamed:
+        # the response data is only read if the response logger is enabled and the record is not sampled out
+        if response_logger.isEnabledFor(logging.DEBUG):
+            response_logger.debug("%s", LazyText(
+                lambda: response.get_data(as_text=True)))
     return response
 
 
@@ -70,6 +253,10 @@ class PathFinding(Resource):
     @api.expect(restx_models["PathFindingRequest"])
     @api.response(model=restx_models["PathFindingResponse"], code=200, description="Success")
     @api.response(model=restx_models["Error"], code=500, description="Internal Server Error")
+    @api.response(model=restx_models["Error"], code=429, description="Too many robot requests waiting")
+    @api.param('profile', "Profile the request and return this no. of hotspots (needs API_PROFILING=1)")
+    @admitted(ROBOT)
+    @profiled("path")
     def post(self):
         """
         For RPI to request pathfinding algorithm
@@ -80,51 +267,38 @@ class PathFinding(Resource):
             logger.debug("Request received from client:")
             logger.debug(f"{content}")
 
-            # Get the obstacles, retrying, robot_x, robot_y, and robot_direction from the json data
             obstacles = content['obstacles']
             # TODO: use alternative algo for retrying?
             retrying = content.get('retrying', False)
-            robot_x, robot_y = content.get(
-                'robot_x', 1), content.get('robot_y', 1)
-            robot_direction = content.get('robot_dir', 0)
-
-            optimal_path, commands = None, None
 
-            # Initialize MazeSolver object with robot size of 20x20, bottom left corner of robot at (1,1), facing north.
-            maze_solver = MazeSolver(size_x=20, size_y=20, robot_x=robot_x,
-                                     robot_y=robot_y, robot_direction=robot_direction)
-
-            # Add each obstacle into the MazeSolver. Each obstacle is defined by its x,y positions, its direction, and its id
-            for ob in obstacles:
-                maze_solver.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
-
-            start = time.time()
-            # Get shortest path
-            optimal_path, cost = maze_solver.get_optimal_path()
-            runtime = time.time() - start
+            if g.get('profiling'):
+                result, joined = plan(content, cost_model, command_optimizer), False
+            else:
+                result, joined = path_flights.run(
+                    layout_key(content), lambda: plan(content, cost_model, command_optimizer))
+            if joined:
+                logger.debug("Shared the plan of an identical layout in flight")
+            else:
+                observe_planner_stats(result['stats'])
             logger.debug(
-                f"Time taken to find shortest path using A* search: {runtime}s")
-            logger.debug(f"cost to travel: {cost} units")
-
-            # Based on the shortest path, generate commands for the robot
-            motions, obstacle_id_with_signals, scanned_obstacles = maze_solver.optimal_path_to_motion_path(
-                optimal_path)
-            command_generator = CommandGenerator()
-            commands = command_generator.generate_commands(
-                motions, obstacle_id_with_signals, scanned_obstacles, optimal_path)
+                f"Time taken to find shortest path using A* search: {result['runtime']}s")
+            logger.debug(f"cost to travel: {result['cost']} units")
             logger.debug(
-                f"Number of obstacles scanned: {len(scanned_obstacles)} / {len(obstacles)}")
-
-            # Get the starting location and add it to path_results
-            path_results = []
-            for pos in optimal_path:
-                path_results.append(pos.get_dict())
+                f"Number of obstacles scanned: {result['scanned']} / {len(obstacles)}")
+            optimization = result['optimization']
+            logger.debug(
+                f"Optimized commands: {optimization['commands_before']} -> {optimization['commands_after']}, "
+                f"predicted time saved: {optimization['time_saved']}s")
+            segments = result['segments']
+            logger.debug(
+                f"Predicted mission time: {segments[-1]['eta'] if segments else 0}s")
 
             return marshal(
                 {
                     "data": {
-                        'path': path_results,
-                        'commands': commands,
+                        'path': result['path'],
+                        'commands': result['commands'],
+                        'segments': segments,
                     }
                 },
                 restx_models["PathFindingResponse"]
@@ -139,12 +313,156 @@ class PathFinding(Resource):
             ), 500
 
 
+@api.route('/path/stream')
+class StreamPathFinding(Resource):
+    @api.expect(restx_models["PathFindingRequest"])
+    @api.response(model=restx_models["PathSegment"], code=200,
+                  description="Success. One JSON object per line for each segment of the path, or server-sent events with 'Accept: text/event-stream'")
+    @api.response(model=restx_models["Error"], code=429, description="Too many robot requests waiting")
+    @admitted(ROBOT)
+    def post(self):
+        """
+        For RPI to start moving before pathfinding finishes. The commands of each segment of the path are streamed as soon as the segment is final
+        """
+        content = request.json
+        logger.debug("Streaming request received from client:")
+        logger.debug(f"{content}")
+        event_stream = request.accept_mimetypes.best == "text/event-stream"
+        segments, joined = stream_flights.stream(
+            layout_key(content), lambda: plan_segments(content, cost_model, command_optimizer))
+        if joined:
+            logger.debug("Streaming the plan of an identical layout in flight")
+
+        def generate():
+            start = time.time()
+            try:
+                for segment in segments:
+                    logger.debug(
+                        f"Segment {segment['segment']} of {len(segment['commands'])} commands sent after {time.time() - start}s")
+                    if segment['final']:
+                        logger.debug(
+                            f"Time taken to find shortest path using A* search: {segment['runtime']}s")
+                        logger.debug(f"cost to travel: {segment['cost']} units")
+                        logger.debug(
+                            f"Number of obstacles scanned: {segment['scanned']} / {len(content['obstacles'])}")
+                        if not joined:
+                            observe_planner_stats(segment['stats'])
+                    line = marshal(
+                        segment, restx_models["PathSegment"], skip_none=True)
+                    yield f"data: {json.dumps(line)}\n\n" if event_stream else json.dumps(line) + "\n"
+            except Exception as error:
+                logger.debug("", exc_info=True)
+                line = marshal({"error": repr(error)},
+                               restx_models["PathSegment"], skip_none=True)
+                yield f"event: error\ndata: {json.dumps(line)}\n\n" if event_stream else json.dumps(line) + "\n"
+
+        return Response(stream_with_context(generate()),
+                        mimetype="text/event-stream" if event_stream else "application/x-ndjson")
+
+
+@api.route('/path/jobs')
+class PathFindingJobs(Resource):
+    @api.expect(restx_models["PathFindingRequest"])
+    @api.response(model=restx_models["PathFindingJob"], code=202, description="Job queued")
+    @api.response(model=restx_models["Error"], code=429, description="Too many jobs queued or running, or no robot slot free")
+    def post(self):
+        """
+        For RPI to start pathfinding without waiting for it. Poll the returned job id for the plan
+        """
+        content = request.json
+        logger.debug("Job request received from client:")
+        logger.debug(f"{content}")
+        try:
+            job = job_manager.submit(content)
+        except JobQueueFull as error:
+            logger.debug(repr(error))
+            return marshal({"error": repr(error)}, restx_models["Error"]), 429
+        except AdmissionRejected as error:
+            logger.debug(repr(error))
+            return marshal({"error": repr(error)}, restx_models["Error"]), 429, {"Retry-After": "1"}
+        logger.debug(f"Queued planning job {job.job_id}")
+        return marshal(job.get_dict(), restx_models["PathFindingJob"]), 202
+
+
+# for API validation of the long polling time, responding 400 if it is not a number
+job_wait_parser = api.parser()
+job_wait_parser.add_argument('wait', location='args', type=float, default=0,
+                             help=f"Seconds to wait for the job to finish before responding (long polling), at most {MAX_JOB_WAIT}")
+
+
+@api.route('/path/jobs/<string:job_id>')
+class PathFindingJob(Resource):
+    @api.expect(job_wait_parser)
+    @api.response(model=restx_models["PathFindingJob"], code=200, description="Success")
+    @api.response(model=restx_models["Error"], code=400, description="Invalid wait")
+    @api.response(model=restx_models["Error"], code=404, description="Job not found")
+    def get(self, job_id):
+        """
+        Status, progress and best plan so far of a planning job, and its plan when done
+        """
+        job = job_manager.get(job_id)
+        if job is None:
+            return marshal({"error": f"Job {job_id} not found"}, restx_models["Error"]), 404
+        wait = min(job_wait_parser.parse_args()['wait'], MAX_JOB_WAIT)
+        if wait > 0:
+            job.done.wait(wait)
+        return marshal(job.get_dict(), restx_models["PathFindingJob"]), 200
+
+    @api.response(model=restx_models["PathFindingJob"], code=200, description="Success")
+    @api.response(model=restx_models["Error"], code=404, description="Job not found")
+    def delete(self, job_id):
+        """
+        Cancel a planning job
+        """
+        job = job_manager.cancel(job_id)
+        if job is None:
+            return marshal({"error": f"Job {job_id} not found"}, restx_models["Error"]), 404
+        logger.debug(f"Cancelling planning job {job_id}")
+        return marshal(job.get_dict(), restx_models["PathFindingJob"]), 200
+
+
+@api.route('/path/batch')
+class BatchPathFinding(Resource):
+    @api.expect(restx_models["BatchPathFindingRequest"])
+    @api.response(model=restx_models["BatchPathFindingResult"], code=200,
+                  description="Success. One JSON object per line for each layout, in order of completion")
+    @api.response(model=restx_models["Error"], code=429, description="Too many simulator requests waiting, or waited too long behind robot requests")
+    @admitted(SIMULATOR)
+    def post(self):
+        """
+        For the simulator and tuning scripts to plan many layouts concurrently. Results are streamed as JSON lines as each layout finishes
+        """
+        layouts = request.json['layouts']
+        logger.debug(f"Batch of {len(layouts)} layouts received from client")
+
+        def generate():
+            start = time.time()
+            # hand out layouts to the workers only while no robot request is being served
+            for index, result in planner_pool.plan_unordered(layouts, before_submit=admission.wait_for_robot):
+                if isinstance(result, Exception):
+                    logger.debug(f"Layout {index} of batch failed: {repr(result)}")
+                    line = {"index": index, "error": repr(result)}
+                else:
+                    observe_planner_stats(result['stats'])
+                    line = {"index": index, "data": {
+                        **result, 'distance': result['cost']}}
+                yield json.dumps(marshal(line, restx_models["BatchPathFindingResult"])) + "\n"
+            logger.debug(
+                f"Time taken to plan batch of {len(layouts)} layouts: {time.time() - start}s")
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
 # FOR SIMULATOR TESTING ONLY
 @api.route('/simulator_path')
 class SimulatorPathFinding(Resource):
     @api.expect(restx_models["SimulatorPathFindingRequest"])
     @api.response(model=restx_models["SimulatorPathFindingResponse"], code=200, description="Success")
     @api.response(model=restx_models["Error"], code=500, description="Internal Server Error")
+    @api.response(model=restx_models["Error"], code=429, description="Too many simulator requests waiting, or waited too long behind robot requests")
+    @api.param('profile', "Profile the request and return this no. of hotspots (needs API_PROFILING=1)")
+    @admitted(SIMULATOR)
+    @profiled("simulator_path")
     def post(self):
         """
         FOR SIMULATOR TESTING ONLY. RPI SHOULD NOT BE USING THIS ENDPOINT
@@ -155,57 +473,62 @@ class SimulatorPathFinding(Resource):
             logger.debug("Request received from client:")
             logger.debug(f"{content}\n")
 
-            # Get the obstacles, retrying, robot_x, robot_y, and robot_direction from the json data
             obstacles = content['obstacles']
             # TODO: use alternative algo for retrying?
             retrying = content.get('retrying', False)
-            robot_x, robot_y = content.get(
-                'robot_x', 1), content.get('robot_y', 1)
-            robot_direction = content.get('robot_dir', 0)
             num_runs = content.get('num_runs', 1)  # for testing
-
-            optimal_path, commands, total_cost, total_runtime, = None, None, 0, 0
-            for _ in range(num_runs):
-                # Initialize MazeSolver object with robot size of 20x20, bottom left corner of robot at (1,1), facing north.
-                maze_solver = MazeSolver(size_x=20, size_y=20, robot_x=robot_x,
-                                         robot_y=robot_y, robot_direction=robot_direction)
-                # Add each obstacle into the MazeSolver. Each obstacle is defined by its x,y positions, its direction, and its id
-                for ob in obstacles:
-                    maze_solver.add_obstacle(
-                        ob['x'], ob['y'], ob['d'], ob['id'])
-
-                start = time.time()
-                # Get shortest path
-                optimal_path, cost = maze_solver.get_optimal_path()
-                runtime = time.time() - start
-                total_runtime += runtime
-                total_cost += cost
+            # return the search counters and phase timers of the first run
+            with_stats = content.get('stats', False)
+
+            if g.get('profiling'):
+                # one run after another in the request thread, so that the profiler sees the planning. The API process is already warm
+                planned = ((index, {**plan(content, cost_model, command_optimizer), 'cold': False})
+                           for index in range(num_runs))
+            else:
+                # spread the runs over the worker processes while no robot request is being served
+                planned = planner_pool.plan_unordered(
+                    [content] * num_runs, before_submit=admission.wait_for_robot)
+            # keep the results in order of submission
+            results = [None] * num_runs
+            for index, result in planned:
+                if isinstance(result, Exception):
+                    raise result
+                observe_planner_stats(result['stats'])
+                results[index] = result
+            for result in results:
                 logger.debug(
-                    f"Time taken to find shortest path using A* search: {runtime}s")
-                logger.debug(f"cost to travel: {cost} units")
-
-                # Based on the shortest path, generate commands for the robot
-                motions, obstacle_id_with_signals, scanned_obstacles = maze_solver.optimal_path_to_motion_path(
-                    optimal_path)
-                command_generator = CommandGenerator()
-                commands = command_generator.generate_commands(
-                    motions, obstacle_id_with_signals, scanned_obstacles, optimal_path)
-                logger.debug(
-                    f"Number of obstacles scanned: {len(scanned_obstacles)} / {len(obstacles)}")
-
-            # Get the starting location and add it to path_results
-            path_results = []
-            for pos in optimal_path:
-                path_results.append(pos.get_dict())
+                    f"Time taken to find shortest path using A* search: {result['runtime']}s")
+            result = results[0]
+            logger.debug(f"cost to travel: {result['cost']} units")
+            logger.debug(
+                f"Number of obstacles scanned: {result['scanned']} / {len(obstacles)}")
+            logger.debug(
+                f"Planner phase times: {result['stats']['phase_times']}")
+
+            runtimes = [result['runtime'] for result in results]
+            cold_runtimes = [result['runtime']
+                             for result in results if result['cold']]
+            warm_runtimes = [result['runtime']
+                             for result in results if not result['cold']]
+            distribution = {
+                **summarize(runtimes),
+                # first run of each worker process, and runs after it
+                'cold': statistics.mean(cold_runtimes) if cold_runtimes else None,
+                'warm': statistics.mean(warm_runtimes) if warm_runtimes else None,
+                'num_runs': num_runs,
+            }
 
             return marshal(
                 {
                     "data": {
-                        'distance': total_cost / num_runs,
-                        'runtime': total_runtime / num_runs,
-                        'path': path_results,
-                        'commands': commands,
-                        'motions': motions
+                        'distance': statistics.mean(result['cost'] for result in results),
+                        'runtime': distribution['mean'],
+                        'runtimes': distribution,
+                        'path': result['path'],
+                        'commands': result['commands'],
+                        'motions': result['motions'],
+                        'optimization': result['optimization'],
+                        'stats': result['stats'] if with_stats else None,
                     }
                 },
                 restx_models["SimulatorPathFindingResponse"]
@@ -231,11 +554,17 @@ class ImagePredict(Resource):
     @api.expect(file_upload_parser)
     @api.response(model=restx_models["ImagePredictResponse"], code=200, description="Success")
     @api.response(model=restx_models["Error"], code=500, description="Internal Server Error")
+    @api.response(model=restx_models["Error"], code=429, description="Too many robot requests waiting")
+    @api.param('profile', "Profile the request and return this no. of hotspots (needs API_PROFILING=1)")
+    @admitted(ROBOT)
+    @profiled("image")
     def post(self):
         try:
             """
             For image recognition. Uncomment code for Task 1 / Task 2 respectively
             """
+            # the upload is received and parsed on first access to the files
+            start = time.perf_counter()
             file = request.files['file']
             filename = file.filename
 
@@ -249,6 +578,8 @@ class ImagePredict(Resource):
             upload_dir.mkdir(parents=True, exist_ok=True)
             file_path = upload_dir / filename
             file.save(file_path)
+            image_phase_duration.observe(
+                time.perf_counter() - start, phase="upload")
             logger.debug(f"Saved raw image into folder: '{upload_dir}'")
 
             # Call the predict_image function
@@ -256,13 +587,18 @@ class ImagePredict(Resource):
             output_dir = Path("image_rec_files/output/fullsize")
             os.makedirs(output_dir, exist_ok=True)
 
+            # seconds spent in each phase of recognising the image
+            timings = {}
+
             # # Week 8 (Task 1)
             # image_id = predict_image(
-            #     logger, model, file_path, output_dir, signal)
+            #     logger, model, file_path, output_dir, signal, timings)
 
             # Week 9 (Task 2: only detects arrows & bullseyes)
             image_id = predict_image_t2(
-                logger, model, file_path, output_dir, signal)
+                logger, model, file_path, output_dir, signal, timings)
+            for phase, seconds in timings.items():
+                image_phase_duration.observe(seconds, phase=phase)
             return marshal(
                 {
                     "obstacle_id": obstacle_id,
@@ -0,0 +1,56 @@
+import os
+
+"""
+Production server configuration for gunicorn (Linux and Mac only), instead of the single-process development server of `python api.py`.
+
+The app is loaded once in the master process before it forks the worker processes, so the YOLO model, the cost model and the memory-mapped
+planner tables are shared by the workers copy-on-write instead of being loaded by each of them. Each worker serves requests on a pool of threads.
+
+Usage (in `/api` directory):
+    gunicorn -c gunicorn.conf.py api:app
+
+Settings are read from environment variables:
+    API_PORT: port to listen on. Default is 5000
+    API_WORKERS: no. of worker processes. Default is 1, since planning jobs, request coalescing and robot/simulator admission are kept in each
+        worker process: with more workers, a job polled on another worker is not found, a retry only joins a plan on the same worker,
+        and simulator requests do not wait for robot requests on other workers. Scale with API_THREADS and PLANNER_WORKERS instead
+    API_THREADS: no. of threads serving requests in each worker process. Default is 4
+    API_PRELOAD: set to 0 to load the app in each worker process instead, eg. when the YOLO model runs on a CUDA device, which cannot be shared across a fork
+
+Graceful restarts:
+    kill -HUP <master pid>: start new workers and stop the old ones once they finish their requests. The app is not reloaded when it is preloaded
+    kill -TERM <master pid>: stop accepting requests and shut down once running requests finish, within graceful_timeout seconds
+"""
+
+bind = f"0.0.0.0:{os.environ.get('API_PORT', 5000)}"
+workers = int(os.environ.get("API_WORKERS", 1))
+threads = int(os.environ.get("API_THREADS", 4))
+worker_class = "gthread"
+preload_app = os.environ.get("API_PRELOAD", "1") != "0"
+
+# a worker that stops responding for longer than the RPI's API_TIMEOUT is restarted
+timeout = 120
+# time for running requests to finish on restart or shutdown
+graceful_timeout = 60
+keepalive = 5
+
+
+def when_ready(server):
+    server.log.info(
+        f"API server ready on {bind} with {workers} workers of {threads} threads (app {'preloaded' if preload_app else 'loaded in each worker'})")
+
+
+def post_worker_init(worker):
+    worker.log.info(f"Worker {worker.pid} ready")
+
+
+def worker_int(worker):
+    worker.log.info(f"Worker {worker.pid} interrupted")
+
+
+def worker_exit(server, worker):
+    server.log.info(f"Worker {worker.pid} exited")
+
+
+def on_reload(server):
+    server.log.info("Gracefully restarting workers")
@@ -22,11 +22,19 @@ def get_models(api):
         'robot_dir': fields.Integer(required=False, min=0, max=6, multiple=2, default=0),
         'robot_x': fields.Integer(required=False, min=0, max=19, default=1),
         'robot_y': fields.Integer(required=False, min=0, max=19, default=1),
+        'surface': fields.String(required=False, enum=['indoor', 'outdoor']),
+    })
+
+    segment = api.model('Segment', {
+        'end': fields.String(),
+        'duration': fields.Float(),
+        'eta': fields.Float(),
     })
 
     path_finding_data = api.model('PathFindingData', {
         'commands': fields.List(fields.String()),
         'path': fields.List(fields.Nested(position)),
+        'segments': fields.List(fields.Nested(segment)),
     })
 
     path_finding_response = api.model('PathFindingResponse', {
@@ -39,7 +47,51 @@ def get_models(api):
         'robot_dir': fields.Integer(required=False, min=0, max=6, multiple=2, default=0),
         'robot_x': fields.Integer(required=False, min=0, max=19, default=1),
         'robot_y': fields.Integer(required=False, min=0, max=19, default=1),
-        'num_runs': fields.Integer(required=False, min=1)
+        'num_runs': fields.Integer(required=False, min=1),
+        'surface': fields.String(required=False, enum=['indoor', 'outdoor']),
+        'stats': fields.Boolean(required=False, default=False),
+    })
+
+    optimization = api.model('Optimization', {
+        'commands_before': fields.Integer(),
+        'commands_after': fields.Integer(),
+        'time_before': fields.Float(),
+        'time_after': fields.Float(),
+        'time_saved': fields.Float(),
+    })
+
+    phase_times = api.model('PhaseTimes', {
+        'view_states': fields.Float(),
+        'pairwise_search': fields.Float(),
+        'tsp': fields.Float(),
+        'path_reconstruction': fields.Float(),
+    })
+
+    planner_stats = api.model('PlannerStats', {
+        'nodes_expanded': fields.Integer(),
+        'heap_pushes': fields.Integer(),
+        'neighbor_cache_hits': fields.Integer(),
+        'neighbor_cache_misses': fields.Integer(),
+        'collision_checks': fields.Integer(),
+        'pairwise_searches': fields.Integer(),
+        'free_space_shortcuts': fields.Integer(),
+        'combinations_evaluated': fields.Integer(),
+        'combinations_pruned': fields.Integer(),
+        'view_states_pruned': fields.Integer(),
+        'lk_calls': fields.Integer(),
+        'phase_times': fields.Nested(phase_times),
+    })
+
+    runtime_distribution = api.model('RuntimeDistribution', {
+        'min': fields.Float(),
+        'p50': fields.Float(),
+        'p95': fields.Float(),
+        'max': fields.Float(),
+        'mean': fields.Float(),
+        'std': fields.Float(),
+        'cold': fields.Float(),
+        'warm': fields.Float(),
+        'num_runs': fields.Integer(),
     })
 
     simulator_path_finding_data = api.model('SimulatorPathFindingData', {
@@ -47,18 +99,79 @@ def get_models(api):
         'distance': fields.Float(),
         'path': fields.List(fields.Nested(position)),
         'runtime': fields.Float(),
+        'runtimes': fields.Nested(runtime_distribution, allow_null=True, skip_none=True),
         'motions': fields.List(fields.String()),
+        'optimization': fields.Nested(optimization),
+        'stats': fields.Nested(planner_stats, allow_null=True, skip_none=True),
     })
 
     simulator_path_finding_response = api.model('SimulatorPathFindingResponse', {
         'data': fields.Nested(simulator_path_finding_data),
     })
 
+    job_progress = api.model('JobProgress', {
+        'phase': fields.String(),
+        'pairwise_searches': fields.Integer(),
+        'combinations_evaluated': fields.Integer(),
+    })
+
+    best_plan = api.model('BestPlan', {
+        'cost': fields.Float(),
+        'path': fields.List(fields.Nested(position)),
+    })
+
+    path_finding_job = api.model('PathFindingJob', {
+        'job_id': fields.String(),
+        'status': fields.String(enum=['queued', 'running', 'done', 'failed', 'cancelled']),
+        'elapsed': fields.Float(),
+        'error': fields.String(),
+        'progress': fields.Nested(job_progress, allow_null=True, skip_none=True),
+        'best': fields.Nested(best_plan, allow_null=True, skip_none=True),
+        'data': fields.Nested(path_finding_data, allow_null=True, skip_none=True),
+    })
+
+    batch_path_finding_request = api.model('BatchPathFindingRequest', {
+        'layouts': fields.List(fields.Nested(path_finding_request), required=True, min_items=1),
+    })
+
+    batch_path_finding_result = api.model('BatchPathFindingResult', {
+        'index': fields.Integer(),
+        'data': fields.Nested(simulator_path_finding_data, allow_null=True, skip_none=True),
+        'error': fields.String(),
+    })
+
+    path_segment = api.model('PathSegment', {
+        'segment': fields.Integer(),
+        'commands': fields.List(fields.String()),
+        'path': fields.List(fields.Nested(position)),
+        'segments': fields.List(fields.Nested(segment)),
+        'final': fields.Boolean(),
+        'cost': fields.Float(),
+        'runtime': fields.Float(),
+        'scanned': fields.Integer(),
+        'error': fields.String(),
+    })
+
     image_predict_response = api.model('ImagePredictResponse', {
         "obstacle_id": fields.String(),
         "image_id": fields.String(),
     })
 
+    hotspot = api.model('Hotspot', {
+        'function': fields.String(),
+        'calls': fields.Integer(),
+        'primitive_calls': fields.Integer(),
+        'total_time': fields.Float(),
+        'cumulative_time': fields.Float(),
+    })
+
+    profile = api.model('Profile', {
+        'file': fields.String(),
+        'elapsed': fields.Float(),
+        'sort': fields.String(enum=['cumulative', 'tottime', 'ncalls']),
+        'hotspots': fields.List(fields.Nested(hotspot)),
+    })
+
     error = api.model('Error', {
         'error': fields.String()
     })
@@ -73,7 +186,12 @@ def get_models(api):
         "PathFindingResponse": path_finding_response,
         "SimulatorPathFindingRequest": simulator_path_finding_request,
         "SimulatorPathFindingResponse": simulator_path_finding_response,
+        "BatchPathFindingRequest": batch_path_finding_request,
+        "BatchPathFindingResult": batch_path_finding_result,
+        "PathFindingJob": path_finding_job,
+        "PathSegment": path_segment,
         "ImagePredictResponse": image_predict_response,
+        "Profile": profile,
         "Error": error,
         "Ok": ok,
     }
@@ -0,0 +1,142 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Union
+
+"""
+Admission control between robot and simulator traffic on the API.
+
+Robot requests (/path, /path/stream, /image) are latency critical during a run, while simulator requests (/simulator_path, /path/batch)
+come from developers and tuning scripts and may plan a layout many times. Each kind of traffic has its own bounded queue and no. of requests
+served at the same time, and requests beyond the queue are rejected (429) instead of piling up.
+
+Planning jobs (/path/jobs) are robot traffic too: a job holds a robot slot from when it is submitted until it finishes or is cancelled (see `jobs.py`).
+
+Robot traffic always goes first: a simulator request is only admitted while no robot request is being served or waiting,
+and simulator work already admitted hands out its next layout or run to the planner pool only while the robot is idle,
+or after waiting MAX_ADMISSION_WAIT seconds for it (see `wait_for_robot`), so a stalled robot request does not hold it back forever.
+The planner pool processes also run at a lower OS priority (see `PLANNER_NICENESS` in `planner.py`), so a run already in progress yields the CPU to robot requests.
+"""
+
+ROBOT = "robot"
+SIMULATOR = "simulator"
+
+# no. of requests of each kind served at the same time
+ROBOT_SLOTS: int = 4
+SIMULATOR_SLOTS: int = 1
+# max. no. of requests of each kind waiting to be served, beyond which requests are rejected
+MAX_ROBOT_QUEUE: int = 8
+MAX_SIMULATOR_QUEUE: int = 4
+# max. seconds a request waits to be served before it is rejected
+MAX_ADMISSION_WAIT: float = 60
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when the queue of a kind of traffic is full, or a request waited too long to be served
+    """
+
+
+class AdmissionController:
+    """
+    Bounded queues and slots for robot and simulator requests, with robot requests served first
+    """
+
+    def __init__(self, robot_slots: int = ROBOT_SLOTS, simulator_slots: int = SIMULATOR_SLOTS, max_robot_queue: int = MAX_ROBOT_QUEUE,
+                 max_simulator_queue: int = MAX_SIMULATOR_QUEUE, max_wait: float = MAX_ADMISSION_WAIT) -> None:
+        """
+        Args:
+            robot_slots (int): no. of robot requests served at the same time. Default is ROBOT_SLOTS
+            simulator_slots (int): no. of simulator requests served at the same time. Default is SIMULATOR_SLOTS
+            max_robot_queue (int): max. no. of robot requests waiting. Default is MAX_ROBOT_QUEUE
+            max_simulator_queue (int): max. no. of simulator requests waiting. Default is MAX_SIMULATOR_QUEUE
+            max_wait (float): max. seconds a request waits to be served. Default is MAX_ADMISSION_WAIT
+        """
+        self.slots = {ROBOT: robot_slots, SIMULATOR: simulator_slots}
+        self.max_queue = {ROBOT: max_robot_queue,
+                          SIMULATOR: max_simulator_queue}
+        self.max_wait = max_wait
+        self.active = {ROBOT: 0, SIMULATOR: 0}
+        self.waiting = {ROBOT: 0, SIMULATOR: 0}
+        # no. of requests of each kind rejected
+        self.rejected = {ROBOT: 0, SIMULATOR: 0}
+        self.condition = threading.Condition()
+
+    def _can_admit(self, kind: str) -> bool:
+        if self.active[kind] >= self.slots[kind]:
+            return False
+        return kind == ROBOT or self._robot_idle()
+
+    def _robot_idle(self) -> bool:
+        return self.active[ROBOT] == 0 and self.waiting[ROBOT] == 0
+
+    def acquire(self, kind: str, blocking: bool = True) -> None:
+        """
+        Wait until a request of the kind can be served
+
+        Args:
+            kind (str): ROBOT or SIMULATOR
+            blocking (bool): wait in the queue of the kind. If False, reject the request unless it can be served immediately. Default is True
+
+        Raises:
+            AdmissionRejected: if the queue of the kind is full, the request waited more than max_wait seconds, or it cannot be served immediately without blocking
+        """
+        with self.condition:
+            if not self._can_admit(kind):
+                if not blocking:
+                    self.rejected[kind] += 1
+                    raise AdmissionRejected(
+                        f"All {self.slots[kind]} {kind} slots are in use")
+                if self.waiting[kind] >= self.max_queue[kind]:
+                    self.rejected[kind] += 1
+                    raise AdmissionRejected(
+                        f"{self.waiting[kind]} {kind} requests are already waiting")
+                self.waiting[kind] += 1
+                try:
+                    admitted = self.condition.wait_for(
+                        lambda: self._can_admit(kind), timeout=self.max_wait)
+                finally:
+                    self.waiting[kind] -= 1
+                    # a robot request leaving the queue may let simulator requests in
+                    self.condition.notify_all()
+                if not admitted:
+                    self.rejected[kind] += 1
+                    raise AdmissionRejected(
+                        f"{kind} request waited more than {self.max_wait}s to be served")
+            self.active[kind] += 1
+
+    def release(self, kind: str) -> None:
+        with self.condition:
+            self.active[kind] -= 1
+            self.condition.notify_all()
+
+    @contextmanager
+    def admit(self, kind: str) -> Iterator[None]:
+        """
+        Serve a request of the kind within the context, see `acquire`
+        """
+        self.acquire(kind)
+        try:
+            yield
+        finally:
+            self.release(kind)
+
+    def wait_for_robot(self, timeout: Union[float, None] = None) -> bool:
+        """
+        Wait until no robot request is being served or waiting, eg. before simulator work hands out more planning to the planner pool
+
+        Args:
+            timeout (float): max. seconds to wait. Default is max_wait
+
+        Returns:
+            bool: whether the robot is idle, or False if the wait timed out
+        """
+        with self.condition:
+            return self.condition.wait_for(self._robot_idle, timeout=self.max_wait if timeout is None else timeout)
+
+    def get_dict(self) -> dict:
+        """
+        Returns the no. of requests of each kind being served, waiting and rejected
+        """
+        with self.condition:
+            return {kind: {'active': self.active[kind], 'waiting': self.waiting[kind], 'rejected': self.rejected[kind]}
+                    for kind in (ROBOT, SIMULATOR)}
@@ -0,0 +1,211 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union
+
+from algo.algorithms.algo import MazeSolver, PlanningCancelled
+from algo.tools.optimizer import CommandOptimizer
+from algo.tools.timing import CommandTimingModel, get_planner_cost_model
+from tools.admission import ROBOT, AdmissionController
+from tools.planner import create_solver, plan
+
+"""
+Asynchronous planning jobs, so a slow layout does not hold an HTTP connection open for the whole solve.
+
+Jobs run on a bounded pool of threads in the API process, so their progress and best tour so far can be read while they run,
+and a running job can be cancelled between two pairwise searches or TSP solves of its MazeSolver.
+Queued and running jobs are robot traffic, each holding a robot slot of the admission controller until it finishes (see `admission.py`).
+"""
+
+# no. of jobs planned at the same time, and max. no. of jobs waiting or running before new jobs are rejected
+JOB_WORKERS: int = 2
+MAX_PENDING_JOBS: int = 8
+# no. of finished jobs kept for polling, the oldest are forgotten first
+MAX_FINISHED_JOBS: int = 32
+# max. seconds a poll waits for a job to finish (long polling), below the RPI's API_TIMEOUT
+MAX_JOB_WAIT: float = 30
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobQueueFull(Exception):
+    """
+    Raised when too many jobs are waiting or running
+    """
+
+
+class Job:
+    """
+    Planning job of one layout
+    """
+
+    def __init__(self, content: dict) -> None:
+        self.job_id: str = uuid.uuid4().hex
+        self.content = content
+        self.status: str = QUEUED
+        self.created: float = time.time()
+        self.started: Union[float, None] = None
+        self.finished: Union[float, None] = None
+        self.maze_solver: Union[MazeSolver, None] = None
+        self.result: Union[dict, None] = None
+        self.error: Union[str, None] = None
+        self.cancel_requested = False
+        # set when the job is done, failed or cancelled
+        self.done = threading.Event()
+
+    def is_finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def get_dict(self) -> dict:
+        """
+        Returns the status of the job, its progress and best tour while running, and its result when done
+        """
+        job = {
+            'job_id': self.job_id,
+            'status': self.status,
+            'elapsed': round((self.finished or time.time()) - (self.started or self.created), 3),
+            'error': self.error,
+        }
+        maze_solver = self.maze_solver
+        if maze_solver:
+            stats = maze_solver.stats
+            job['progress'] = {
+                'phase': stats.current_phase,
+                'pairwise_searches': stats.pairwise_searches,
+                'combinations_evaluated': stats.combinations_evaluated,
+            }
+            best_path, best_cost = maze_solver.best_path, maze_solver.best_cost
+            if best_path:
+                job['best'] = {
+                    'cost': best_cost,
+                    'path': [pos.get_dict() for pos in best_path],
+                }
+        if self.result:
+            job['data'] = self.result
+        return job
+
+
+class JobManager:
+    """
+    Runs planning jobs on a bounded pool of threads
+    """
+
+    def __init__(self, cost_model: CommandTimingModel, command_optimizer: CommandOptimizer, admission: Union[AdmissionController, None] = None,
+                 max_workers: int = JOB_WORKERS, max_pending: int = MAX_PENDING_JOBS, max_finished: int = MAX_FINISHED_JOBS) -> None:
+        """
+        Args:
+            cost_model (CommandTimingModel): execution-time model predicting the ETAs, and minimised by the planner if enabled
+            command_optimizer (CommandOptimizer): optimizer of the generated commands
+            admission (AdmissionController): admission controller the jobs take robot slots of. Default is None, not admitting jobs
+            max_workers (int): no. of jobs planned at the same time. Default is JOB_WORKERS
+            max_pending (int): max. no. of jobs waiting or running. Default is MAX_PENDING_JOBS
+            max_finished (int): no. of finished jobs kept for polling. Default is MAX_FINISHED_JOBS
+        """
+        self.cost_model = cost_model
+        self.command_optimizer = command_optimizer
+        self.admission = admission
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="planning-job")
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, content: dict) -> Job:
+        """
+        Queue a job to plan a layout in the format of a PathFindingRequest
+
+        Raises:
+            JobQueueFull: if max_pending jobs are already waiting or running
+            AdmissionRejected: if no robot slot is free, without waiting for one
+        """
+        with self.lock:
+            if sum(not job.is_finished() for job in self.jobs.values()) >= self.max_pending:
+                raise JobQueueFull(
+                    f"{self.max_pending} planning jobs are already queued or running")
+            # released when the job finishes, see `_finish`
+            if self.admission:
+                self.admission.acquire(ROBOT, blocking=False)
+            job = Job(content)
+            self.jobs[job.job_id] = job
+            self._forget_finished()
+        self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Union[Job, None]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def count_by_status(self) -> dict[str, int]:
+        """
+        Returns the no. of jobs kept of each status
+        """
+        with self.lock:
+            counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+            for job in self.jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def cancel(self, job_id: str) -> Union[Job, None]:
+        """
+        Cancel a job. A queued job is cancelled immediately, a running job when its MazeSolver next checks for cancellation
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.is_finished():
+                return job
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                # a worker thread skips the job when it picks it up
+                self._finish(job, CANCELLED)
+                return job
+        if job.maze_solver:
+            job.maze_solver.cancel()
+        return job
+
+    def _run(self, job: Job) -> None:
+        with self.lock:
+            # cancelled while queued
+            if job.is_finished():
+                return
+            job.status = RUNNING
+        job.started = time.time()
+        try:
+            job.maze_solver = create_solver(
+                job.content, get_planner_cost_model(self.cost_model))
+            # cancelled while the solver was being created
+            if job.cancel_requested:
+                job.maze_solver.cancel()
+            job.result = plan(job.content, self.cost_model,
+                              self.command_optimizer, job.maze_solver)
+            self._finish(job, DONE)
+        except PlanningCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as error:
+            job.error = repr(error)
+            self._finish(job, FAILED)
+
+    def _finish(self, job: Job, status: str) -> None:
+        """
+        Finish a job once, whether it is done, failed or cancelled, and release its robot slot
+        """
+        job.status = status
+        job.finished = time.time()
+        if self.admission:
+            self.admission.release(ROBOT)
+        job.done.set()
+
+    def _forget_finished(self) -> None:
+        """
+        Forget the oldest finished jobs beyond max_finished. Must be called with the lock held
+        """
+        finished = [job_id for job_id,
+                    job in self.jobs.items() if job.is_finished()]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
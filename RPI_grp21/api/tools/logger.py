@@ -1,24 +1,32 @@
 import logging
 import os
 
+from common.logs import setup_logging
 
-def setup_logger(log_level=logging.DEBUG):
-    logger = logging.getLogger()
-    logger.setLevel(log_level)
+# logger of the response data of every request, see `log_response_info` in api.py.
+# not a child of the Flask app logger ("api"), so its records do not reach the handlers of that logger
+RESPONSE_LOGGER = "responses"
 
-    file_path = os.path.abspath(os.path.join(
-        os.path.dirname(__file__), "api_debug.log"))
-    file_handler = logging.FileHandler(file_path)
-    file_handler.setLevel(log_level)
 
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(log_level)
+class LazyText:
+    """
+    Text of a log message that is only produced when the record is formatted, ie. after the level and sampling checks
+    """
+
+    def __init__(self, produce):
+        self.produce = produce
 
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
+    def __str__(self):
+        return self.produce()
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
 
-    return logger
+def setup_logger(log_level=logging.DEBUG, levels=None, sample_rates=None, capture=None):
+    """
+    Log through a queue to a writer thread (see `common/logs.py`), as text to the console and as JSON lines to api_debug.log.
+    Levels of loggers, sampling rates and loggers captured into the ring buffer can also be set with the LOG_LEVELS, LOG_SAMPLE_RATES
+    and LOG_CAPTURE environment variables, eg. LOG_SAMPLE_RATES=responses=10 to log 1 of every 10 responses.
+    Responses below the output level are dropped unless the responses logger is captured, so their data is not read unless it is written out
+    """
+    file_path = os.path.abspath(os.path.join(
+        os.path.dirname(__file__), "api_debug.log"))
+    return setup_logging(level=log_level, file_path=file_path, levels=levels, sample_rates=sample_rates, capture=capture)
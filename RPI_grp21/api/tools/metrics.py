@@ -0,0 +1,198 @@
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Union
+
+"""
+In-process registry of counters, gauges and histograms, rendered in the Prometheus text format for `/metrics`.
+
+Histograms keep cumulative bucket counts rather than samples, so memory stays constant over a whole run day
+and Prometheus can compute any percentile (eg. p99 request latency) over any time window with `histogram_quantile`.
+Each process (eg. each gunicorn worker) has its own registry.
+"""
+
+# bucket upper bounds in seconds, from a fast /status to a slow layout
+LATENCY_BUCKETS: tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1,
+                                      2.5, 5, 10, 20, 30, 60, 90)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric(ABC):
+    """
+    Metric with a value for each combination of label values
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = ()) -> None:
+        self.name = name
+        self.description = description
+        self.labels: tuple[str, ...] = tuple(labels)
+        self.lock = threading.Lock()
+
+    def _label_values(self, labels: dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def _format_labels(self, values: LabelValues, extra: Union[tuple[str, str], None] = None) -> str:
+        pairs = list(zip(self.labels, values)) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{label}="{_escape(value)}"' for label, value in pairs) + "}"
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        """
+        Returns the lines of the samples of the metric in the Prometheus text format
+        """
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"] + self.samples())
+
+
+class Counter(Metric):
+    """
+    Count that only goes up, eg. no. of requests
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = ()) -> None:
+        super().__init__(name, description, labels)
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        with self.lock:
+            return [f"{self.name}{self._format_labels(key)} {value}" for key, value in self.values.items()]
+
+
+class Gauge(Metric):
+    """
+    Value read when the metrics are rendered, eg. the no. of requests waiting in a queue
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, read: Callable[[], dict[LabelValues, float]], labels: Iterable[str] = ()) -> None:
+        """
+        Args:
+            read (Callable[[], dict[LabelValues, float]]): returns the current value for each combination of label values
+        """
+        super().__init__(name, description, labels)
+        self.read = read
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{self._format_labels(key)} {value}" for key, value in self.read().items()]
+
+
+class CallbackCounter(Gauge):
+    """
+    Count that only goes up, read when the metrics are rendered, eg. a count kept by another object
+    """
+    kind = "counter"
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values in cumulative buckets, eg. request latencies
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, description, labels)
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets)) + (math.inf,)
+        # count of observations in each bucket (not cumulative), sum and count for each combination of label values
+        self.counts: dict[LabelValues, list[int]] = {}
+        self.sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self.lock:
+            counts = self.counts.setdefault(key, [0] * len(self.buckets))
+            counts[index] += 1
+            self.sums[key] = self.sums.get(key, 0) + value
+
+    def samples(self) -> list[str]:
+        lines = []
+        with self.lock:
+            for key, counts in self.counts.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(float(bound))
+                    lines.append(
+                        f"{self.name}_bucket{self._format_labels(key, ('le', le))} {cumulative}")
+                lines.append(
+                    f"{self.name}_sum{self._format_labels(key)} {self.sums[key]}")
+                lines.append(
+                    f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Metrics of the process, rendered together
+    """
+
+    def __init__(self) -> None:
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, description: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, description, labels))
+
+    def gauge(self, name: str, description: str, read: Callable[[], dict[LabelValues, float]], labels: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, description, read, labels))
+
+    def callback_counter(self, name: str, description: str, read: Callable[[], dict[LabelValues, float]], labels: Iterable[str] = ()) -> CallbackCounter:
+        return self.register(CallbackCounter(name, description, read, labels))
+
+    def histogram(self, name: str, description: str, labels: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, description, labels, buckets))
+
+    def render(self) -> str:
+        """
+        Returns all metrics in the Prometheus text format
+        """
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.histogram(
+    "api_request_duration_seconds", "Time to serve a request, until the whole response is sent for streamed responses",
+    labels=("route", "method", "status"))
+planner_phase_duration = registry.histogram(
+    "planner_phase_duration_seconds", "Time spent in each phase of planning a layout (see algo/algorithms/stats.py)", labels=("phase",))
+planner_cache_lookups = registry.counter(
+    "planner_cache_lookups_total", "Lookups of the neighbors of a state in the neighbor caches, and of paths between pairs of states in the obstacle-free table",
+    labels=("cache", "result"))
+image_phase_duration = registry.histogram(
+    "image_phase_duration_seconds", "Time spent in each phase of recognising an image", labels=("phase",))
+
+
+def observe_planner_stats(stats: dict) -> None:
+    """
+    Record the phase times and cache lookups of a planned layout, from the stats of its MazeSolver
+    """
+    for phase, seconds in stats['phase_times'].items():
+        planner_phase_duration.observe(seconds, phase=phase)
+    planner_cache_lookups.inc(
+        stats['neighbor_cache_hits'], cache="neighbor", result="hit")
+    planner_cache_lookups.inc(
+        stats['neighbor_cache_misses'], cache="neighbor", result="miss")
+    # a pair of states not found in the obstacle-free table is searched
+    planner_cache_lookups.inc(
+        stats['free_space_shortcuts'], cache="free_space", result="hit")
+    planner_cache_lookups.inc(
+        stats['pairwise_searches'], cache="free_space", result="miss")
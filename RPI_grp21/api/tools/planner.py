@@ -0,0 +1,280 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Iterator, Union
+
+from algo.algorithms.algo import MazeSolver
+from algo.algorithms.free_space import load_free_space_table
+from algo.tools.commands import CommandGenerator
+from algo.tools.consts import SURFACE
+from algo.tools.optimizer import CommandOptimizer
+from algo.tools.speed import SpeedScheduler
+from algo.tools.timing import CommandTimingModel, get_planner_cost_model
+from common.logs import forking_workers
+
+"""
+Planning pipeline shared by the API endpoints: path finding, command generation, command optimization and ETAs for one layout,
+and a process pool to plan many layouts concurrently.
+
+Worker processes load the calibrated cost model and memory-map the precomputed planner tables once when they start,
+so every worker shares the same read-only table files through the OS page cache.
+
+Planner options are opt-in, with environment variables:
+    PLANNER_COST_MODEL=1: minimise the predicted run time of the fitted execution-time model instead of the hand-tuned turn and reverse costs.
+        Ignored with a warning until `command_timings.json` is fitted (see `get_planner_cost_model` in `algo/tools/timing.py`)
+    PLANNER_CAPTURES=1: capture obstacles whose view states the path passes through (see `MazeSolver._iter_opportunistic_captures`)
+"""
+
+PLANNER_CAPTURES: bool = os.environ.get("PLANNER_CAPTURES", "0") == "1"
+
+# no. of worker processes planning layouts concurrently
+PLANNER_WORKERS: int = os.cpu_count() or 1
+# increment to the OS niceness of the worker processes, so planning in the API process for the robot gets the CPU first
+PLANNER_NICENESS: int = 10
+
+# cost model and command optimizer of a worker process, see `init_worker`
+_cost_model: Union[CommandTimingModel, None] = None
+_command_optimizer: Union[CommandOptimizer, None] = None
+# no. of layouts planned by a worker process
+_num_planned: int = 0
+
+
+def create_solver(content: dict, cost_model: Union[CommandTimingModel, None] = None,
+                  opportunistic_captures: bool = PLANNER_CAPTURES) -> MazeSolver:
+    """
+    Create a MazeSolver for a layout in the format of a PathFindingRequest
+
+    Args:
+        content (dict): layout in the format of a PathFindingRequest
+        cost_model (CommandTimingModel): execution-time model the planner minimises, see `get_planner_cost_model`. Default is the baseline costs
+        opportunistic_captures (bool): capture obstacles whose view states the path passes through. Default is PLANNER_CAPTURES
+    """
+    robot_x, robot_y = content.get('robot_x', 1), content.get('robot_y', 1)
+    robot_direction = content.get('robot_dir', 0)
+
+    # Initialize MazeSolver object with robot size of 20x20, bottom left corner of robot at (1,1), facing north.
+    maze_solver = MazeSolver(size_x=20, size_y=20, robot_x=robot_x,
+                             robot_y=robot_y, robot_direction=robot_direction, cost_model=cost_model,
+                             opportunistic_captures=opportunistic_captures)
+    # Add each obstacle into the MazeSolver. Each obstacle is defined by its x,y positions, its direction, and its id
+    for ob in content['obstacles']:
+        maze_solver.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
+    return maze_solver
+
+
+def layout_key(content: dict) -> str:
+    """
+    Canonical form of a layout in the format of a PathFindingRequest, equal for requests that plan the same path
+    whatever the order of their obstacles and fields, eg. to coalesce identical requests
+    """
+    return json.dumps({
+        'robot': [content.get('robot_x', 1), content.get('robot_y', 1), content.get('robot_dir', 0)],
+        'surface': content.get('surface', SURFACE),
+        'obstacles': sorted([ob['x'], ob['y'], ob['d'], ob['id']] for ob in content['obstacles']),
+    })
+
+
+def plan(content: dict, cost_model: CommandTimingModel, command_optimizer: CommandOptimizer, maze_solver: Union[MazeSolver, None] = None) -> dict:
+    """
+    Plan a path and generate commands for a layout
+
+    Args:
+        content (dict): layout in the format of a PathFindingRequest
+        cost_model (CommandTimingModel): execution-time model predicting the ETAs, and minimised by the planner if enabled (see `get_planner_cost_model`)
+        command_optimizer (CommandOptimizer): optimizer of the generated commands
+        maze_solver (MazeSolver): solver of the layout, eg. to follow its progress from another thread. Default is create_solver for the layout
+
+    Returns:
+        dict: path, commands, segment ETAs, motions, cost, runtime (in seconds), command optimization report,
+        no. of obstacles scanned and planner statistics
+    """
+    surface = content.get('surface', SURFACE)
+    maze_solver = maze_solver if maze_solver else create_solver(
+        content, get_planner_cost_model(cost_model))
+
+    start = time.time()
+    # Get shortest path
+    optimal_path, cost = maze_solver.get_optimal_path()
+    runtime = time.time() - start
+
+    # Based on the shortest path, generate commands for the robot
+    motions, obstacle_id_with_signals, scanned_obstacles = maze_solver.optimal_path_to_motion_path(
+        optimal_path)
+    command_generator = CommandGenerator(
+        speed_scheduler=SpeedScheduler(maze_solver.grid, surface))
+    commands = command_generator.generate_commands(
+        motions, obstacle_id_with_signals, scanned_obstacles, optimal_path)
+    commands, optimization = command_optimizer.optimize(commands)
+
+    return {
+        'path': [pos.get_dict() for pos in optimal_path],
+        'commands': commands,
+        # predicted time until each image is snapped and until the robot finishes
+        'segments': cost_model.segment_etas(commands),
+        'motions': [str(motion) for motion in motions],
+        'cost': cost,
+        'runtime': runtime,
+        'optimization': optimization,
+        'scanned': len(scanned_obstacles),
+        'stats': maze_solver.get_stats(),
+    }
+
+
+def plan_segments(content: dict, cost_model: CommandTimingModel, command_optimizer: CommandOptimizer,
+                  maze_solver: Union[MazeSolver, None] = None) -> Iterator[dict]:
+    """
+    Plan a layout like `plan`, but yield the commands of each part of the path as soon as it is final (see `MazeSolver.iter_optimal_path`),
+    so the robot can start driving while the rest of the path is planned. The first leg of the tour, up to the first capture, is committed
+    before the view states are searched pairwise, and the rest of the tour is solved from its end, so the tour may cost a little more than with `plan`.
+    The commands of the path so far are generated again for every segment and only the new ones are sent,
+    which matches since SNAP is a barrier to the command optimizer, and FIN is only kept in the final segment.
+
+    Yields:
+        dict: segment no., path states, commands and segment ETAs (counted from the start of the mission) not sent in an earlier segment,
+        and whether it is the final segment. The final segment also has the cost, runtime (in seconds), no. of obstacles scanned and planner stats
+    """
+    surface = content.get('surface', SURFACE)
+    maze_solver = maze_solver if maze_solver else create_solver(
+        content, get_planner_cost_model(cost_model))
+    command_generator = CommandGenerator(
+        speed_scheduler=SpeedScheduler(maze_solver.grid, surface))
+
+    start = time.time()
+    # no. of path states, commands and segment ETAs already sent
+    sent_states, sent_commands, sent_etas = 0, 0, 0
+    segment = 0
+    for optimal_path, cost, committed, final in maze_solver.iter_optimal_path(commit_first_leg=True):
+        if committed <= sent_states and not final:
+            continue
+
+        motions, obstacle_id_with_signals, scanned_obstacles = maze_solver.optimal_path_to_motion_path(
+            optimal_path[:committed])
+        commands = command_generator.generate_commands(
+            motions, obstacle_id_with_signals, scanned_obstacles, optimal_path[:committed])
+        commands, _ = command_optimizer.optimize(commands)
+        if not final and commands and commands[-1] == CommandGenerator.FIN:
+            commands = commands[:-1]
+        etas = cost_model.segment_etas(commands)
+
+        result = {
+            'segment': segment,
+            'path': [pos.get_dict() for pos in optimal_path[sent_states:committed]],
+            'commands': commands[sent_commands:],
+            'segments': etas[sent_etas:],
+            'final': final,
+        }
+        if final:
+            result.update({
+                'cost': cost,
+                'runtime': time.time() - start,
+                'scanned': len(scanned_obstacles),
+                'stats': maze_solver.get_stats(),
+            })
+        yield result
+        sent_states, sent_commands, sent_etas = committed, len(
+            commands), len(etas)
+        segment += 1
+
+
+def init_worker() -> None:
+    """
+    Load the cost model and planner tables of a worker process
+    """
+    global _cost_model, _command_optimizer
+    # not available on Windows
+    if hasattr(os, "nice"):
+        os.nice(PLANNER_NICENESS)
+    _cost_model = CommandTimingModel.load()
+    load_free_space_table(cost_model=get_planner_cost_model(_cost_model))
+    _command_optimizer = CommandOptimizer(timing_model=_cost_model)
+
+
+def plan_in_worker(content: dict) -> dict:
+    """
+    Plan a layout in a worker process, see `plan`.
+    The result is marked cold for the first layout planned by the worker, before the interpreter and OS caches are warmed up.
+    """
+    global _num_planned
+    result = plan(content, _cost_model, _command_optimizer)
+    result['cold'] = _num_planned == 0
+    _num_planned += 1
+    return result
+
+
+class PlannerPool:
+    """
+    Pool of worker processes planning layouts concurrently. The pool and its workers are created on the first submitted layout,
+    so a pool created before the API server forks its worker processes is not shared between them.
+    """
+
+    def __init__(self, max_workers: int = PLANNER_WORKERS) -> None:
+        """
+        Args:
+            max_workers (int): no. of worker processes. Default is PLANNER_WORKERS
+        """
+        self.max_workers = max_workers
+        self.executor: Union[ProcessPoolExecutor, None] = None
+        self.lock = threading.Lock()
+        # no. of layouts submitted and not finished yet, ie. busy and queued workers
+        self.in_flight: int = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, initializer=init_worker)
+            return self.executor
+
+    def submit(self, content: dict) -> Future:
+        """
+        Plan a layout in a worker process
+
+        Returns:
+            Future: future of the result of `plan`
+        """
+        # worker processes are forked on the first submitted layouts. They do not log, errors are raised from their futures
+        with forking_workers():
+            future = self._get_executor().submit(plan_in_worker, content)
+        with self.lock:
+            self.in_flight += 1
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future) -> None:
+        with self.lock:
+            self.in_flight -= 1
+
+    def plan_unordered(self, contents: list[dict], before_submit: Union[Callable[[], None], None] = None) -> Iterator[tuple[int, Union[dict, Exception]]]:
+        """
+        Plan layouts concurrently, yielding the index of each layout and its result (or the exception raised) in order of completion.
+        At most max_workers layouts are handed to the workers at a time, so `before_submit` can hold back the next layout, eg. while the robot is being served
+        """
+        futures: dict[Future, int] = {}
+        pending = iter(enumerate(contents))
+
+        def submit_next() -> None:
+            for index, content in pending:
+                if before_submit:
+                    before_submit()
+                futures[self.submit(content)] = index
+                return
+
+        for _ in range(self.max_workers):
+            submit_next()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = futures.pop(future)
+                submit_next()
+                try:
+                    yield index, future.result()
+                except Exception as error:
+                    yield index, error
+
+    def shutdown(self) -> None:
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+                self.executor = None
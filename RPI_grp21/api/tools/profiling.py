@@ -0,0 +1,89 @@
+import cProfile
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, TypeVar
+
+"""
+Profiling of single API requests with cProfile, to find the hotspots of one slow layout or image without an instrumented build.
+
+A request asks to be profiled with the `profile` query parameter or the `X-Profile` header (see `profiled` in api.py).
+Its handler runs under cProfile, the top hotspots are returned in the `profile` field of the response,
+and the full profile is saved as a .prof file for `python -m pstats` or snakeviz.
+
+cProfile only sees the thread it runs in, so profiled requests plan in the request thread instead of joining a flight or using the planner pool.
+Profiling slows the request down several times, so it is only allowed when the API server is started with API_PROFILING=1,
+and one request is profiled at a time.
+"""
+
+T = TypeVar("T")
+
+PROFILING_ENABLED: bool = os.environ.get("API_PROFILING", "0") == "1"
+# no. of hotspots returned by default, and at most
+PROFILE_TOP_N: int = 25
+MAX_PROFILE_TOP_N: int = 200
+# orders of the hotspots: time spent in a function and the functions it calls, time spent in the function itself, no. of calls
+SORT_KEYS: tuple[str, ...] = ("cumulative", "tottime", "ncalls")
+PROFILE_DIR: Path = Path(__file__).parent.parent / "profiles"
+
+_profiling_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """
+    Raised when another request is already being profiled
+    """
+
+
+def profile_call(func: Callable[[], T], name: str, top_n: int = PROFILE_TOP_N, sort: str = SORT_KEYS[0]) -> tuple[T, dict]:
+    """
+    Call a function under cProfile, and save the profile into PROFILE_DIR
+
+    Args:
+        func (Callable[[], T]): function to profile
+        name (str): name of the profiled request, in the name of the .prof file
+        top_n (int): no. of hotspots to return. Default is PROFILE_TOP_N
+        sort (str): order of the hotspots, one of SORT_KEYS. Default is cumulative time
+
+    Returns:
+        tuple[T, dict]: the result of the function, and the .prof file, time taken (in seconds) and top hotspots
+
+    Raises:
+        ProfilerBusy: if another request is being profiled
+    """
+    if not _profiling_lock.acquire(blocking=False):
+        raise ProfilerBusy("Another request is already being profiled")
+    try:
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        result = profiler.runcall(func)
+        elapsed = time.perf_counter() - start
+    finally:
+        _profiling_lock.release()
+
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    file_path = PROFILE_DIR / \
+        f"{datetime.now().strftime('%d-%m_%H-%M-%S.%f')[:-3]}_{name}.prof"
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(file_path)
+
+    stats.sort_stats(sort)
+    hotspots = []
+    for function in stats.fcn_list[:top_n]:
+        primitive_calls, calls, total_time, cumulative_time, _ = stats.stats[function]
+        hotspots.append({
+            'function': pstats.func_std_string(function),
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'total_time': round(total_time, 6),
+            'cumulative_time': round(cumulative_time, 6),
+        })
+    return result, {
+        'file': str(file_path),
+        'elapsed': round(elapsed, 6),
+        'sort': sort,
+        'hotspots': hotspots,
+    }
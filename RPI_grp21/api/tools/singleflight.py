@@ -0,0 +1,117 @@
+import threading
+from typing import Callable, Hashable, Iterator, TypeVar, Union
+
+"""
+Single-flight coalescing of identical concurrent requests.
+
+When the RPI times out and retries, or the simulator sends the same layout several times, the requests would each plan the layout from scratch.
+Instead, the first request for a key starts the computation (the flight) on its own thread, and requests for the same key arriving while it runs
+join the flight and receive the same results, including results produced before they joined. The flight is forgotten as soon as it finishes,
+so results are never cached beyond the requests that overlapped.
+"""
+
+T = TypeVar("T")
+
+
+class Flight:
+    """
+    Results of one computation, shared by every request that joined it
+    """
+
+    def __init__(self) -> None:
+        self.results: list = []
+        self.error: Union[Exception, None] = None
+        self.finished = False
+        # no. of requests that joined the flight after it started
+        self.joined: int = 0
+        self.condition = threading.Condition()
+
+    def publish(self, result) -> None:
+        with self.condition:
+            self.results.append(result)
+            self.condition.notify_all()
+
+    def finish(self, error: Union[Exception, None] = None) -> None:
+        with self.condition:
+            self.error = error
+            self.finished = True
+            self.condition.notify_all()
+
+    def __iter__(self) -> Iterator:
+        """
+        Yields every result of the flight from the first one, waiting for results not produced yet.
+        Raises the exception of the computation, if any, after its last result
+        """
+        index = 0
+        while True:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: index < len(self.results) or self.finished)
+                if index >= len(self.results):
+                    if self.error is not None:
+                        raise self.error
+                    return
+                result = self.results[index]
+            yield result
+            index += 1
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent computations with the same key into one
+    """
+
+    def __init__(self, name: str = "single-flight") -> None:
+        """
+        Args:
+            name (str): prefix of the names of the threads running the computations
+        """
+        self.name = name
+        self.flights: dict[Hashable, Flight] = {}
+        self.lock = threading.Lock()
+        # no. of computations started, and no. of requests that joined one instead of starting their own
+        self.started: int = 0
+        self.coalesced: int = 0
+
+    def stream(self, key: Hashable, generate: Callable[[], Iterator[T]]) -> tuple[Iterator[T], bool]:
+        """
+        Iterate over the results of `generate()`, or of the computation already in flight for the key
+
+        Returns:
+            tuple[Iterator[T], bool]: the results, and whether an identical computation in flight was joined
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            joined = flight is not None
+            if joined:
+                flight.joined += 1
+                self.coalesced += 1
+            else:
+                flight = self.flights[key] = Flight()
+                self.started += 1
+        if not joined:
+            # the computation runs on its own thread, so it finishes for the requests that joined even if the first request goes away
+            threading.Thread(target=self._run, args=(key, flight, generate),
+                             name=f"{self.name}-{self.started}", daemon=True).start()
+        return iter(flight), joined
+
+    def run(self, key: Hashable, compute: Callable[[], T]) -> tuple[T, bool]:
+        """
+        Returns the result of `compute()`, or of the computation already in flight for the key,
+        and whether an identical computation in flight was joined
+        """
+        results, joined = self.stream(key, lambda: iter([compute()]))
+        return next(results), joined
+
+    def _run(self, key: Hashable, flight: Flight, generate: Callable[[], Iterator]) -> None:
+        error = None
+        try:
+            for result in generate():
+                flight.publish(result)
+        except Exception as exception:
+            error = exception
+        finally:
+            # later requests start a new computation, while requests that already joined still read this one
+            with self.lock:
+                del self.flights[key]
+            flight.finish(error)
@@ -0,0 +1,266 @@
+import atexit
+import copy
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterator, List, Optional, Union
+
+"""
+Non-blocking logging shared by the API and the RPI (python 3.9).
+
+Loggers only put records on a queue, and a single writer thread formats them and writes them to the console and the log file,
+so a request or a serial/Bluetooth loop never waits for disk or terminal I/O. With `multiprocess=True` the queue is a multiprocessing queue,
+so processes forked after `setup_logging` all log through the writer thread of the main process. Otherwise a forked process (eg. a gunicorn worker)
+starts its own writer thread, except worker processes forked within `forking_workers` (eg. of the planner pool), which do not log.
+
+- Per-module levels: `levels` (or the LOG_LEVELS environment variable, eg. "werkzeug=WARNING,rpi.communication=INFO") sets the level of each logger.
+- Sampling: `sample_rates` (or LOG_SAMPLE_RATES, eg. "rpi.communication.stm32=10") keeps only 1 of every n DEBUG records of each logger,
+  for high-rate events such as every message to the STM. Records at INFO and above are never sampled.
+- Structured output: the log file has one JSON object per line, with any `extra` fields of the record.
+- Ring buffer: records below the output level (eg. DEBUG records when logging at INFO) of the loggers opted in with `capture`
+  (or LOG_CAPTURE, eg. "rpi.communication,tools.planner") are kept in memory, and the last `ring_buffer_size` of them are written out before an error,
+  so the context of an error is logged without writing every record. Other loggers stay at the output level, so their records below it are dropped
+  before they are copied onto the queue.
+"""
+
+# no. of records below the output level kept in memory to be written out on an error
+RING_BUFFER_SIZE: int = 1000
+TEXT_FORMAT: str = "%(asctime)s :: %(levelname)s :: %(processName)s :: %(message)s"
+
+# attributes of every LogRecord, the others are `extra` fields written into the JSON output
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord(
+    "", logging.INFO, "", 0, "", None, None))) | {"message", "asctime"}
+
+# whether processes forked by the current thread are worker processes that do not log, see `forking_workers`
+_fork_state = threading.local()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one line of JSON
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.processName,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(
+            record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only 1 of every n DEBUG records of the loggers with a sampling rate (and their child loggers)
+    """
+
+    def __init__(self, sample_rates: Dict[str, int]) -> None:
+        super().__init__()
+        # longest logger names first, so a child logger's own rate takes precedence
+        self.sample_rates = sorted(sample_rates.items(),
+                                   key=lambda item: len(item[0]), reverse=True)
+        self.counters = {name: itertools.count()
+                         for name in sample_rates}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.INFO:
+            return True
+        for name, rate in self.sample_rates:
+            if record.name == name or record.name.startswith(name + "."):
+                return rate <= 1 or next(self.counters[name]) % rate == 0
+        return True
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Passes records at or above the output level to the target handlers, and keeps the last records below it in memory.
+    The kept records are passed on before the next record at or above the dump level, as the context of an error
+    """
+
+    def __init__(self, targets: List[logging.Handler], output_level: int, capacity: int = RING_BUFFER_SIZE,
+                 dump_level: int = logging.ERROR) -> None:
+        super().__init__()
+        self.targets = targets
+        self.output_level = output_level
+        self.dump_level = dump_level
+        self.buffer: deque = deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.levelno < self.output_level:
+            if self.buffer.maxlen:
+                self.buffer.append(record)
+            return
+        if record.levelno >= self.dump_level and self.buffer:
+            buffered = list(self.buffer)
+            self.buffer.clear()
+            self._handle(logging.makeLogRecord({
+                "name": record.name, "levelno": record.levelno, "levelname": record.levelname,
+                "processName": record.processName, "threadName": record.threadName, "created": record.created, "msecs": record.msecs,
+                "msg": f"{len(buffered)} records before the error:",
+            }))
+            for buffered_record in buffered:
+                self._handle(buffered_record)
+        self._handle(record)
+
+    def _handle(self, record: logging.LogRecord) -> None:
+        for target in self.targets:
+            target.handle(record)
+
+    def close(self) -> None:
+        for target in self.targets:
+            target.close()
+        super().close()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Puts records on the queue of the writer thread, only resolving their message and exception text so they can be sent to another process
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def resolve_level(level: Union[int, str]) -> int:
+    """
+    Returns the output level, the LOG_LEVEL environment variable if set or else the given level
+    """
+    level = os.environ.get("LOG_LEVEL", level)
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    return level
+
+
+def _parse_setting(setting: str) -> Dict[str, str]:
+    """
+    Parses "name=value,name=value" settings from an environment variable
+    """
+    pairs = [pair.split("=", 1)
+             for pair in setting.split(",") if "=" in pair]
+    return {name.strip(): value.strip() for name, value in pairs}
+
+
+def _start_writer(queue_handler: QueueHandler, handler: logging.Handler, log_queue: Optional[queue.Queue] = None) -> None:
+    """
+    Start a writer thread passing the records of the queue handler to the handler, on a new queue if given
+    """
+    if log_queue is not None:
+        queue_handler.queue = log_queue
+    listener = QueueListener(queue_handler.queue, handler)
+    listener.start()
+    # write out the records left in the queue on exit
+    atexit.register(listener.stop)
+
+
+@contextmanager
+def forking_workers() -> Iterator[None]:
+    """
+    Mark the processes forked by the current thread within the context as worker processes, eg. of a process pool.
+    Logging is disabled in them instead of starting another writer thread and log file writer in each of them,
+    so they report back to the parent through their results and exceptions
+    """
+    _fork_state.workers = True
+    try:
+        yield
+    finally:
+        _fork_state.workers = False
+
+
+def _after_fork_in_child(queue_handler: QueueHandler, handler: logging.Handler) -> None:
+    if getattr(_fork_state, "workers", False):
+        logging.disable(logging.CRITICAL)
+        return
+    # a forked process (eg. a gunicorn worker) does not have the writer thread, so it starts its own
+    _start_writer(queue_handler, handler, queue.Queue(-1))
+
+
+def setup_logging(
+        logger_name: Optional[str] = None,
+        level: Union[int, str] = logging.DEBUG,
+        file_path: Optional[str] = None,
+        console: bool = True,
+        levels: Optional[Dict[str, Union[int, str]]] = None,
+        sample_rates: Optional[Dict[str, int]] = None,
+        capture: Optional[List[str]] = None,
+        ring_buffer_size: int = RING_BUFFER_SIZE,
+        multiprocess: bool = False,
+) -> logging.Logger:
+    """
+    Log the records of a logger (and its child loggers) through a queue to a writer thread
+
+    Args:
+        logger_name (str): logger to set up. Default is the root logger
+        level (int | str): output level of the logger. Overridden by the LOG_LEVEL environment variable. Default is DEBUG
+        file_path (str): file to write JSON lines into. Default is no file
+        console (bool): write text lines to the console. Default is True
+        levels (dict[str, int | str]): level of each logger, updated by the LOG_LEVELS environment variable
+        sample_rates (dict[str, int]): keep 1 of every n DEBUG records of each logger, updated by the LOG_SAMPLE_RATES environment variable
+        capture (list[str]): loggers whose records below the output level go into the ring buffer, updated by the LOG_CAPTURE environment variable
+        ring_buffer_size (int): no. of records below the output level written out on an error. Default is RING_BUFFER_SIZE
+        multiprocess (bool): use a multiprocessing queue, for processes forked after setting up. Default is False
+
+    Returns:
+        logging.Logger: the logger
+    """
+    level = resolve_level(level)
+    levels = {**(levels or {}), **
+              _parse_setting(os.environ.get("LOG_LEVELS", ""))}
+    sample_rates = {**(sample_rates or {}), **{name: int(rate) for name, rate in _parse_setting(
+        os.environ.get("LOG_SAMPLE_RATES", "")).items()}}
+    capture = list(capture or []) + [name.strip()
+                                     for name in os.environ.get("LOG_CAPTURE", "").split(",") if name.strip()]
+
+    targets = []
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        targets.append(console_handler)
+    if file_path:
+        file_handler = logging.FileHandler(file_path, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        targets.append(file_handler)
+
+    ring_buffer = RingBufferHandler(targets, level, ring_buffer_size)
+    queue_handler = NonBlockingQueueHandler(
+        multiprocessing.Queue(-1) if multiprocess else queue.Queue(-1))
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+    _start_writer(queue_handler, ring_buffer)
+    if not multiprocess and hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=lambda: _after_fork_in_child(
+            queue_handler, ring_buffer))
+
+    logger = logging.getLogger(logger_name)
+    logger.setLevel(level)
+    logger.addHandler(queue_handler)
+    if ring_buffer_size:
+        # records of the captured loggers below the output level are still logged, into the ring buffer
+        for name in capture:
+            logging.getLogger(name).setLevel(logging.DEBUG)
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+    return logger
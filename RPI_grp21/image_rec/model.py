@@ -2,6 +2,7 @@ import cv2
 import torch
 import os
 import string
+import time
 import numpy as np
 import glob
 from PIL import Image
@@ -56,6 +57,32 @@ def load_model():
     return model
 
 
+def run_inference(model, image_path, timings=None):
+    """
+    Decode an image and run the model on it.
+    If a timings dict is given, the seconds spent decoding, preprocessing, in inference and postprocessing (NMS) are added to it
+    """
+    start = time.perf_counter()
+    image = cv2.imread(str(image_path))
+    if image is None:
+        raise ValueError(f"Cannot decode image '{image_path}'")
+    decode_time = time.perf_counter() - start
+
+    # the decoded image is in BGR, as the model expects of an array
+    results = model.predict(
+        source=image,
+        conf=MODEL_CONFIG["conf"],
+        imgsz=640,
+        device=device,
+        verbose=False
+    )
+    if timings is not None:
+        timings["decode"] = decode_time
+        timings.update({phase: results[0].speed[phase] / 1000
+                        for phase in ("preprocess", "inference", "postprocess")})
+    return results
+
+
 def find_largest_or_central_bbox(bboxes, signal):
     """
     Filter and select the best bounding box based on selection mode
@@ -95,7 +122,7 @@ def find_largest_or_central_bbox(bboxes, signal):
     return chosen_bbox["label"], chosen_bbox["bbox_area"]
 
 
-def predict_image(logger, model, image_path, output_dir, signal):
+def predict_image(logger, model, image_path, output_dir, signal, timings=None):
     """
     FOR TASK 1: Predict and annotate image.
 
@@ -105,18 +132,14 @@ def predict_image(logger, model, image_path, output_dir, signal):
     3. Filter by Signal from algorithm. signal = 'L' if obstacle is on the left of robot, signal = 'R' if obstacle is right of robot (used to break a tie)
 
     Code can be further modified to use a fallback model if necessary.
+
+    If a timings dict is given, the seconds spent in each phase are added to it (see run_inference), and in saving the annotated image
     """
     formatted_time = datetime.now().strftime('%d-%m_%H-%M-%S.%f')[:-3]
     img_name = f"processed_{formatted_time}.jpg"
 
     # Perform inference
-    results = model.predict(
-        source=image_path,
-        conf=MODEL_CONFIG["conf"],
-        imgsz=640,
-        device=device,
-        verbose=False
-    )
+    results = run_inference(model, image_path, timings)
     logger.debug(f"predict speed (ms): {results[0].speed}")
 
     bboxes = []
@@ -135,7 +158,10 @@ def predict_image(logger, model, image_path, output_dir, signal):
     # Save YOLO-labeled image
     os.makedirs(output_dir, exist_ok=True)
     output_file_path = output_dir / img_name
+    start = time.perf_counter()
     results[0].save(output_file_path)
+    if timings is not None:
+        timings["annotation_save"] = time.perf_counter() - start
     logger.debug(f"Saved processed image: '{output_file_path}'")
 
     selected_label, selected_area = find_largest_or_central_bbox(
@@ -151,9 +177,10 @@ def predict_image(logger, model, image_path, output_dir, signal):
     return image_id
 
 
-def predict_image_t2(logger, model, image_path, output_dir, signal):
+def predict_image_t2(logger, model, image_path, output_dir, signal, timings=None):
     """FOR TASK 2: Predict and annotate image, identifying only 'left' or 'right'.
        Defaults to 'left' (39) if no valid detection is found.
+       If a timings dict is given, the seconds spent in each phase are added to it (see predict_image)
     """
     formatted_time = datetime.now().strftime('%d-%m_%H-%M-%S.%f')[:-3]
     img_name = f"processed_{formatted_time}.jpg"
@@ -165,13 +192,7 @@ def predict_image_t2(logger, model, image_path, output_dir, signal):
     }
 
     # Perform inference
-    results = model.predict(
-        source=image_path,
-        conf=MODEL_CONFIG["conf"],
-        imgsz=640,
-        device=device,
-        verbose=False
-    )
+    results = run_inference(model, image_path, timings)
     logger.debug(f"predict speed (ms): {results[0].speed}")
 
     # Extract bounding boxes
@@ -195,7 +216,10 @@ def predict_image_t2(logger, model, image_path, output_dir, signal):
     # Save YOLO-labeled image
     os.makedirs(output_dir, exist_ok=True)
     output_file_path = output_dir / img_name
+    start = time.perf_counter()
     results[0].save(output_file_path)
+    if timings is not None:
+        timings["annotation_save"] = time.perf_counter() - start
     logger.debug(f"Saved processed image: '{output_file_path}'")
 
     # Select the largest bounding box
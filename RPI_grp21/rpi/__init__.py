@@ -1,25 +1,19 @@
 import logging
+import os
+import sys
 
-
-log_format = logging.Formatter("%(asctime)s :: %(levelname)s :: %(processName)s :: %(message)s")
+# Allows Python to find the logging shared with the API
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.logs import setup_logging  # nopep8
+from .constant.settings import LOG_CAPTURE, LOG_LEVEL, LOG_LEVELS, LOG_SAMPLE_RATES  # nopep8
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 logger.propagate = True
 
 if not logger.hasHandlers():
-    # Console handler
-    debug_handler = logging.StreamHandler()
-    debug_handler.setLevel(logging.DEBUG)
-    debug_handler.setFormatter(log_format)
-
-    # File handler
-    txt_handler = logging.FileHandler("logfile.txt")
-    txt_handler.setLevel(logging.DEBUG)
-    txt_handler.setFormatter(log_format)
-
-    # Add handlers to logger
-    logger.addHandler(debug_handler)
-    logger.addHandler(txt_handler)
+    # every process logs through a queue to a single writer thread in the main process,
+    # which writes text lines to the console and JSON lines to logfile.txt
+    setup_logging(__name__, LOG_LEVEL, "logfile.txt", levels=LOG_LEVELS,
+                  sample_rates=LOG_SAMPLE_RATES, capture=LOG_CAPTURE, multiprocess=True)
 
-logger.info("started package")
\ No newline at end of file
+logger.info("started package")
@@ -6,10 +6,25 @@ BAUD_RATE = 115200
 API_IP = "192.168.10.14"  # IP address of laptop
 API_PORT = 5000
 URL = f"http://{API_IP}:{API_PORT}"
+# image recognition can be served by another API server (see API_SERVICES in api/api.py), eg. on another port
+IMAGE_API_PORT = API_PORT
+IMAGE_URL = f"http://{API_IP}:{IMAGE_API_PORT}"
 API_TIMEOUT = 90
+# stream the path from /path/stream, to start moving to the first obstacle while the rest of the tour is planned
+STREAM_PATH = True
 
 # ROBOT SETTINGS
 OUTDOOR_BIG_TURN = False
 
 #MODIFICATIONS WITHOUT STM CONNECTIONS
 USE_STM = True
+
+# LOGGING (see common/logs.py)
+# records below LOG_LEVEL are dropped, or kept in memory and only written out before an error for the loggers in LOG_CAPTURE
+LOG_LEVEL = "DEBUG"
+# level of each logger, eg. {"rpi.communication.android": "INFO"}
+LOG_LEVELS = {}
+# keep 1 of every n DEBUG records of each logger, eg. {"rpi.communication.stm32": 10}
+LOG_SAMPLE_RATES = {}
+# loggers whose records below LOG_LEVEL are kept in memory, eg. ["rpi.communication.stm32"]
+LOG_CAPTURE = []
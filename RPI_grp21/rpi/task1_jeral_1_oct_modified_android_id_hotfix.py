@@ -12,7 +12,7 @@ from .communication.android import AndroidMessage
 from .communication.camera import snap_using_picamera2
 from .communication.pi_action import PiAction
 from .constant.consts import Category, stm32_prefixes
-from .constant.settings import API_TIMEOUT, URL
+from .constant.settings import API_TIMEOUT, IMAGE_URL, STREAM_PATH, URL
 
 # ✅ Unified direction map (0,2,4,6)
 DIR_MAP_STR_TO_CODE = {
@@ -421,7 +421,7 @@ class TaskOne(RaspberryPi):
         self.android_queue.put(
             AndroidMessage(Category.INFO.value, f"Capturing image for obstacle id: {obstacle_id}")
         )
-        url = f"{URL}/image"
+        url = f"{IMAGE_URL}/image"
 
         ts = int(time.time())
         safe_obstacle_id = str(obstacle_id).replace("..", "")
@@ -477,6 +477,10 @@ class TaskOne(RaspberryPi):
             "robot_dir": data["robot_dir"],
             "retrying": retrying,
         }
+        if STREAM_PATH:
+            self.request_algo_stream(body)
+            return
+
         response = requests.post(url=f"{URL}/path", json=body, timeout=API_TIMEOUT)
 
         if response.status_code != 200:
@@ -505,9 +509,62 @@ class TaskOne(RaspberryPi):
             AndroidMessage(cat=Category.INFO.value, value="Commands and path received Algo API. Starting execution...")
         )
 
+    def request_algo_stream(self, body: dict) -> None:
+        """Request path planning from Algo API, starting execution as soon as the first segment of the path arrives."""
+        response = requests.post(url=f"{URL}/path/stream", json=body, timeout=API_TIMEOUT, stream=True)
+
+        if response.status_code != 200:
+            self.android_queue.put(
+                AndroidMessage(Category.ERROR.value, "Error when requesting path from Algo API.")
+            )
+            return
+
+        self.clear_queues()
+        started = False
+        final = False
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                segment = json.loads(line)
+                if "error" in segment:
+                    logger.error(f"Algo API failed while streaming the path: {segment['error']}")
+                    break
+
+                for c in segment["commands"]:
+                    self.command_queue.put(c)
+                for p in segment["path"]:
+                    self.path_queue.put(p)
+                logger.debug(f"Received segment {segment['segment']} of the path: {segment['commands']}")
+                final = segment["final"]
+
+                # 🔓 Auto-start execution on the first segment with commands (bypass Android "start")
+                if not started and segment["commands"]:
+                    started = True
+                    self.unpause.set()
+                    self.android_queue.put(
+                        AndroidMessage(cat=Category.INFO.value, value="First commands received from Algo API. Starting execution...")
+                    )
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"Connection to Algo API lost while streaming the path: {e}")
+
+        if not final:
+            # the rest of the path (and its FIN) never arrives, so stop the robot instead of running a partial path
+            self.unpause.clear()
+            self.clear_queues()
+            self.android_queue.put(
+                AndroidMessage(Category.ERROR.value, "Error when requesting path from Algo API.")
+            )
+            return
+
+        if started:
+            self.android_queue.put(
+                AndroidMessage(cat=Category.INFO.value, value="All commands and path received from Algo API.")
+            )
+
     def request_stitch(self) -> None:
         """Ask API to stitch images together."""
-        response = requests.get(url=f"{URL}/stitch", timeout=API_TIMEOUT)
+        response = requests.get(url=f"{IMAGE_URL}/stitch", timeout=API_TIMEOUT)
         if response.status_code != 200:
             self.android_queue.put(AndroidMessage(Category.ERROR.value, "Error when requesting stitch from API."))
             return